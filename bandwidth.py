@@ -0,0 +1,146 @@
+import threading
+import time
+
+# Quanto de "crédito" um job pode acumular enquanto está parado, em segundos
+BURST_SECONDS = 1.0
+# Janela de medição da taxa de cada job, em segundos
+RATE_WINDOW = 1.0
+# Um job abaixo desta fração da cota está limitado por outro motivo (servidor, fim do stream)
+SATURATION = 0.95
+# Folga sobre a taxa medida de um job limitado, para que ele possa voltar a crescer.
+# 1/HEADROOM precisa ficar abaixo de SATURATION, senão a cota do job oscila
+HEADROOM = 1.2
+# Cota mínima de um job parado, em bytes/s, para que ele consiga recomeçar
+MIN_RATE = 16 * 1024
+
+
+class _JobBudget:
+    __slots__ = ('last_bytes', 'next_time', 'share', 'rate', 'window_start', 'window_bytes')
+
+    def __init__(self):
+        self.last_bytes = None
+        self.next_time = None
+        self.share = None
+        # Taxa medida na última janela completa (None = ainda sem medida)
+        self.rate = None
+        self.window_start = None
+        self.window_bytes = 0
+
+
+def max_min_shares(total, demands):
+    """
+    Divide `total` entre as demandas {chave: bytes/s, ou None se sem
+    limite} com justiça max-min: quem pede menos que a fatia igual recebe
+    o que pede, e a sobra é dividida entre os demais.
+    """
+    shares = {}
+    remaining = total
+    pending = sorted(demands.items(), key=lambda item: (item[1] is None, item[1] or 0))
+    for index, (key, demand) in enumerate(pending):
+        fair = remaining / (len(pending) - index)
+        shares[key] = fair if demand is None else min(demand, fair)
+        remaining -= shares[key]
+    return shares
+
+
+class BandwidthScheduler:
+    """
+    Divide um limite total de banda (bytes/s) entre os jobs ativos, com
+    justiça max-min sobre a taxa medida de cada um: um job que não
+    consegue usar a sua fatia (servidor lento, stream no fim) fica com o
+    que usa, e a sobra vai para os outros, mantendo o total no limite. As
+    cotas são recalculadas quando um job começa ou termina e a cada
+    janela de medição.
+
+    O controle é feito no progress hook do yt-dlp: a thread que acabou de
+    receber um bloco (ou fragmento) espera o tempo necessário para manter
+    o job dentro da sua cota. Assim vale para downloads HTTP diretos e
+    para HLS/DASH com fragmentos simultâneos.
+    """
+
+    def __init__(self, total_rate=None):
+        self.total_rate = total_rate
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def set_total_rate(self, total_rate):
+        """Altera o limite total; None ou 0 remove o limite."""
+        with self._lock:
+            self.total_rate = total_rate or None
+            for budget in self._jobs.values():
+                budget.next_time = None
+            self._reallocate(time.monotonic())
+
+    def register(self, job):
+        with self._lock:
+            self._jobs[job.id] = _JobBudget()
+            self._reallocate(time.monotonic())
+
+    def unregister(self, job):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+            self._reallocate(time.monotonic())
+
+    def job_rate(self):
+        """Cota atual de cada job ativo: {job_id: bytes/s} (vazio se ilimitado)."""
+        with self._lock:
+            if not self.total_rate:
+                return {}
+            return {job_id: budget.share for job_id, budget in self._jobs.items()}
+
+    def _reallocate(self, now):
+        if not self.total_rate or not self._jobs:
+            return
+        demands = {}
+        for job_id, budget in self._jobs.items():
+            rate = budget.rate
+            if budget.window_start is not None and now - budget.window_start > 2 * RATE_WINDOW:
+                # Sem amostras há mais de uma janela: o job está parado
+                rate = budget.window_bytes / (now - budget.window_start)
+            if rate is not None and budget.share and rate < budget.share * SATURATION:
+                demands[job_id] = max(rate * HEADROOM, MIN_RATE)
+            else:
+                demands[job_id] = None
+        for job_id, share in max_min_shares(self.total_rate, demands).items():
+            self._jobs[job_id].share = share
+
+    def _measure(self, budget, delta, now):
+        """Acumula os bytes na janela do job; retorna True quando a janela fecha."""
+        if budget.window_start is None:
+            budget.window_start = now
+            budget.window_bytes = 0
+        budget.window_bytes += delta
+        elapsed = now - budget.window_start
+        if elapsed < RATE_WINDOW:
+            return False
+        budget.rate = budget.window_bytes / elapsed
+        budget.window_start = now
+        budget.window_bytes = 0
+        return True
+
+    def throttle(self, job, downloaded_bytes):
+        """
+        Registra o total baixado pelo job e espera, se preciso, até que ele
+        volte para dentro da cota. Retorna cedo se o job for cancelado.
+        """
+        now = time.monotonic()
+        with self._lock:
+            budget = self._jobs.get(job.id)
+            if budget is None or not self.total_rate or downloaded_bytes is None:
+                return
+            if budget.last_bytes is None or downloaded_bytes < budget.last_bytes:
+                # Primeira amostra ou início de um novo arquivo
+                budget.last_bytes = downloaded_bytes
+                return
+            delta = downloaded_bytes - budget.last_bytes
+            budget.last_bytes = downloaded_bytes
+            if self._measure(budget, delta, now):
+                self._reallocate(now)
+            share = budget.share
+            # O crédito acumulado em pausas fica limitado a BURST_SECONDS
+            start = max(budget.next_time or now, now - BURST_SECONDS)
+            budget.next_time = start + delta / share
+            delay = budget.next_time - now
+
+        if delay > 0:
+            job.cancel_event.wait(delay)
@@ -0,0 +1 @@
+"""Benchmarks do motor de download (ver benchmarks/run.py)."""
@@ -0,0 +1,84 @@
+"""
+Extratores do yt-dlp que apontam para o servidor de benchmarks.
+
+Nenhuma página é baixada: as informações saem da própria URL.
+  <base>/watch/<progressive|hls|dash>/<id>?size=N&segments=S
+  <base>/playlist/<progressive|hls|dash>/<quantidade>?size=N&segments=S
+"""
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from yt_dlp.extractor.common import InfoExtractor
+
+_HOST = r'https?://(?:127\.0\.0\.1|localhost)(?::\d+)?'
+DEFAULT_SIZE = 8 * 1024 * 1024
+DEFAULT_SEGMENTS = 16
+
+
+def _params(url):
+    query = parse_qs(urlparse(url).query)
+    size = int(query.get('size', [DEFAULT_SIZE])[0])
+    segments = int(query.get('segments', [DEFAULT_SEGMENTS])[0])
+    return size, segments
+
+
+def _base(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def watch_url(base_url, kind, video_id, size=DEFAULT_SIZE, segments=DEFAULT_SEGMENTS):
+    return f"{base_url}/watch/{kind}/{video_id}?{urlencode({'size': size, 'segments': segments})}"
+
+
+def playlist_url(base_url, kind, count, size=DEFAULT_SIZE, segments=DEFAULT_SEGMENTS):
+    return f"{base_url}/playlist/{kind}/{count}?{urlencode({'size': size, 'segments': segments})}"
+
+
+class FakeMediaIE(InfoExtractor):
+    IE_NAME = 'fakemedia'
+    _VALID_URL = _HOST + r'/watch/(?P<kind>progressive|hls|dash)/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        kind, video_id = self._match_valid_url(url).group('kind', 'id')
+        size, segments = _params(url)
+        base = _base(url)
+        segment_size = max(1, size // segments)
+        fmt = {
+            'format_id': kind,
+            'ext': 'mp4',
+            'vcodec': 'avc1.64001f',
+            'acodec': 'mp4a.40.2',
+            'width': 1280,
+            'height': 720,
+            'filesize_approx': size,
+        }
+        if kind == 'progressive':
+            fmt.update(url=f"{base}/media/{video_id}.mp4?size={size}", protocol='http', filesize=size)
+        elif kind == 'hls':
+            fmt.update(url=f"{base}/hls/{video_id}/index.m3u8?segments={segments}&segment_size={segment_size}",
+                       protocol='m3u8_native')
+        else:
+            fragment_base = f"{base}/dash/{video_id}/"
+            fmt.update(url=fragment_base, protocol='http_dash_segments', fragment_base_url=fragment_base,
+                       fragments=[{'path': f"seg{index}.m4s?segment_size={segment_size}", 'duration': 4.0}
+                                  for index in range(segments)])
+        return {
+            'id': video_id,
+            'title': f"bench-{kind}-{video_id}",
+            'duration': 4 * segments,
+            'formats': [fmt],
+        }
+
+
+class FakeMediaPlaylistIE(InfoExtractor):
+    IE_NAME = 'fakemedia:playlist'
+    _VALID_URL = _HOST + r'/playlist/(?P<kind>progressive|hls|dash)/(?P<count>\d+)'
+
+    def _real_extract(self, url):
+        kind, count = self._match_valid_url(url).group('kind', 'count')
+        size, segments = _params(url)
+        base = _base(url)
+        entries = (self.url_result(watch_url(base, kind, f"{kind}{index}", size, segments),
+                                   FakeMediaIE, f"{kind}{index}")
+                   for index in range(int(count)))
+        return self.playlist_result(entries, f"playlist-{kind}-{count}", f"bench playlist ({kind})")
@@ -0,0 +1,126 @@
+"""
+Servidor HTTP local que simula um site de vídeos.
+
+Serve mídia sintética em três formas:
+  /media/<id>.mp4?size=N                      arquivo progressivo (aceita Range)
+  /hls/<id>/index.m3u8?segments=S&segment_size=B
+  /hls/<id>/seg<i>.ts?segment_size=B          playlist HLS e seus fragmentos
+  /dash/<id>/seg<i>.m4s?segment_size=B        fragmentos DASH
+
+O conteúdo é um bloco de bytes aleatórios repetido: não é mídia válida,
+mas basta para medir download, hooks e registro sem pós-processamento.
+"""
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BLOCK = os.urandom(64 * 1024)
+SEGMENT_DURATION = 4
+
+
+def _int_param(query, name, default):
+    try:
+        return int(query.get(name, [default])[0])
+    except ValueError:
+        return default
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        path = parsed.path
+
+        if re.fullmatch(r'/media/[\w-]+\.mp4', path):
+            self._send_body(_int_param(query, 'size', 8 * 1024 * 1024), 'video/mp4', allow_range=True)
+        elif re.fullmatch(r'/hls/[\w-]+/index\.m3u8', path):
+            self._send_playlist(query)
+        elif re.fullmatch(r'/(hls|dash)/[\w-]+/seg\d+\.(ts|m4s)', path):
+            self._send_body(_int_param(query, 'segment_size', 512 * 1024), 'video/mp2t')
+        else:
+            self.send_error(404)
+
+    def _send_playlist(self, query):
+        segments = _int_param(query, 'segments', 16)
+        segment_size = _int_param(query, 'segment_size', 512 * 1024)
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{SEGMENT_DURATION}',
+                 '#EXT-X-MEDIA-SEQUENCE:0']
+        for index in range(segments):
+            lines += [f'#EXTINF:{SEGMENT_DURATION}.0,', f'seg{index}.ts?segment_size={segment_size}']
+        lines.append('#EXT-X-ENDLIST')
+        body = ('\n'.join(lines) + '\n').encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_body(self, size, content_type, allow_range=False):
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range') if allow_range else None
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header or '')
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        length = end - start + 1
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        if allow_range:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+        offset = start % len(BLOCK)
+        remaining = length
+        try:
+            while remaining > 0:
+                chunk = BLOCK[offset:offset + remaining]
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+                offset = 0
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MediaServer:
+    """Sobe o servidor em uma porta livre de 127.0.0.1, em uma thread própria."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = ThreadingHTTPServer((host, port), MediaRequestHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,217 @@
+"""
+Executa os benchmarks do motor de download contra o servidor local.
+
+    python -m benchmarks.run [--modes single,concurrent,playlist] [--kinds progressive,hls,dash]
+                             [--jobs 8] [--workers 4] [--size 8M] [--output resultados.json]
+
+Cada combinação de modo e tipo de mídia roda em um processo separado,
+para que o pico de memória de uma não contamine a outra. O resultado é
+um JSON com o ambiente, a configuração e as métricas de cada execução.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCHEMA_VERSION = 1
+MODES = ('single', 'concurrent', 'playlist')
+KINDS = ('progressive', 'hls', 'dash')
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows: sem resource na biblioteca padrão
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Timings:
+    """Acumula durações (em segundos) de chamadas instrumentadas."""
+
+    def __init__(self):
+        self.values = []
+        self._lock = threading.Lock()
+
+    def wrap(self, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.values.append(elapsed)
+        return timed
+
+    def summary(self, unit=1e3):
+        values = self.values
+        if not values:
+            return {'calls': 0}
+        return {
+            'calls': len(values),
+            'total': round(sum(values) * unit, 3),
+            'mean': round(sum(values) / len(values) * unit, 3),
+            'p95': round(_percentile(values, 0.95) * unit, 3),
+            'max': round(max(values) * unit, 3),
+        }
+
+
+def run_one(mode, kind, jobs, workers, size, segments):
+    """Roda um cenário no processo atual e retorna suas métricas."""
+    from benchmarks.fake_extractor import FakeMediaIE, FakeMediaPlaylistIE, playlist_url, watch_url
+    from benchmarks.media_server import MediaServer
+    from core import DownloadEngine
+
+    finished = []
+    with tempfile.TemporaryDirectory(prefix='ytdl-bench-') as tmp, MediaServer() as server:
+        tmp = Path(tmp)
+        (tmp / 'app').mkdir()
+        engine = DownloadEngine(app_data_path=tmp / 'app', on_finished=finished.append,
+                                ydl_params={'quiet': True, 'noprogress': True})
+        engine.extra_extractors = [FakeMediaIE, FakeMediaPlaylistIE]
+        engine.downloads_path = tmp / 'out'
+        engine.downloads_path.mkdir()
+        # O servidor local não limita pedidos; o balde de extrações só atrasaria os cenários
+        engine.retry.extraction_rate = None
+
+        hook_timings, history_timings = Timings(), Timings()
+        engine._download_progress_hook = hook_timings.wrap(engine._download_progress_hook)
+        engine.history.add = history_timings.wrap(engine.history.add)
+
+        if mode == 'single':
+            jobs = 1
+            urls = [watch_url(server.base_url, kind, 'single', size, segments)]
+        elif mode == 'concurrent':
+            urls = [watch_url(server.base_url, kind, f"c{index}", size, segments) for index in range(jobs)]
+        else:
+            urls = [playlist_url(server.base_url, kind, jobs, size, segments)]
+
+        engine.start(max_workers=workers, resume=False)
+        start = time.perf_counter()
+        for url in urls:
+            engine.submit(url, "Vídeo (MP4)", "Melhor")
+        engine.wait(poll_interval=0.05)
+        elapsed = time.perf_counter() - start
+        engine.shutdown()
+
+        downloaded = [job for job in finished if job.parent_id is not None or mode != 'playlist']
+        completed = sum(1 for job in downloaded if job.status == 'done')
+        total_bytes = sum(f.stat().st_size for f in engine.downloads_path.rglob('*') if f.is_file())
+
+    return {
+        'mode': mode,
+        'kind': kind,
+        'jobs': jobs,
+        'workers': workers,
+        'completed': completed,
+        'failed': len(downloaded) - completed,
+        'elapsed_s': round(elapsed, 3),
+        'jobs_per_minute': round(completed / elapsed * 60, 2) if elapsed else None,
+        'bytes': total_bytes,
+        'bytes_per_second': round(total_bytes / elapsed) if elapsed else None,
+        'progress_hook_us': hook_timings.summary(unit=1e6),
+        'history_write_ms': history_timings.summary(unit=1e3),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def environment():
+    import yt_dlp
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'yt_dlp': yt_dlp.version.__version__,
+        'commit': commit,
+    }
+
+
+def parse_size(value):
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper().rstrip('B').rstrip('I')
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description="Benchmarks do motor de download.")
+    parser.add_argument('--modes', default=','.join(MODES), help="modos separados por vírgula: " + ', '.join(MODES))
+    parser.add_argument('--kinds', default=','.join(KINDS), help="tipos de mídia: " + ', '.join(KINDS))
+    parser.add_argument('--jobs', type=int, default=8, help="downloads nos modos concurrent e playlist")
+    parser.add_argument('--workers', type=int, default=4, help="downloads simultâneos")
+    parser.add_argument('--size', type=parse_size, default='8M', help="tamanho de cada mídia (ex: 8M)")
+    parser.add_argument('--segments', type=int, default=16, help="fragmentos por mídia HLS/DASH")
+    parser.add_argument('--output', '-o', help="arquivo JSON de saída (padrão: saída padrão)")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    modes = [mode for mode in args.modes.split(',') if mode]
+    kinds = [kind for kind in args.kinds.split(',') if kind]
+    for value, allowed in [(mode, MODES) for mode in modes] + [(kind, KINDS) for kind in kinds]:
+        if value not in allowed:
+            print(f"Valor inválido: {value}", file=sys.stderr)
+            return 2
+
+    if args.child:
+        print(json.dumps(run_one(modes[0], kinds[0], args.jobs, args.workers, args.size, args.segments)))
+        return 0
+
+    results = []
+    for mode in modes:
+        for kind in kinds:
+            print(f"Executando {mode}/{kind}...", file=sys.stderr, flush=True)
+            command = [sys.executable, '-m', 'benchmarks.run', '--child', '--modes', mode, '--kinds', kind,
+                       '--jobs', str(args.jobs), '--workers', str(args.workers), '--size', str(args.size),
+                       '--segments', str(args.segments)]
+            child = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+            if child.returncode != 0:
+                print(child.stderr, file=sys.stderr)
+                results.append({'mode': mode, 'kind': kind, 'error': child.stderr.strip().splitlines()[-1:]})
+                continue
+            results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    report = {
+        'schema': SCHEMA_VERSION,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'config': {'jobs': args.jobs, 'workers': args.workers, 'size': args.size, 'segments': args.segments},
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    else:
+        print(text)
+    return 0 if all('error' not in result for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
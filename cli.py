@@ -0,0 +1,191 @@
+"""
+Interface de linha de comando do YouTube Downloader.
+
+Usa apenas o motor em core.py, sem carregar o PySide6:
+
+    python -m cli URL [URL ...] [-a arquivo.txt] [-t mp4|mkv|mp3|m4a] [-q 720p] [-o pasta] [-j 4] [-r 2M]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+from yt_dlp.utils import parse_bytes
+
+from core import TYPE_CHOICES, DownloadEngine, quality_label, quality_names
+
+
+def read_batch_file(path):
+    """Lê URLs de um arquivo (uma por linha; '-' lê da entrada padrão)."""
+    handle = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        return [line.strip() for line in handle if line.strip() and not line.lstrip().startswith('#')]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def byte_rate(value):
+    rate = parse_bytes(value)
+    if rate is None:
+        raise argparse.ArgumentTypeError(f"taxa inválida: {value}")
+    return rate
+
+
+def byte_size(value):
+    size = parse_bytes(value)
+    if size is None:
+        raise argparse.ArgumentTypeError(f"tamanho inválido: {value}")
+    return size
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description="YouTube Downloader sem interface gráfica.")
+    parser.add_argument('urls', nargs='*', metavar='URL', help="URLs de vídeos, playlists ou canais")
+    parser.add_argument('-a', '--batch-file', action='append', default=[],
+                        help="arquivo com uma URL por linha ('-' para a entrada padrão)")
+    parser.add_argument('-t', '--type', choices=sorted(TYPE_CHOICES), default='mp4', help="formato de saída")
+    parser.add_argument('-q', '--quality', type=str.lower, choices=quality_names(), default='default',
+                        metavar='QUALIDADE',
+                        help="qualidade: best, worst, 1080p, 720p... para vídeo; 320k, 192k, 128k, 64k para áudio")
+    parser.add_argument('-o', '--output', help="pasta de destino (padrão: a pasta salva nas configurações)")
+    parser.add_argument('-j', '--jobs', type=int, help="número de downloads simultâneos")
+    parser.add_argument('-r', '--limit-rate', type=byte_rate, metavar='TAXA',
+                        help="limite total de banda, dividido entre os downloads (ex: 500K, 2M)")
+    parser.add_argument('-N', '--concurrent-fragments', type=int, metavar='N',
+                        help="fragmentos HLS/DASH baixados em paralelo por download")
+    parser.add_argument('--temp-dir', metavar='PASTA',
+                        help="pasta para os streams brutos e junções, ex: um volume mais rápido")
+    parser.add_argument('--min-free', type=byte_size, metavar='TAMANHO',
+                        help="espaço mantido livre no disco; downloads que não cabem esperam (ex: 2G)")
+    parser.add_argument('--preallocate', action='store_true',
+                        help="reserva no disco o espaço do arquivo final das junções e conversões")
+    parser.add_argument('--retries', type=int, metavar='N',
+                        help="novas tentativas para falhas temporárias (rede, 429, 5xx)")
+    parser.add_argument('--write-thumbnail', action='store_true', help="grava a miniatura ao lado do arquivo")
+    parser.add_argument('--sub-langs', metavar='IDIOMAS',
+                        help="grava as legendas nesses idiomas, separados por vírgula (ex: pt,en)")
+    parser.add_argument('--write-info-json', action='store_true', help="grava as informações do vídeo em .info.json")
+    parser.add_argument('--embed', action='store_true',
+                        help="incorpora miniatura, legendas e metadados ao arquivo final")
+    parser.add_argument('--force', action='store_true', help="baixa mesmo os vídeos que já constam como baixados")
+    parser.add_argument('--download-archive', metavar='ARQUIVO',
+                        help="arquivo de download_archive do yt-dlp com vídeos a pular")
+    parser.add_argument('--resume', action='store_true',
+                        help="retoma também os downloads interrompidos em execuções anteriores")
+    parser.add_argument('--metrics-port', type=int, metavar='PORTA',
+                        help="expõe métricas em http://127.0.0.1:PORTA/metrics enquanto os downloads rodam")
+    parser.add_argument('--metrics-json', metavar='ARQUIVO', help="grava as métricas em JSON ao terminar")
+    parser.add_argument('--watch', metavar='PASTA',
+                        help="observa a pasta e baixa as URLs dos arquivos .txt colocados nela (roda até Ctrl+C)")
+    parser.add_argument('--inbox-port', type=int, metavar='PORTA',
+                        help="recebe URLs por POST em http://127.0.0.1:PORTA/urls (roda até Ctrl+C)")
+    parser.add_argument('--max-pending', type=int, metavar='N',
+                        help="máximo de jobs pendentes na fila vindos da ingestão")
+    parser.add_argument('--quiet', action='store_true', help="mostra apenas erros")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    download_type = TYPE_CHOICES[args.type]
+    try:
+        quality = quality_label(download_type, args.quality)
+    except ValueError as e:
+        parser.error(str(e))
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)s %(message)s')
+
+    urls = list(args.urls)
+    for batch_file in args.batch_file:
+        urls.extend(read_batch_file(batch_file))
+    serving = bool(args.watch or args.inbox_port)
+    if not urls and not args.resume and not serving:
+        print("Nenhuma URL informada.", file=sys.stderr)
+        return 2
+
+    failed = []
+
+    def on_log(message):
+        if not args.quiet:
+            print(message, flush=True)
+
+    def on_error(title, message):
+        print(f"{title}: {message}", file=sys.stderr, flush=True)
+
+    def on_finished(job):
+        if job.status == 'error':
+            failed.append(job)
+
+    ydl_params = {'quiet': True, 'noprogress': True} if args.quiet else {}
+    engine = DownloadEngine(on_log=on_log, on_error=on_error, on_finished=on_finished, ydl_params=ydl_params)
+    try:
+        engine.load_config()
+    except Exception as e:
+        print(f"Erro ao carregar configurações: {e}", file=sys.stderr)
+    # As opções da linha de comando valem só para esta execução e não são salvas
+    if args.download_archive:
+        engine.download_archive = args.download_archive
+    if args.limit_rate:
+        engine.bandwidth.set_total_rate(args.limit_rate)
+    if args.concurrent_fragments:
+        engine.concurrent_fragment_downloads = args.concurrent_fragments
+    if args.retries is not None:
+        engine.max_retries = args.retries
+    if args.metrics_port:
+        engine.metrics_port = args.metrics_port
+    if args.temp_dir:
+        engine.temp_path = args.temp_dir
+    if args.min_free is not None:
+        engine.disk.min_free = args.min_free
+    if args.preallocate:
+        engine.disk.preallocate = True
+    if args.write_thumbnail:
+        engine.write_thumbnail = True
+    if args.sub_langs:
+        engine.subtitle_langs = [lang.strip() for lang in args.sub_langs.split(',') if lang.strip()]
+    if args.write_info_json:
+        engine.write_info_json = True
+    if args.embed:
+        engine.embed_sidecars = True
+    if args.watch:
+        engine.ingest_dir = args.watch
+    if args.inbox_port:
+        engine.ingest_port = args.inbox_port
+    if args.max_pending:
+        engine.ingest_max_pending = args.max_pending
+    if serving:
+        # As URLs ingeridas usam o tipo, a qualidade e a pasta desta execução
+        engine.ingest_type, engine.ingest_quality = args.type, args.quality
+        if args.output:
+            engine.downloads_path = Path(args.output)
+    engine.start(max_workers=args.jobs, resume=args.resume)
+    output_path = Path(args.output) if args.output else None
+
+    for url in urls:
+        engine.submit(url, download_type, quality, output_path=output_path, force=args.force)
+
+    try:
+        if serving:
+            # A ingestão não tem fim: roda até ser interrompida
+            while True:
+                time.sleep(1)
+        engine.wait()
+    except KeyboardInterrupt:
+        print("Cancelando downloads...", file=sys.stderr)
+        engine.shutdown()
+        return 130
+
+    if args.metrics_json:
+        Path(args.metrics_json).write_text(engine.metrics.to_json(indent=2), encoding='utf-8')
+    engine.shutdown()
+
+    if failed:
+        print(f"{len(failed)} download(s) falharam.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
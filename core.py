@@ -0,0 +1,1266 @@
+"""
+Motor de download do YouTube Downloader, independente da interface gráfica.
+
+Este módulo não importa o PySide6: pode ser usado pela interface Qt
+(main.py), pela linha de comando (cli.py) ou como biblioteca. O yt-dlp
+também só é importado sob demanda, para não atrasar a abertura da janela.
+"""
+import copy
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+from bandwidth import BandwidthScheduler
+from dedup import DedupIndex
+from diskspace import CONTAINER_OVERHEAD, DEFAULT_MIN_FREE, DiskSpaceAdmission, InsufficientSpaceError, is_disk_full
+from formats import FormatProfile, estimate_size, select_formats
+from journal import JobJournal
+from orchestrator import JobRetry, Orchestrator
+from download_queue import DownloadJob, DownloadQueue
+from history_store import HistoryStore
+from metadata_cache import MetadataCache
+from metrics import MetricsRegistry, MetricsServer
+from postprocess import (PostProcessingError, PostProcessStage, embed_sidecars, extract_audio, merge_streams,
+                         stream_audio)
+from progress import ProgressAggregator, format_bytes
+from retry import FORBIDDEN, RetryEngine, host_of
+from sidecars import SidecarStage, collect, metadata_tags, sidecar_params
+from ydl_pool import YoutubeDLPool
+
+DOWNLOAD_TYPES = ["Vídeo (MP4)", "Áudio (MP3)", "Áudio (M4A)", "Vídeo + Áudio (MKV)"]
+VIDEO_QUALITIES = ["Melhor", "Pior", "1080p", "720p", "480p", "360p", "240p"]
+AUDIO_QUALITIES = ["Melhor (320k)", "Padrão (192k)", "Boa (128k)", "Pior (64k)"]
+# Espera, em segundos, de um job que aguarda espaço em disco liberado por outros
+DISK_WAIT_SECONDS = 30
+# Espera máxima pelos arquivos auxiliares depois que a mídia terminou
+SIDECAR_TIMEOUT = 120
+# Formatos de áudio que o FFmpeg lê em sequência pela entrada padrão, sem
+# precisar voltar no arquivo (o MP4 comum guarda o índice no fim)
+STREAMABLE_AUDIO_CONTAINERS = ('webm_dash', 'm4a_dash', 'mp4_dash')
+STREAMABLE_AUDIO_EXTS = ('webm', 'weba', 'opus', 'ogg', 'mp3', 'aac')
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def get_app_data_path():
+    """
+    Retorna o caminho para a pasta de dados do aplicativo.
+    Usa AppData em modo 'congelado' e o diretório local em desenvolvimento.
+    """
+    if getattr(sys, 'frozen', False):
+        # Em modo 'congelado', usa a pasta AppData/Roaming
+        app_data_dir = Path(os.getenv('APPDATA')) / "YTDownloader"
+    else:
+        # Em modo de desenvolvimento, usa a pasta local
+        app_data_dir = Path('.')
+
+    # Cria a pasta se ela não existir
+    app_data_dir.mkdir(exist_ok=True)
+    return app_data_dir
+
+
+def get_ffmpeg_path():
+    """
+    Determina o caminho para o executável do FFmpeg, que se espera
+    estar em uma subpasta 'bin' quando empacotado.
+    """
+    if getattr(sys, 'frozen', False):
+        # Se o aplicativo estiver 'congelado' (rodando como .exe)
+        application_path = os.path.dirname(sys.executable)
+        # Constrói o caminho para a subpasta 'bin'
+        return os.path.join(application_path, 'bin', 'ffmpeg.exe')
+
+    # Em modo de desenvolvimento, assume que 'ffmpeg' está no PATH do sistema
+    return 'ffmpeg'
+
+
+def get_default_downloads_path():
+    """Retorna o caminho para a pasta de Downloads padrão do usuário."""
+    return Path.home() / "Downloads"
+
+
+def quality_options(download_type):
+    """Retorna as opções de qualidade e a opção padrão para o tipo de download."""
+    if "Áudio" in download_type:
+        return AUDIO_QUALITIES, "Padrão (192k)"
+    return VIDEO_QUALITIES, "720p"
+
+
+# Tipos de download pelo nome curto usado na linha de comando e na ingestão
+TYPE_CHOICES = {
+    'mp4': "Vídeo (MP4)",
+    'mkv': "Vídeo + Áudio (MKV)",
+    'mp3': "Áudio (MP3)",
+    'm4a': "Áudio (M4A)",
+}
+
+
+def _quality_names(label):
+    """Nomes curtos de uma opção de qualidade da interface: "Melhor (320k)" -> {'best', '320k'}."""
+    names = set(re.findall(r'\d+[kp]', label.lower()))
+    if label.startswith("Melhor"):
+        names.add('best')
+    elif label.startswith("Pior"):
+        names.add('worst')
+    return names
+
+
+def quality_names(download_type=None):
+    """Nomes curtos aceitos para as qualidades do tipo (ou de todos os tipos)."""
+    types = [download_type] if download_type else DOWNLOAD_TYPES
+    names = {'default'}
+    for name in types:
+        for label in quality_options(name)[0]:
+            names |= _quality_names(label)
+    return sorted(names)
+
+
+def quality_label(download_type, quality):
+    """
+    Converte a qualidade informada em texto ("best", "720p", "192k"), na
+    linha de comando ou na ingestão, para a opção equivalente da interface,
+    para que o mesmo pedido gere o mesmo job (e a mesma chave de
+    duplicados) em qualquer ponto de entrada. ValueError se o tipo não
+    tiver essa qualidade.
+    """
+    options, default = quality_options(download_type)
+    quality = (quality or '').strip().lower()
+    if quality in ('', 'default'):
+        return default
+    for label in options:
+        if quality in _quality_names(label):
+            return label
+    raise ValueError(f"qualidade inválida para {download_type}: {quality}")
+
+
+def build_ydl_opts(download_type, quality, downloads_path, ffmpeg_path):
+    """
+    Monta as opções do yt-dlp (sem os hooks) a partir do tipo de download
+    e da qualidade escolhidos.
+    """
+    ydl_opts = {
+        'format': 'bestvideo+bestaudio/best',
+        'outtmpl': {
+            'default': str(Path(downloads_path) / '%(title)s.%(ext)s')
+        },
+        'merge_output_format': 'mkv',
+        'postprocessors': [],
+        'ffmpeg_location': ffmpeg_path,
+        'no_mtime': True,
+        # Continua arquivos .part deixados por uma execução interrompida
+        'continuedl': True,
+        # Playlists são enumeradas sob demanda e cada item vira um job
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True
+    }
+
+    if download_type == "Áudio (MP3)":
+        ydl_opts['format'] = 'bestaudio/best'
+        # Extrai o bitrate da string de qualidade, ex: "Padrão (192k)" -> "192"
+        audio_bitrate = quality.split('(')[-1].replace('k)', '') if '(' in quality else '192'
+        ydl_opts['postprocessors'].append({
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': audio_bitrate,
+        })
+    elif download_type == "Áudio (M4A)":
+        ydl_opts['format'] = 'bestaudio/best'
+        ydl_opts['postprocessors'].append({
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'm4a',
+        })
+    elif download_type == "Vídeo (MP4)":
+        ydl_opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+        ydl_opts['merge_output_format'] = 'mp4'
+    elif download_type == "Vídeo + Áudio (MKV)":
+        ydl_opts['format'] = 'bestvideo+bestaudio/best'
+        ydl_opts['merge_output_format'] = 'mkv'
+
+    if quality not in ["Melhor", "Pior"] and "k)" not in quality:  # Garante que só se aplica a vídeo
+        if download_type.startswith("Vídeo"):
+            resolution = quality.replace('p', '')
+            ydl_opts['format'] = f'bestvideo[height<={resolution}]+bestaudio/best[height<={resolution}]'
+
+    return ydl_opts
+
+
+def is_batch_result(info):
+    """Indica se o resultado da extração é uma playlist/canal."""
+    return info.get('_type') in ('playlist', 'multi_video')
+
+
+def format_video_info(info, selection=None):
+    """
+    Monta o texto de prévia exibido para uma URL. Com `selection` (ver
+    DownloadEngine.select_formats), inclui os formatos e o tamanho esperado.
+    """
+    if is_batch_result(info):
+        count = info.get('playlist_count') or 'desconhecido'
+        return f"Playlist: {info.get('title', 'Título não disponível')}\nItens: {count}"
+
+    title = info.get('title', 'Título não disponível')
+    duration = info.get('duration', 0)
+    uploader = info.get('uploader', 'Canal não disponível')
+    view_count = info.get('view_count', 0) or 0
+
+    if duration:
+        minutes = int(duration) // 60
+        seconds = int(duration) % 60
+        duration_str = f"{minutes:02d}:{seconds:02d}"
+    else:
+        duration_str = "Duração não disponível"
+
+    text = f"Título: {title}\nCanal: {uploader}\nDuração: {duration_str}\nVisualizações: {view_count:,}"
+    if selection is not None:
+        size = format_bytes(selection.estimated_size) if selection.estimated_size else "desconhecido"
+        text += f"\nFormato: {selection.describe()}\nTamanho estimado: {size}"
+    return text
+
+
+def load_extractors():
+    """
+    Importa o yt-dlp e monta o registro de extratores. É a parte cara da
+    primeira extração; DownloadEngine.warm_up() adianta isso em segundo plano.
+    """
+    import yt_dlp
+    start = time.perf_counter()
+    count = len(yt_dlp.extractor.gen_extractor_classes())
+    logging.debug("yt-dlp carregado: %d extratores em %.0f ms", count, (time.perf_counter() - start) * 1000)
+    return count
+
+
+def can_stream_audio(fmt):
+    """Indica se o formato pode ir da rede direto para o FFmpeg, sem arquivo intermediário."""
+    if fmt.get('protocol') not in ('http', 'https') or not fmt.get('url'):
+        return False
+    return fmt.get('container') in STREAMABLE_AUDIO_CONTAINERS or fmt.get('ext') in STREAMABLE_AUDIO_EXTS
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class DownloadEngine:
+    """
+    Fila de downloads, opções do yt-dlp, hooks e histórico.
+
+    A comunicação com quem usa o motor acontece por callbacks, chamados a
+    partir das threads dos workers:
+      on_log(message)
+      on_progress(job, message, progress)
+      on_error(title, message)
+      on_queued(job)
+      on_finished(job)
+    """
+
+    def __init__(self, app_data_path=None, on_log=None, on_progress=None, on_error=None, on_finished=None,
+                 ydl_params=None, on_queued=None):
+        self.app_data_path = Path(app_data_path) if app_data_path else get_app_data_path()
+        # Opções extras repassadas ao yt-dlp em todos os downloads (ex: {'quiet': True})
+        self.ydl_params = dict(ydl_params or {})
+        # Extratores adicionais (classes de InfoExtractor), com prioridade sobre os do yt-dlp
+        self.extra_extractors = []
+        self.on_log = on_log or _noop
+        self.on_progress = on_progress or _noop
+        self.on_error = on_error or _noop
+        self.on_finished = on_finished or _noop
+        # Chamado para cada job que entra na fila: envios, itens de playlist e jobs retomados
+        self.on_queued = on_queued or _noop
+
+        self.config_file = self.app_data_path / "downloader_config.json"
+        self.downloads_path = get_default_downloads_path()
+        # Histórico completo, somente inserção, fora do arquivo de configurações
+        self.history = HistoryStore(self.app_data_path / "history.db")
+        # Estados dos jobs gravados em disco para retomar após uma queda
+        self.journal = JobJournal(self.app_data_path / "jobs.jsonl")
+        self._shutting_down = False
+        self.dedup = None
+        self.postprocessor = None
+        self.max_concurrent_downloads = 3
+        # Limite de atualizações de progresso por segundo, por job
+        self.progress_rate_hz = 10
+        # Pula vídeos já baixados no mesmo tipo e qualidade
+        self.skip_downloaded = True
+        # Arquivo opcional de download_archive do yt-dlp, usado só para leitura
+        self.download_archive = None
+        # Limite total de banda em bytes/s, dividido entre os jobs ativos (None = sem limite)
+        self.rate_limit = None
+        # Fragmentos HLS/DASH baixados em paralelo por job
+        self.concurrent_fragment_downloads = 4
+        # Tamanho dos pedaços HTTP em bytes e velocidade abaixo da qual o yt-dlp
+        # considera o download estrangulado e reconecta (None = padrão do yt-dlp)
+        self.http_chunk_size = None
+        self.throttled_rate_limit = None
+        # Limite de tempo por job em segundos (None = sem limite) e novas
+        # tentativas para falhas temporárias (rede, 429, 5xx, 403)
+        self.job_timeout = None
+        self.max_retries = 3
+        # Porta local do endpoint de métricas (None = desligado)
+        self.metrics_port = None
+        # Pasta para os streams brutos e junções (None = a própria pasta de
+        # destino), espaço mínimo mantido livre e pré-alocação da saída
+        self.temp_path = None
+        self.min_free_space = DEFAULT_MIN_FREE
+        self.preallocate = False
+        # Ingestão sem a interface: pasta observada e porta local da caixa de
+        # entrada HTTP (None = desligadas), limite de jobs pendentes na fila e
+        # tipo e qualidade das URLs sem marcações (nomes curtos, como na CLI)
+        self.ingest_dir = None
+        self.ingest_port = None
+        self.ingest_max_pending = 200
+        self.ingest_type = 'mp4'
+        self.ingest_quality = 'default'
+        # Conversão de áudio em fluxo: os bytes vão da rede direto para o FFmpeg
+        self.stream_audio = True
+        # Arquivos auxiliares baixados junto com a mídia: miniatura, legendas
+        # nos idiomas da lista e info.json. Com embed_sidecars, miniatura,
+        # legendas e metadados também são incorporados ao arquivo final
+        self.write_thumbnail = False
+        self.subtitle_langs = []
+        self.write_info_json = False
+        self.embed_sidecars = False
+        self.config_lock = threading.Lock()
+        self._batch_lock = threading.Lock()
+        self._active_batches = 0
+
+        # Resultados de extract_info compartilhados entre a prévia e o download
+        self.metadata_cache = MetadataCache(store_path=self.app_data_path / "metadata_cache")
+        # Instâncias do yt-dlp reaproveitadas entre jobs (conexões, cookies, player)
+        self.ydl_pool = YoutubeDLPool(self.create_ydl, keep_on=(JobRetry,))
+        self.progress = ProgressAggregator(self._emit_progress, rate_hz=self.progress_rate_hz)
+        self.bandwidth = BandwidthScheduler(self.rate_limit)
+        self.disk = DiskSpaceAdmission(self.min_free_space, self.preallocate)
+        # Espera entre tentativas, disjuntor e limite de extrações por host
+        self.retry = RetryEngine()
+        self.metrics = MetricsRegistry()
+        self.metrics_server = None
+        # Uma porta ocupada é tentada uma vez por sessão, não a cada submit()
+        self._metrics_failed = False
+        self.sidecar_stage = None
+        self.ingest = None
+        self._ingest_failed = False
+        self.orchestrator = None
+        self.download_queue = None
+        self._warm_up_future = None
+
+    def start(self, max_workers=None, resume=True):
+        """
+        Cria o pool de workers que atende a fila de downloads. `max_workers`
+        substitui o valor configurado apenas nesta execução. Com `resume`,
+        os jobs interrompidos na execução anterior voltam para a fila.
+        """
+        if self.dedup is None:
+            self.dedup = DedupIndex(archive_path=self.download_archive)
+            # start() roda na thread da interface: o histórico inteiro é lido em segundo plano
+            self.dedup.load_history_async(self.history)
+            self.dedup.load_archive()
+        if self.postprocessor is None:
+            self.postprocessor = PostProcessStage()
+        if self.sidecar_stage is None:
+            self.sidecar_stage = SidecarStage()
+        if self.metrics_port and self.metrics_server is None and not self._metrics_failed:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, self.metrics_port).start()
+                self.log_message(f"Métricas disponíveis em {self.metrics_server.address}/metrics")
+            except OSError as e:
+                self._metrics_failed = True
+                self.log_message(f"AVISO: Não foi possível abrir o endpoint de métricas: {e}")
+        if self.orchestrator is None:
+            self.orchestrator = Orchestrator()
+        if self.download_queue is None:
+            self.download_queue = DownloadQueue(self._do_download, self.orchestrator,
+                                                max_workers or self.max_concurrent_downloads,
+                                                on_finished=self._job_finished, job_timeout=self.job_timeout,
+                                                on_submitted=lambda job: self.on_queued(job))
+            if resume:
+                self._resume_journal()
+        if (self.ingest_dir or self.ingest_port) and self.ingest is None and not self._ingest_failed:
+            from ingest import IngestService
+            try:
+                self.ingest = IngestService(self, watch_dir=self.ingest_dir, port=self.ingest_port,
+                                            max_pending=self.ingest_max_pending, default_type=self.ingest_type,
+                                            default_quality=self.ingest_quality).start()
+                if self.ingest_dir:
+                    self.log_message(f"Observando a pasta de URLs: {self.ingest_dir}")
+                if self.ingest.address:
+                    self.log_message(f"Caixa de entrada de URLs em {self.ingest.address}/urls")
+            except OSError as e:
+                self._ingest_failed = True
+                self.log_message(f"AVISO: Não foi possível iniciar a ingestão de URLs: {e}")
+
+    def _resume_journal(self):
+        try:
+            entries = self.journal.pending()
+        except Exception as e:
+            logging.exception("Erro ao ler o diário de jobs: %s", e)
+            return
+        jobs = [DownloadJob(entry['url'], entry['download_type'], entry['quality'],
+                            output_path=Path(entry['output_path']) if entry.get('output_path') else self.downloads_path,
+                            force=entry.get('force', False), priority=entry.get('priority', 0))
+                for entry in entries]
+        # O diário é compactado: só os jobs retomados, já com os novos IDs
+        self.journal.rewrite(jobs)
+        if jobs:
+            self.log_message(f"{len(jobs)} download(s) interrompido(s) retomado(s).")
+        for job in jobs:
+            self.download_queue.submit(job)
+
+    def _job_finished(self, job):
+        # Jobs interrompidos pelo encerramento do app ficam pendentes no diário
+        if not (self._shutting_down and job.status == 'cancelled'):
+            self.journal.record(job, job.status)
+        self.metrics.finish(job)
+        self.on_finished(job)
+
+    def load_config(self):
+        """
+        Carrega as configurações salvas. Em caso de erro, mantém o caminho
+        padrão e propaga a exceção para quem chamou.
+        """
+        try:
+            if self.config_file.exists():
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+
+                # Pega o caminho salvo. Se não existir, usa o padrão do sistema.
+                saved_path_str = config.get('downloads_path')
+                if saved_path_str:
+                    self.downloads_path = Path(saved_path_str)
+                else:
+                    self.downloads_path = get_default_downloads_path()
+
+                legacy_history = config.get('history')
+                self.max_concurrent_downloads = config.get('max_concurrent_downloads', self.max_concurrent_downloads)
+                self.progress_rate_hz = config.get('progress_rate_hz', self.progress_rate_hz)
+                self.progress.rate_hz = self.progress_rate_hz
+                self.skip_downloaded = config.get('skip_downloaded', self.skip_downloaded)
+                self.download_archive = config.get('download_archive', self.download_archive)
+                self.rate_limit = config.get('rate_limit', self.rate_limit)
+                self.bandwidth.set_total_rate(self.rate_limit)
+                self.concurrent_fragment_downloads = config.get('concurrent_fragment_downloads',
+                                                                self.concurrent_fragment_downloads)
+                self.http_chunk_size = config.get('http_chunk_size', self.http_chunk_size)
+                self.throttled_rate_limit = config.get('throttled_rate_limit', self.throttled_rate_limit)
+                self.job_timeout = config.get('job_timeout', self.job_timeout)
+                self.max_retries = config.get('max_retries', self.max_retries)
+                self.metrics_port = config.get('metrics_port', self.metrics_port)
+                self.temp_path = config.get('temp_path', self.temp_path)
+                self.min_free_space = config.get('min_free_space', self.min_free_space)
+                self.preallocate = config.get('preallocate', self.preallocate)
+                self.ingest_dir = config.get('ingest_dir', self.ingest_dir)
+                self.ingest_port = config.get('ingest_port', self.ingest_port)
+                self.ingest_max_pending = config.get('ingest_max_pending', self.ingest_max_pending)
+                self.ingest_type = config.get('ingest_type', self.ingest_type)
+                self.ingest_quality = config.get('ingest_quality', self.ingest_quality)
+                self.stream_audio = config.get('stream_audio', self.stream_audio)
+                self.write_thumbnail = config.get('write_thumbnail', self.write_thumbnail)
+                self.subtitle_langs = config.get('subtitle_langs', self.subtitle_langs)
+                self.write_info_json = config.get('write_info_json', self.write_info_json)
+                self.embed_sidecars = config.get('embed_sidecars', self.embed_sidecars)
+                self.retry.base_delay = config.get('retry_base_delay', self.retry.base_delay)
+                self.retry.max_delay = config.get('retry_max_delay', self.retry.max_delay)
+                self.retry.extraction_rate = config.get('extraction_rate', self.retry.extraction_rate)
+                self.retry.extraction_burst = config.get('extraction_burst', self.retry.extraction_burst)
+                self.retry.breaker_threshold = config.get('breaker_threshold', self.retry.breaker_threshold)
+                self.retry.breaker_cooldown = config.get('breaker_cooldown', self.retry.breaker_cooldown)
+                self.disk.min_free = self.min_free_space
+                self.disk.preallocate = self.preallocate
+                if legacy_history is not None:
+                    self._migrate_legacy_history(legacy_history)
+            else:
+                # Se o arquivo de config nem existe, garante que o padrão do sistema seja usado.
+                self.downloads_path = get_default_downloads_path()
+        except Exception as e:
+            logging.exception("Erro ao carregar configurações: %s", e)
+            # Em caso de erro, também recorre ao caminho padrão seguro.
+            self.downloads_path = get_default_downloads_path()
+            raise
+
+    def save_config(self):
+        config = {
+            'downloads_path': str(self.downloads_path),
+            'max_concurrent_downloads': self.max_concurrent_downloads,
+            'progress_rate_hz': self.progress_rate_hz,
+            'skip_downloaded': self.skip_downloaded,
+            'download_archive': self.download_archive,
+            'rate_limit': self.rate_limit,
+            'concurrent_fragment_downloads': self.concurrent_fragment_downloads,
+            'http_chunk_size': self.http_chunk_size,
+            'throttled_rate_limit': self.throttled_rate_limit,
+            'job_timeout': self.job_timeout,
+            'max_retries': self.max_retries,
+            'metrics_port': self.metrics_port,
+            'temp_path': self.temp_path,
+            'min_free_space': self.min_free_space,
+            'preallocate': self.preallocate,
+            'ingest_dir': self.ingest_dir,
+            'ingest_port': self.ingest_port,
+            'ingest_max_pending': self.ingest_max_pending,
+            'ingest_type': self.ingest_type,
+            'ingest_quality': self.ingest_quality,
+            'stream_audio': self.stream_audio,
+            'write_thumbnail': self.write_thumbnail,
+            'subtitle_langs': self.subtitle_langs,
+            'write_info_json': self.write_info_json,
+            'embed_sidecars': self.embed_sidecars,
+            'retry_base_delay': self.retry.base_delay,
+            'retry_max_delay': self.retry.max_delay,
+            'extraction_rate': self.retry.extraction_rate,
+            'extraction_burst': self.retry.extraction_burst,
+            'breaker_threshold': self.retry.breaker_threshold,
+            'breaker_cooldown': self.retry.breaker_cooldown
+        }
+        # Vários workers podem concluir ao mesmo tempo
+        with self.config_lock:
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+
+    def _migrate_legacy_history(self, items):
+        """
+        Move o histórico que ficava em downloader_config.json para o banco
+        de histórico e regrava as configurações sem ele.
+        """
+        if items and self.history.count() == 0:
+            imported = self.history.import_legacy(items)
+            logging.info(f"{imported} item(ns) do histórico antigo importados.")
+        self.save_config()
+
+    def add_to_history(self, job, info=None):
+        info = info or {}
+        try:
+            self.history.add(
+                job.title or info.get('title') or job.url,
+                job.download_type,
+                quality=job.quality,
+                extractor=info.get('extractor_key'),
+                video_id=info.get('id'),
+                url=info.get('webpage_url') or job.url,
+                filepath=job.filepath,
+            )
+        except Exception as e:
+            logging.exception("Erro ao gravar o histórico: %s", e)
+            self.on_error("Erro", f"Erro ao gravar o histórico: {e}")
+
+    def log_message(self, message):
+        logging.info(message)
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.on_log(f"[{timestamp}] {message}")
+
+    def set_max_workers(self, value):
+        self.max_concurrent_downloads = value
+        if self.download_queue:
+            self.download_queue.set_max_workers(value)
+
+    def set_rate_limit(self, rate_limit):
+        """Altera o limite total de banda (bytes/s), valendo já para os downloads em andamento."""
+        self.rate_limit = rate_limit or None
+        self.bandwidth.set_total_rate(self.rate_limit)
+
+    def submit(self, url, download_type, quality, output_path=None, force=False, priority=0):
+        """
+        Adiciona uma URL à fila e retorna o job criado. Sem `output_path`,
+        o arquivo vai para a pasta de downloads configurada. Com `force`,
+        baixa mesmo que o vídeo já conste como baixado. Jobs de maior
+        `priority` começam antes.
+        """
+        self.start()
+        job = DownloadJob(url, download_type, quality, output_path=output_path or self.downloads_path, force=force,
+                          priority=priority)
+        self.journal.record(job, 'queued')
+        self.download_queue.submit(job)
+        self.log_message(f"Download #{job.id} adicionado à fila: {url}")
+        return job
+
+    def cancel_all(self):
+        if self.download_queue:
+            self.download_queue.cancel_all()
+
+    def run_background(self, fn, *args, timeout=None):
+        """
+        Roda uma chamada bloqueante (ex: get_video_info) no executor de
+        extrações do orquestrador e retorna um concurrent.futures.Future.
+        """
+        self.start()
+        return self.orchestrator.run_blocking(fn, *args, timeout=timeout)
+
+    def warm_up(self):
+        """
+        Carrega o yt-dlp em segundo plano, uma única vez, para que a primeira
+        prévia ou download não espere a importação. Retorna o Future.
+        """
+        if self._warm_up_future is None:
+            self._warm_up_future = self.run_background(self._load_yt_dlp)
+        return self._warm_up_future
+
+    def _load_yt_dlp(self):
+        count = load_extractors()
+        # A tabela de padrões de URL dos extratores também é montada só uma vez
+        self.metadata_cache.prepare()
+        return count
+
+    def is_idle(self):
+        """Indica se não há jobs na fila nem playlists sendo enumeradas."""
+        with self._batch_lock:
+            if self._active_batches:
+                return False
+        return not self.download_queue or not self.download_queue.jobs()
+
+    def wait(self, poll_interval=0.2):
+        """Bloqueia até a fila esvaziar."""
+        while not self.is_idle():
+            time.sleep(poll_interval)
+
+    def shutdown(self):
+        self._shutting_down = True
+        if self.ingest:
+            self.ingest.stop()
+            self.ingest = None
+        if self.download_queue:
+            self.download_queue.shutdown()
+        if self.postprocessor:
+            self.postprocessor.shutdown()
+        if self.sidecar_stage:
+            self.sidecar_stage.shutdown()
+        if self.orchestrator:
+            self.orchestrator.shutdown()
+        self.ydl_pool.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
+    def already_downloaded(self, job, extractor, video_id):
+        """Consulta o índice de duplicados (O(1), sem acesso à rede)."""
+        if job.force or not self.skip_downloaded:
+            return False
+        return self.dedup.contains(extractor, video_id, job.download_type, job.quality)
+
+    def _skip_job(self, job):
+        job.status = 'skipped'
+        self.log_message(f"Download #{job.id} ignorado: já baixado ({job.url})")
+        self._show_status(job, "Já baixado.", 100)
+
+    def create_ydl(self, params):
+        """
+        Cria o YoutubeDL usado pelo motor. Os extratores de `extra_extractors`
+        são registrados antes dos padrões, para não perder para o genérico.
+        O motor não chama isto direto: as instâncias vêm de `ydl_pool`.
+        """
+        import yt_dlp
+        if not self.extra_extractors:
+            return yt_dlp.YoutubeDL(params)
+        ydl = yt_dlp.YoutubeDL(params, auto_init=False)
+        for ie in self.extra_extractors:
+            # Instâncias: o yt-dlp só sabe instanciar por nome os extratores embutidos
+            ydl.add_info_extractor(ie())
+        ydl.add_default_info_extractors()
+        return ydl
+
+    def get_video_info(self, url):
+        """
+        Retorna as informações da URL, usando o cache de metadados.
+        Playlists não são enumeradas aqui.
+        """
+        info = self.metadata_cache.get(url)
+        if info is None:
+            # Extração sem processamento: playlists não são enumeradas aqui
+            params = {'quiet': True, 'extract_flat': 'in_playlist', 'lazy_playlist': True, **self.ydl_params}
+            with self.ydl_pool.acquire(params) as ydl:
+                info = self._extract(ydl, url)
+            if not is_batch_result(info):
+                self.metadata_cache.put(url, info)
+        return info
+
+    def _extract(self, ydl, url, job=None):
+        """
+        extract_info sem processamento, respeitando o limite de extrações do
+        host. As falhas de um job são registradas em _retry_or_fail; as da
+        prévia, aqui.
+        """
+        if not self.retry.throttle_extraction(url, job.cancel_event if job else None):
+            from yt_dlp.utils import DownloadError
+            raise DownloadError("Download cancelado pelo usuário")
+        try:
+            info = ydl.extract_info(url, download=False, process=False)
+        except Exception as e:
+            if job is None:
+                self.retry.record_failure(url, e)
+            raise
+        self.retry.record_success(url)
+        return info
+
+    def preview_text(self, url, download_type, quality):
+        """Extrai (ou busca no cache) as informações da URL e monta o texto de prévia."""
+        info = self.get_video_info(url)
+        return format_video_info(info, self.select_formats(info, download_type, quality))
+
+    @staticmethod
+    def select_formats(info, download_type, quality):
+        """
+        Escolhe os formatos de um vídeo já extraído para o tipo e a qualidade
+        informados. Retorna None se a lista de formatos não permitir escolher.
+        """
+        if not info or is_batch_result(info):
+            return None
+        profile = FormatProfile.from_choice(download_type, quality)
+        return select_formats(info.get('formats'), profile, info.get('duration'))
+
+    def set_file_modification_time(self, filepath):
+        """
+        Define a data de modificação de um arquivo para o horário atual.
+        """
+        try:
+            now = time.time()
+            os.utime(filepath, (now, now))
+            self.log_message(f"Timestamp do arquivo '{Path(filepath).name}' atualizado.")
+        except Exception as e:
+            self.log_message(f"AVISO: Falha ao atualizar o timestamp do arquivo: {e}")
+            logging.warning(f"Não foi possível atualizar o timestamp para {filepath}: {e}")
+
+    @staticmethod
+    def downloaded_filepath(result):
+        """
+        Retorna o caminho final do arquivo a partir do resultado de
+        process_ie_result. O yt-dlp atualiza 'filepath' em cada item de
+        'requested_downloads' depois do pós-processamento.
+        """
+        for download in reversed((result or {}).get('requested_downloads') or []):
+            if download.get('filepath'):
+                return download['filepath']
+        return (result or {}).get('filepath')
+
+    def _postprocessor_hook(self, job, d):
+        """
+        Hook chamado a cada etapa de pós-processamento.
+        Registra no job o caminho do arquivo final.
+        """
+        # O status 'finished' aqui se refere ao pós-processamento
+        if d['status'] == 'finished':
+            filepath = (d.get('info_dict') or {}).get('filepath')
+            if filepath:
+                job.filepath = filepath
+                self.log_message(f"Pós-processamento {d.get('postprocessor')} concluído: {Path(filepath).name}")
+
+    def _do_download(self, job):
+        # Esta função roda em uma das threads do pool de workers
+        import yt_dlp
+        url = job.url
+        try:
+            self.log_message(f"Iniciando download #{job.id}: {url}")
+            self.journal.record(job, 'running')
+            self._show_status(job, "Iniciando download...", 0)
+
+            # Verificação prévia pela URL, antes de qualquer extração
+            resolved = self.metadata_cache.resolve_url(url)
+            if resolved and self.already_downloaded(job, *resolved):
+                self._skip_job(job)
+                return
+
+            # Com o disjuntor do host aberto, o job espera sem fazer pedidos
+            wait = self.retry.wait_for_host(url)
+            if wait:
+                self.log_message(f"Servidor {host_of(url)} suspenso; download #{job.id} aguarda {wait:.0f}s.")
+                self._show_status(job, "Aguardando o servidor...", 0)
+                raise JobRetry("Host suspenso", delay=wait, consume_attempt=False)
+
+            ydl_opts = build_ydl_opts(job.download_type, job.quality, job.output_path, get_ffmpeg_path())
+            ydl_opts['concurrent_fragment_downloads'] = self.concurrent_fragment_downloads
+            if self.http_chunk_size:
+                ydl_opts['http_chunk_size'] = self.http_chunk_size
+            if self.throttled_rate_limit:
+                ydl_opts['throttledratelimit'] = self.throttled_rate_limit
+            ydl_opts.update(self.ydl_params)
+            # Conversões e junções não rodam no worker: ficam para a etapa de pós-processamento
+            audio_pp = next((pp for pp in ydl_opts['postprocessors'] if pp['key'] == 'FFmpegExtractAudio'), None)
+            ydl_opts['postprocessors'] = []
+            ydl_opts['progress_hooks'] = [partial(self._download_progress_hook, job)]
+            ydl_opts['postprocessor_hooks'] = [partial(self._postprocessor_hook, job)]
+
+            with self.ydl_pool.acquire(ydl_opts, job.cancel_event) as ydl:
+                # Reaproveita a extração feita pela prévia ou por uma tentativa anterior
+                with self.metrics.span(job, 'extraction'):
+                    info = self.metadata_cache.get(url)
+                    from_cache = info is not None
+                    if not from_cache:
+                        info = self._extract(ydl, url, job)
+                if not from_cache:
+                    if is_batch_result(info):
+                        # A enumeração roda em um executor próprio: libera este worker e não atrasa as prévias
+                        with self._batch_lock:
+                            self._active_batches += 1
+                        # A playlist só é concluída ao fim da enumeração
+                        self.download_queue.detach(job)
+                        self.orchestrator.run_blocking(self._expand_batch, job, info,
+                                                       executor=self.orchestrator.enumeration_executor)
+                        return
+                    self.metadata_cache.put(url, info)
+                title = info.get('title', 'unknown_title')
+                job.title = title
+                if self.already_downloaded(job, info.get('extractor_key'), info.get('id')):
+                    self._skip_job(job)
+                    return
+
+                if job.cancel_event.is_set():
+                    job.status = 'cancelled'
+                    self.log_message(f"Download #{job.id} cancelado pelo usuário.")
+                    self._show_status(job, "Download cancelado.", 0)
+                    return
+
+                # Os streams são baixados sem extrair as informações novamente
+                self.bandwidth.register(job)
+                try:
+                    plan = self._download_media(job, ydl, ydl_opts, info, audio_pp)
+                except yt_dlp.DownloadError:
+                    if not from_cache or job.cancel_event.is_set():
+                        raise
+                    # As URLs de mídia em cache podem ter expirado; extrai de novo uma única vez
+                    self.log_message(f"Informações em cache inválidas para #{job.id}, extraindo novamente...")
+                    self.metadata_cache.invalidate(url)
+                    with self.metrics.span(job, 'extraction'):
+                        info = self._extract(ydl, url, job)
+                    self.metadata_cache.put(url, info)
+                    plan = self._download_media(job, ydl, ydl_opts, info, audio_pp)
+
+            task, final_path, raw_paths = plan
+            if self.embed_sidecars and job.sidecars is not None and final_path:
+                # A incorporação roda na etapa de pós-processamento, depois da junção ou conversão
+                task = partial(self._embed_sidecars, job, info, task, final_path, audio_pp is not None)
+            if task is None:
+                job.filepath = final_path or job.filepath
+                self._finalize_job(job, info)
+                return
+
+            # O worker segue para a próxima URL; o job termina no pós-processamento
+            job.status = 'postprocessing'
+            self.journal.record(job, 'postprocessing')
+            self.download_queue.detach(job)
+            self._show_status(job, "Aguardando pós-processamento...", 100)
+            self.postprocessor.submit(partial(self._run_postprocessing, job, task),
+                                      partial(self._finish_postprocessing, job, info, final_path, raw_paths))
+
+        except yt_dlp.DownloadError as e:
+            # Verifica se o erro foi, na verdade, um cancelamento do usuário
+            if job.timed_out:
+                self.log_message(f"Download #{job.id} excedeu o tempo limite e foi interrompido.")
+                self._show_status(job, "Tempo limite excedido.", 0)
+            elif job.cancel_event.is_set():
+                job.status = 'cancelled'
+                self.log_message(f"Download #{job.id} foi cancelado pelo usuário.")
+                self._show_status(job, "Download cancelado.", 0)
+            elif is_disk_full(e):
+                job.status = 'error'
+                self.metrics.record_error(job, e)
+                self._report_disk_full(job)
+            else:
+                self._retry_or_fail(job, e)
+
+        except JobRetry:
+            raise
+
+        except InsufficientSpaceError as e:
+            job.status = 'error'
+            self.metrics.record_error(job, e)
+            self.log_message(f"Download #{job.id} recusado: espaço insuficiente em disco ({e}).")
+            self.on_error("Espaço Insuficiente", f"{url}\n\nNão há espaço em disco para este download: {e}")
+            self._show_status(job, "Sem espaço em disco.", 0)
+
+        except Exception as e:
+            job.status = 'error'
+            self.metrics.record_error(job, e)
+            if is_disk_full(e):
+                self._report_disk_full(job)
+            else:
+                tb = traceback.format_exc()
+                error_msg = f"Ocorreu um erro inesperado: {e}"
+                logging.exception(error_msg)
+                self.on_error("Erro", f"{error_msg}\n{tb}")
+                self._show_status(job, "Erro inesperado.", 0)
+        finally:
+            self.bandwidth.unregister(job)
+            self.progress.finish(job)
+            # Jobs na etapa de pós-processamento mantêm a reserva até a junção terminar
+            if not job.detached:
+                self.disk.release(job)
+
+    def _retry_or_fail(self, job, error):
+        """
+        Devolve o job à fila se a falha for temporária e ainda houver
+        tentativas; senão, encerra o job com erro.
+        """
+        classification, delay = self.retry.on_failure(job.url, error, job.attempts)
+        if delay is not None and job.attempts <= self.max_retries:
+            if classification.kind == FORBIDDEN:
+                # Em geral, URLs de mídia expiradas: a próxima tentativa extrai de novo
+                self.metadata_cache.invalidate(job.url)
+            self.log_message(f"Falha temporária ({classification.kind}) no download #{job.id}, nova tentativa "
+                             f"em {delay:.0f}s ({job.attempts} de {self.max_retries + 1}): {error}")
+            self._show_status(job, "Aguardando nova tentativa...", 0)
+            self.metrics.record_retry(job)
+            raise JobRetry(str(error), delay=delay)
+        job.status = 'error'
+        self.metrics.record_error(job, error)
+        error_msg = f"Erro no download: {error}"
+        logging.exception(error_msg)
+        self.on_error("Erro de Download", f"{job.url}\n\n{error_msg}")
+        self._show_status(job, "Erro no download.", 0)
+
+    def _download_format(self, job, ydl, ydl_opts, info, format_id, outtmpl):
+        """Baixa um único formato, escolhido pelo format_id, com a instância do job e retorna o arquivo."""
+        part_opts = dict(ydl_opts)
+        part_opts['format'] = lambda ctx: [f for f in ctx['formats'] if f.get('format_id') == format_id][:1]
+        part_opts['outtmpl'] = {'default': outtmpl}
+        with self.metrics.span(job, 'download'), self.ydl_pool.reconfigured(ydl, part_opts):
+            result = ydl.process_ie_result(copy.deepcopy(info), download=True)
+        filepath = self.downloaded_filepath(result)
+        if filepath and os.path.exists(filepath):
+            self.metrics.add_bytes(job, os.path.getsize(filepath))
+        return filepath
+
+    def _download_media(self, job, ydl, ydl_opts, info, audio_pp):
+        """
+        Seleciona os formatos e baixa cada stream separadamente, sem
+        pós-processamento. Retorna (tarefa, arquivo final, arquivos brutos);
+        a tarefa é None quando o arquivo baixado já é o final.
+        """
+        with self.metrics.span(job, 'format_selection'):
+            selection = self.select_formats(info, job.download_type, job.quality)
+            if selection is not None:
+                size = format_bytes(selection.estimated_size) if selection.estimated_size else "desconhecido"
+                self.log_message(f"Formatos de #{job.id}: {selection.describe()}, tamanho estimado {size}")
+                # IDs concretos: o yt-dlp não precisa reavaliar a especificação de qualidade
+                ydl_opts = {**ydl_opts, 'format': selection.format_spec}
+                with self.ydl_pool.reconfigured(ydl, ydl_opts):
+                    selected = ydl.process_ie_result(copy.deepcopy(info), download=False)
+            else:
+                selected = ydl.process_ie_result(copy.deepcopy(info), download=False)
+            parts = selected.get('requested_formats') or [selected]
+            target_ext = audio_pp['preferredcodec'] if audio_pp else selected.get('ext')
+            final_path = Path(ydl.prepare_filename(selected)).with_suffix(f".{target_ext}")
+
+        single_file = len(parts) == 1 and (not audio_pp or parts[0].get('ext') == target_ext)
+        streaming = self.stream_audio and audio_pp and not single_file and len(parts) == 1 \
+            and can_stream_audio(parts[0])
+        stream_bytes = sum(estimate_size(part, info.get('duration')) or 0 for part in parts)
+        ffmpeg_path = ydl_opts['ffmpeg_location']
+        if audio_pp:
+            codec = audio_pp['preferredcodec']
+            # AAC em .m4a só precisa ser remuxado, sem recodificar
+            copy_stream = codec == 'm4a' and (parts[0].get('acodec') or '').startswith('mp4a')
+
+        if streaming:
+            # Só o arquivo final é gravado (e a cópia da incorporação, se houver)
+            self._admit(job, stream_bytes, self.embed_sidecars, final_path)
+            self._start_sidecars(job, ydl_opts, info)
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                with self.metrics.span(job, 'download'):
+                    stream_audio(ffmpeg_path, self._stream_chunks(job, ydl, parts[0]), final_path, codec,
+                                 audio_pp.get('preferredquality'), copy_stream=copy_stream)
+                self.log_message(f"Áudio convertido em fluxo: {final_path.name}")
+                return None, str(final_path), []
+            except PostProcessingError as e:
+                # Ex: contêiner que o FFmpeg não consegue ler em sequência
+                self.log_message(f"Conversão em fluxo de #{job.id} falhou ({e}); baixando o arquivo completo.")
+
+        self._admit(job, stream_bytes, not single_file or self.embed_sidecars, final_path)
+        # Miniatura, legendas e info.json saem das mesmas informações, em paralelo com a mídia
+        self._start_sidecars(job, ydl_opts, info)
+        work_dir = Path(self.temp_path) if self.temp_path else Path(job.output_path)
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+        if single_file:
+            if not self.temp_path:
+                filepath = self._download_format(job, ydl, ydl_opts, info, parts[0]['format_id'],
+                                                 ydl_opts['outtmpl']['default'])
+                return None, filepath, []
+            # Baixa na pasta temporária e só move para o destino quando completo
+            filepath = self._download_format(job, ydl, ydl_opts, info, parts[0]['format_id'],
+                                             str(work_dir / '%(title)s.%(ext)s'))
+            if filepath and os.path.exists(filepath):
+                target = Path(job.output_path) / Path(filepath).name
+                shutil.move(filepath, target)
+                filepath = str(target)
+            return None, filepath, []
+
+        raw_template = str(work_dir / '%(title)s.f%(format_id)s.%(ext)s')
+        raw_paths = []
+        for part in parts:
+            if job.cancel_event.is_set():
+                from yt_dlp.utils import DownloadError
+                raise DownloadError("Download cancelado pelo usuário")
+            raw_paths.append(self._download_format(job, ydl, ydl_opts, info, part['format_id'], raw_template))
+
+        if audio_pp:
+            task = partial(extract_audio, ffmpeg_path, raw_paths[0], final_path, codec,
+                           audio_pp.get('preferredquality'), copy_stream=copy_stream)
+        else:
+            video_index = next((i for i, part in enumerate(parts) if part.get('vcodec') not in (None, 'none')), 0)
+            video_path = raw_paths[video_index]
+            audio_path = raw_paths[1 - video_index]
+            task = partial(merge_streams, ffmpeg_path, video_path, audio_path, final_path)
+        return task, final_path, raw_paths
+
+    def _start_sidecars(self, job, ydl_opts, info):
+        """
+        Agenda a busca dos arquivos auxiliares pedidos; o Future fica em
+        job.sidecars. Uma busca de tentativa anterior do mesmo job, em
+        andamento ou concluída, é reaproveitada: só as que falharam são
+        refeitas.
+        """
+        future = job.sidecars
+        if future is not None and not (future.done() and (future.cancelled() or future.exception())):
+            return
+        params = sidecar_params(ydl_opts, thumbnail=self.write_thumbnail or self.embed_sidecars,
+                                subtitle_langs=self.subtitle_langs, info_json=self.write_info_json)
+        job.sidecars = self.sidecar_stage.submit(self._fetch_sidecars, params, info) if params else None
+
+    def _fetch_sidecars(self, params, info):
+        # skip_download: o yt-dlp grava só miniatura, legendas e info.json
+        with self.ydl_pool.acquire(params) as ydl:
+            result = ydl.process_ie_result(copy.deepcopy(info), download=True)
+            info_json = ydl.prepare_filename(result, 'infojson') if params['writeinfojson'] else None
+        return collect(result, info_json)
+
+    def _wait_sidecars(self, job):
+        """Espera os arquivos auxiliares do job. Uma falha neles não derruba o download."""
+        future, job.sidecars = job.sidecars, None
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=SIDECAR_TIMEOUT)
+        except Exception as e:
+            self.log_message(f"AVISO: Arquivos auxiliares de #{job.id} não foram baixados: {e}")
+            return None
+
+    def _embed_sidecars(self, job, info, task, media, audio_only):
+        if task is not None:
+            task()
+        sidecars = self._wait_sidecars(job)
+        thumbnail = sidecars.thumbnail if sidecars else None
+        subtitles = sidecars.subtitles if sidecars else {}
+        try:
+            if embed_sidecars(get_ffmpeg_path(), media, thumbnail=thumbnail, subtitles=subtitles,
+                              metadata=metadata_tags(info), audio_only=audio_only):
+                self.log_message(f"Miniatura, legendas e metadados incorporados a {Path(media).name}")
+        except PostProcessingError as e:
+            # A mídia já está pronta; só a incorporação se perde
+            self.log_message(f"AVISO: Não foi possível incorporar os arquivos auxiliares a #{job.id}: {e}")
+        # A miniatura só fica como arquivo se foi pedida também como arquivo
+        if thumbnail and not self.write_thumbnail:
+            Path(thumbnail).unlink(missing_ok=True)
+            sidecars.thumbnail = None
+        if sidecars:
+            names = ', '.join(Path(path).name for path in sidecars.paths())
+            self.log_message(f"Arquivos auxiliares de #{job.id}: {names}")
+
+    def _stream_chunks(self, job, ydl, fmt):
+        """
+        Lê o formato direto da rede, pelo YoutubeDL (cookies, proxy e
+        cabeçalhos), em blocos. Progresso, limite de banda e cancelamento
+        passam pelo mesmo progress hook dos downloads comuns.
+        """
+        from yt_dlp.networking import Request
+        from yt_dlp.networking.exceptions import HTTPError, RequestError
+        from yt_dlp.utils import DownloadError
+
+        headers = dict(fmt.get('http_headers') or {})
+        # Pedidos por faixas evitam o estrangulamento de conexões longas (ex: YouTube)
+        chunk_size = (fmt.get('downloader_options') or {}).get('http_chunk_size') or self.http_chunk_size
+        total = fmt.get('filesize') or fmt.get('filesize_approx')
+        downloaded = 0
+        try:
+            while True:
+                if chunk_size:
+                    headers['Range'] = f"bytes={downloaded}-{downloaded + chunk_size - 1}"
+                try:
+                    response = ydl.urlopen(Request(fmt['url'], headers=headers))
+                except HTTPError as e:
+                    if e.status == 416 and downloaded:
+                        # A faixa anterior terminou exatamente no fim do arquivo
+                        break
+                    raise
+                received = 0
+                with response:
+                    while True:
+                        block = response.read(STREAM_BLOCK_SIZE)
+                        if not block:
+                            break
+                        received += len(block)
+                        downloaded += len(block)
+                        self._download_progress_hook(job, {'status': 'downloading', 'downloaded_bytes': downloaded,
+                                                           'total_bytes': total})
+                        yield block
+                # Faixa incompleta (fim do arquivo) ou servidor que ignorou o Range
+                if not chunk_size or received != chunk_size:
+                    break
+        except RequestError as e:
+            raise DownloadError(f"Erro ao baixar o áudio: {e}", exc_info=sys.exc_info()) from e
+        self.metrics.add_bytes(job, downloaded)
+
+    def _admit(self, job, stream_bytes, postprocess, final_path):
+        """
+        Reserva o espaço em disco do job antes de baixar. Se outros jobs
+        ocupam o espaço que falta, o job volta para a fila e espera.
+        """
+        if not stream_bytes:
+            self.log_message(f"Tamanho de #{job.id} desconhecido: baixando sem reserva de espaço.")
+            return
+        needs = DiskSpaceAdmission.required(stream_bytes, job.output_path, self.temp_path, postprocess)
+        paths = [job.output_path] + ([self.temp_path] if self.temp_path else [])
+        if not self.disk.try_admit(job, needs, paths):
+            self.log_message(f"Download #{job.id} aguardando espaço em disco ({format_bytes(sum(needs.values()))}).")
+            self._show_status(job, "Aguardando espaço em disco...", 0)
+            raise JobRetry("Aguardando espaço em disco", delay=DISK_WAIT_SECONDS, consume_attempt=False)
+        if postprocess:
+            # O arquivo final da junção ou conversão ocupa o espaço até o ffmpeg começar
+            reserve = final_path.with_name(f".{final_path.name}.reserve")
+            self.disk.reserve_file(job, reserve, int(stream_bytes * CONTAINER_OVERHEAD))
+
+    def _report_disk_full(self, job):
+        self.log_message(f"Download #{job.id} interrompido: disco cheio.")
+        self.on_error("Disco Cheio", f"{job.url}\n\nO disco ficou sem espaço durante o download. "
+                                     f"Libere espaço e tente novamente.")
+        self._show_status(job, "Disco cheio.", 0)
+
+    def _run_postprocessing(self, job, task):
+        if job.cancel_event.is_set():
+            raise PostProcessingError("Download cancelado pelo usuário")
+        self.disk.drop_reserve_file(job)
+        self._show_status(job, "Processando...", 100)
+        self.log_message(f"Pós-processamento do download #{job.id} iniciado.")
+        with self.metrics.span(job, 'postprocess'):
+            task()
+
+    def _finish_postprocessing(self, job, info, final_path, raw_paths, error):
+        """Chamado pela etapa de pós-processamento ao término da tarefa do job."""
+        try:
+            self.disk.release(job)
+            if error is not None:
+                if job.cancel_event.is_set():
+                    job.status = 'cancelled'
+                    self.log_message(f"Download #{job.id} foi cancelado pelo usuário.")
+                    self._show_status(job, "Download cancelado.", 0)
+                elif is_disk_full(error):
+                    job.status = 'error'
+                    self.metrics.record_error(job, error)
+                    self._report_disk_full(job)
+                else:
+                    job.status = 'error'
+                    self.metrics.record_error(job, error)
+                    self.on_error("Erro de Pós-processamento", f"{job.url}\n\n{error}")
+                    self._show_status(job, "Erro no pós-processamento.", 0)
+                return
+
+            for raw_path in raw_paths:
+                if raw_path and os.path.exists(raw_path) and Path(raw_path) != Path(final_path):
+                    os.remove(raw_path)
+            job.filepath = str(final_path)
+            self.log_message(f"Pós-processamento concluído: {Path(final_path).name}")
+            self._finalize_job(job, info)
+            job.status = 'done'
+        except Exception as e:
+            job.status = 'error'
+            logging.exception("Erro ao concluir o download #%s", job.id)
+            self.on_error("Erro", f"Ocorreu um erro inesperado: {e}")
+        finally:
+            self.download_queue.complete(job)
+
+    def _finalize_job(self, job, info):
+        """Registra um download concluído: timestamp, histórico e índice de duplicados."""
+        with self.metrics.span(job, 'finalize'):
+            # O caminho vem dos próprios dados do yt-dlp; a pasta nunca é varrida
+            if job.filepath and os.path.exists(job.filepath):
+                self.log_message(f"Arquivo final: {job.filepath}")
+                self.set_file_modification_time(job.filepath)
+            else:
+                self.log_message("AVISO: O yt-dlp não informou o arquivo final para atualizar o timestamp.")
+            self.add_to_history(job, info)
+            self.dedup.add(info.get('extractor_key'), info.get('id'), job.download_type, job.quality)
+            # Também os jobs que usaram a extração em cache fecham o disjuntor do host
+            self.retry.record_success(job.url)
+            # Sem incorporação, os arquivos auxiliares terminam em paralelo e são esperados aqui
+            sidecars = self._wait_sidecars(job)
+            if sidecars:
+                names = ', '.join(Path(path).name for path in sidecars.paths())
+                self.log_message(f"Arquivos auxiliares de #{job.id}: {names}")
+
+        self.log_message(f"Download #{job.id} concluído: {job.title}")
+        self._show_status(job, "Download concluído!", 100)
+
+    def _expand_batch(self, job, info):
+        """
+        Percorre as entradas de uma playlist à medida que são descobertas e
+        envia cada uma para a fila como um job independente, com histórico
+        e resultado próprios.
+        """
+        playlist_title = info.get('title') or job.url
+        self.log_message(f"Playlist #{job.id} detectada: {playlist_title}")
+        count = skipped = 0
+        try:
+            for entry in info.get('entries') or []:
+                if job.cancel_event.is_set():
+                    self.log_message(f"Enumeração da playlist #{job.id} cancelada.")
+                    break
+                if not entry:
+                    continue
+                entry_url = entry.get('webpage_url') or entry.get('url')
+                if not entry_url:
+                    continue
+                # As entradas "planas" já trazem extrator e ID: nada é extraído para pular
+                if self.already_downloaded(job, entry.get('ie_key'), entry.get('id')):
+                    skipped += 1
+                    continue
+                child = DownloadJob(entry_url, job.download_type, job.quality,
+                                    output_path=job.output_path, parent_id=job.id, force=job.force,
+                                    priority=job.priority)
+                if entry.get('ie_key') and entry.get('id'):
+                    child.url_key = f"{entry['ie_key']}:{entry['id']}"
+                self.journal.record(child, 'queued')
+                self.download_queue.submit(child)
+                count += 1
+            job.status = 'cancelled' if job.cancel_event.is_set() else 'done'
+        except Exception as e:
+            job.status = 'error'
+            logging.exception("Erro ao enumerar a playlist %s", job.url)
+            self.log_message(f"Erro ao enumerar a playlist #{job.id}: {e}")
+        finally:
+            with self._batch_lock:
+                self._active_batches -= 1
+            self.download_queue.complete(job)
+        self.log_message(f"Playlist #{job.id}: {count} item(ns) adicionados à fila, {skipped} já baixado(s).")
+
+    def _show_status(self, job, message, progress):
+        """Mensagem de estado do job; o progresso retido pelo agregador não pode chegar depois dela."""
+        self.progress.clear_pending(job)
+        self.on_progress(job, message, progress)
+
+    def _emit_progress(self, job, snapshot):
+        """Recebe do agregador o estado mais recente de um job."""
+        if snapshot.percent is not None:
+            job.progress = snapshot.percent
+        self.on_progress(job, snapshot.message(), job.progress)
+
+    def _download_progress_hook(self, job, d):
+        # Chamado pelo yt-dlp a cada bloco/fragmento: deve ser barato
+        if job.cancel_event.is_set():
+            from yt_dlp.utils import DownloadError
+            raise DownloadError("Download cancelado pelo usuário")
+
+        if d['status'] == 'downloading':
+            self.progress.update(job, d)
+            self.bandwidth.throttle(job, d.get('downloaded_bytes'))
+        elif d['status'] == 'finished':
+            # Arquivo bruto; o pós-processamento pode substituí-lo depois
+            job.filepath = d.get('filename') or job.filepath
+            self._show_status(job, "Processando...", 100)
+            self.log_message(f"Concluído: {d['filename']}")
+        elif d['status'] == 'error':
+            self._show_status(job, "Erro no download.", 0)
+            self.log_message(f"Erro: {d['filename']}")
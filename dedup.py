@@ -0,0 +1,86 @@
+import logging
+import threading
+from pathlib import Path
+
+
+class DedupIndex:
+    """
+    Índice em memória dos downloads já concluídos, com chave
+    (extrator, ID do vídeo, tipo de download, qualidade).
+
+    É carregado uma vez a partir do histórico e, opcionalmente, de um
+    arquivo de download_archive do yt-dlp. Cada consulta é uma busca em
+    set, barata o bastante para filtrar playlists com dezenas de milhares
+    de itens antes de qualquer extração.
+
+    Com históricos grandes, a leitura pode rodar em segundo plano
+    (load_history_async); até ela terminar, as consultas vão ao histórico
+    pelo índice por vídeo.
+    """
+
+    def __init__(self, archive_path=None):
+        self._keys = set()
+        # Entradas do download_archive não informam tipo nem qualidade
+        self._archived = set()
+        self._lock = threading.Lock()
+        self.archive_path = Path(archive_path) if archive_path else None
+        # Histórico ainda em carregamento (None depois de carregado)
+        self._pending_history = None
+
+    @staticmethod
+    def _video_key(extractor, video_id):
+        return (str(extractor).lower(), str(video_id))
+
+    def load_from_history(self, history):
+        with self._lock:
+            for extractor, video_id, download_type, quality in history.download_keys():
+                self._keys.add(self._video_key(extractor, video_id) + (download_type, quality))
+        return len(self._keys)
+
+    def load_history_async(self, history):
+        """Carrega o histórico numa thread, sem bloquear quem chama (ex: a thread da interface)."""
+        self._pending_history = history
+
+        def load():
+            try:
+                count = self.load_from_history(history)
+                logging.debug("Índice de duplicados carregado: %d downloads", count)
+            except Exception:
+                logging.exception("Erro ao carregar o índice de duplicados")
+                return
+            self._pending_history = None
+
+        thread = threading.Thread(target=load, name='dedup-load', daemon=True)
+        thread.start()
+        return thread
+
+    def load_archive(self):
+        """
+        Lê o arquivo no formato do download_archive do yt-dlp ("extrator id"
+        por linha). Esses vídeos são pulados em qualquer formato; o arquivo
+        só é lido, nunca gravado.
+        """
+        if not self.archive_path or not self.archive_path.exists():
+            return 0
+        with open(self.archive_path, 'r', encoding='utf-8') as f:
+            entries = [line.split(maxsplit=1) for line in f if line.strip()]
+        with self._lock:
+            for entry in entries:
+                if len(entry) == 2:
+                    self._archived.add(self._video_key(entry[0], entry[1].strip()))
+        return len(self._archived)
+
+    def contains(self, extractor, video_id, download_type, quality):
+        if not extractor or not video_id:
+            return False
+        video_key = self._video_key(extractor, video_id)
+        if video_key + (download_type, quality) in self._keys or video_key in self._archived:
+            return True
+        history = self._pending_history
+        return history is not None and history.has_download(extractor, video_id, download_type, quality)
+
+    def add(self, extractor, video_id, download_type, quality):
+        if not extractor or not video_id:
+            return
+        with self._lock:
+            self._keys.add(self._video_key(extractor, video_id) + (download_type, quality))
@@ -0,0 +1,183 @@
+import errno
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from progress import format_bytes
+
+# Folga para o contêiner final em relação à soma dos streams
+CONTAINER_OVERHEAD = 1.05
+# Espaço mínimo mantido livre em cada volume, além das reservas
+DEFAULT_MIN_FREE = 512 * 1024 * 1024
+
+
+class InsufficientSpaceError(Exception):
+    """O job não cabe no disco, mesmo sem nenhum outro download em andamento."""
+
+
+def is_disk_full(error):
+    """Indica se a falha (ou a causa embrulhada pelo yt-dlp) foi falta de espaço em disco."""
+    exc_info = getattr(error, 'exc_info', None)
+    cause = exc_info[1] if exc_info and exc_info[1] is not None else error
+    seen = set()
+    while cause is not None and id(cause) not in seen:
+        seen.add(id(cause))
+        if isinstance(cause, OSError) and cause.errno == errno.ENOSPC:
+            return True
+        cause = cause.__cause__ or cause.__context__
+    return 'No space left on device' in str(error)
+
+
+def _existing_parent(path):
+    path = Path(path).absolute()
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return path
+
+
+def _volume(path):
+    return os.stat(_existing_parent(path)).st_dev
+
+
+def preallocate(path, size):
+    """
+    Cria `path` ocupando `size` bytes. No Linux usa posix_fallocate, que
+    garante os blocos; nos demais sistemas recorre a truncate, que no
+    NTFS também reserva o espaço.
+    """
+    with open(path, 'wb') as f:
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(f.fileno(), 0, size)
+        else:
+            f.truncate(size)
+
+
+class DiskReservation:
+    __slots__ = ('job_id', 'volumes', 'reserve_file', 'reserve_volume', 'reserve_size')
+
+    def __init__(self, job_id, volumes):
+        self.job_id = job_id
+        # {st_dev: bytes}
+        self.volumes = volumes
+        self.reserve_file = None
+        self.reserve_volume = None
+        self.reserve_size = 0
+
+
+class DiskSpaceAdmission:
+    """
+    Controle de admissão por espaço em disco.
+
+    Antes de baixar, cada job informa quanto vai ocupar em cada volume
+    (streams brutos na pasta temporária, arquivo final na de destino). O
+    job só é admitido se o espaço livre, descontadas as reservas dos jobs
+    em andamento e a folga mínima, comportar o pedido. Quando não cabe por
+    causa de outros jobs, ele espera; quando não cabe nem sozinho, falha
+    logo, em vez de encher o disco no meio de uma junção.
+
+    Com `preallocate`, o espaço do arquivo final de uma junção ou
+    conversão fica ocupado por um arquivo de reserva enquanto os streams
+    são baixados, e é liberado logo antes do ffmpeg começar.
+    """
+
+    def __init__(self, min_free=DEFAULT_MIN_FREE, preallocate=False):
+        self.min_free = min_free
+        self.preallocate = preallocate
+        self._reservations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def required(stream_bytes, final_dir, temp_dir=None, postprocess=False):
+        """
+        Bytes necessários por volume: {st_dev: bytes}. Com pós-processamento,
+        os streams brutos e o arquivo final coexistem até o fim da junção.
+        `stream_bytes` vem dos formatos extraídos (filesize/filesize_approx).
+        """
+        final_bytes = int(stream_bytes * CONTAINER_OVERHEAD)
+        volume = _volume(final_dir)
+        temp_volume = _volume(temp_dir) if temp_dir else volume
+        needs = {}
+        # Sem pós-processamento, o arquivo baixado é o final: só uma cópia,
+        # exceto quando precisa ser copiado de outro volume
+        if postprocess or temp_volume != volume:
+            needs[temp_volume] = stream_bytes
+        needs[volume] = needs.get(volume, 0) + final_bytes
+        return needs
+
+    def _reserved(self, volume, exclude=None):
+        return sum(reservation.volumes.get(volume, 0)
+                   for job_id, reservation in self._reservations.items() if job_id != exclude)
+
+    def _preallocated(self, volume, exclude=None):
+        # Arquivos de reserva já descontados do espaço livre informado pelo sistema
+        return sum(reservation.reserve_size for job_id, reservation in self._reservations.items()
+                   if job_id != exclude and reservation.reserve_volume == volume)
+
+    def try_admit(self, job, needs, paths):
+        """
+        Reserva o espaço de `needs` para o job. Retorna True se admitido e
+        False se deve esperar outros jobs. Lança InsufficientSpaceError se
+        não cabe nem com o disco só para ele.
+        """
+        free = {}
+        for path in paths:
+            volume = _volume(path)
+            if volume not in free:
+                free[volume] = shutil.disk_usage(_existing_parent(path)).free
+        with self._lock:
+            waiting = False
+            for volume, amount in needs.items():
+                # Os arquivos de reserva dos outros jobs fazem parte das reservas deles
+                available = free[volume] - self.min_free + self._preallocated(volume, exclude=job.id)
+                if amount > available:
+                    raise InsufficientSpaceError(
+                        f"necessário {format_bytes(amount)}, disponível {format_bytes(max(0, available))} "
+                        f"(mantendo {format_bytes(self.min_free)} livres)")
+                if amount > available - self._reserved(volume, exclude=job.id):
+                    waiting = True
+            if waiting:
+                return False
+            self._reservations[job.id] = DiskReservation(job.id, dict(needs))
+        return True
+
+    def reserve_file(self, job, path, size):
+        """Pré-aloca o arquivo de reserva do job, se a opção estiver ligada."""
+        if not self.preallocate or not size:
+            return None
+        with self._lock:
+            reservation = self._reservations.get(job.id)
+        if reservation is None:
+            return None
+        try:
+            preallocate(path, size)
+        except OSError as e:
+            Path(path).unlink(missing_ok=True)
+            logging.warning("Não foi possível pré-alocar %s: %s", path, e)
+            return None
+        with self._lock:
+            reservation.reserve_file = Path(path)
+            reservation.reserve_volume = _volume(path)
+            reservation.reserve_size = size
+        return reservation.reserve_file
+
+    def drop_reserve_file(self, job):
+        """Apaga o arquivo de reserva, liberando o espaço para o pós-processamento."""
+        with self._lock:
+            reservation = self._reservations.get(job.id)
+            reserve_file = reservation.reserve_file if reservation else None
+            if reservation:
+                reservation.reserve_file = None
+                reservation.reserve_size = 0
+        if reserve_file:
+            reserve_file.unlink(missing_ok=True)
+
+    def release(self, job):
+        self.drop_reserve_file(job)
+        with self._lock:
+            self._reservations.pop(job.id, None)
+
+    def reserved_bytes(self):
+        with self._lock:
+            return sum(sum(reservation.volumes.values()) for reservation in self._reservations.values())
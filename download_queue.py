@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+
+from orchestrator import JobRetry
+
+
+class DownloadJob:
+    """
+    Representa um download individual na fila.
+    Cada job tem seu próprio evento de cancelamento e seu próprio progresso.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, url, download_type, quality, output_path=None, parent_id=None, force=False, priority=0):
+        self.id = next(DownloadJob._ids)
+        self.parent_id = parent_id
+        self.url = url
+        self.download_type = download_type
+        self.quality = quality
+        self.output_path = output_path
+        self.cancel_event = threading.Event()
+        # Baixa mesmo que o vídeo já conste como baixado
+        self.force = force
+        # Jobs de maior prioridade saem da fila primeiro
+        self.priority = priority
+        self.status = 'queued'
+        self.attempts = 0
+        self.timed_out = False
+        self.progress = 0
+        self.title = None
+        # Caminho final do arquivo, informado pelos hooks do yt-dlp
+        self.filepath = None
+        # Marcado quando o job sai do worker e termina em outra etapa
+        self.detached = False
+        # Future dos arquivos auxiliares (miniatura, legendas, info.json), baixados junto com a mídia
+        self.sidecars = None
+        # Chave canônica da URL (ver MetadataCache.key_for_url), guardada por quem já a calculou
+        self.url_key = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def __repr__(self):
+        return f"<DownloadJob #{self.id} {self.status} {self.url}>"
+
+
+class DownloadQueue:
+    """
+    Fila de downloads com prioridade, agendada no laço do orquestrador.
+    Até `max_workers` jobs rodam ao mesmo tempo no executor de downloads;
+    os demais aguardam na fila sem ocupar threads. Com `job_timeout`, um
+    job que passa do limite é cancelado e termina com erro. Um handler que
+    lança JobRetry volta para a fila após uma espera exponencial.
+    """
+
+    def __init__(self, handler, orchestrator, max_workers=3, on_finished=None, job_timeout=None,
+                 retry_backoff=2.0, max_retry_delay=300, on_submitted=None):
+        self._handler = handler
+        self._orchestrator = orchestrator
+        self._on_finished = on_finished
+        self._on_submitted = on_submitted
+        self.job_timeout = job_timeout
+        self.retry_backoff = retry_backoff
+        self.max_retry_delay = max_retry_delay
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Estado abaixo só é acessado na thread do laço
+        self._pending = []
+        self._sequence = itertools.count()
+        self._retry_timers = {}
+        self._running = 0
+        self._closed = False
+        self.max_workers = max(1, int(max_workers))
+        orchestrator.reserve_download_threads(self.max_workers)
+
+    def set_max_workers(self, max_workers):
+        """
+        Ajusta quantos jobs rodam ao mesmo tempo. Ao reduzir, os jobs em
+        andamento terminam normalmente e os próximos esperam.
+        """
+        self.max_workers = max(1, int(max_workers))
+        self._orchestrator.reserve_download_threads(self.max_workers)
+        self._orchestrator.call_soon(self._dispatch)
+
+    def submit(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+        if self._on_submitted:
+            self._on_submitted(job)
+        self._orchestrator.call_soon(self._enqueue, job)
+        return job
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job:
+            job.cancel()
+            self._orchestrator.call_soon(self._drop_cancelled)
+        return job is not None
+
+    def cancel_all(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        self._orchestrator.call_soon(self._drop_cancelled)
+
+    def jobs(self):
+        """Retorna os jobs ativos e pendentes."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in ('running', 'postprocessing'))
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == 'queued')
+
+    def shutdown(self):
+        """Cancela todos os jobs e não inicia mais nenhum."""
+        self._closed = True
+        self.cancel_all()
+
+    def detach(self, job):
+        """
+        Libera o executor sem concluir o job, que continua sendo acompanhado
+        pela fila até alguém chamar complete() (ex: o pós-processamento).
+        """
+        job.detached = True
+
+    def complete(self, job):
+        """Conclui um job desanexado com detach()."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        if self._on_finished:
+            self._on_finished(job)
+
+    # Métodos abaixo rodam na thread do laço
+
+    def _enqueue(self, job):
+        self._retry_timers.pop(job.id, None)
+        heapq.heappush(self._pending, (-job.priority, next(self._sequence), job))
+        self._dispatch()
+
+    def _drop_cancelled(self):
+        """Conclui na hora os jobs cancelados que ainda não começaram."""
+        kept = []
+        for entry in self._pending:
+            job = entry[2]
+            if job.cancel_event.is_set():
+                job.status = 'cancelled'
+                self.complete(job)
+            else:
+                kept.append(entry)
+        heapq.heapify(kept)
+        self._pending = kept
+        for job_id, (job, timer) in list(self._retry_timers.items()):
+            if job.cancel_event.is_set():
+                timer.cancel()
+                del self._retry_timers[job_id]
+                job.status = 'cancelled'
+                self.complete(job)
+
+    def _dispatch(self):
+        while self._pending and self._running < self.max_workers:
+            job = heapq.heappop(self._pending)[2]
+            if job.cancel_event.is_set() or self._closed:
+                job.status = 'cancelled'
+                self.complete(job)
+                continue
+            self._running += 1
+            self._orchestrator.loop.create_task(self._run(job))
+
+    async def _run(self, job):
+        loop = self._orchestrator.loop
+        retry = None
+        try:
+            job.status = 'running'
+            job.attempts += 1
+            future = loop.run_in_executor(self._orchestrator.download_executor, self._handler, job)
+            try:
+                # shield: no limite de tempo o job é cancelado, mas a thread precisa terminar
+                await asyncio.wait_for(asyncio.shield(future), self.job_timeout)
+            except asyncio.TimeoutError:
+                logging.warning("Job #%s excedeu o tempo limite de %ss", job.id, self.job_timeout)
+                job.timed_out = True
+                job.cancel()
+                await future
+            if job.timed_out:
+                job.status = 'error'
+            elif job.status == 'running' and not job.detached:
+                job.status = 'cancelled' if job.cancel_event.is_set() else 'done'
+        except JobRetry as e:
+            retry = e
+        except Exception:
+            job.status = 'error'
+            logging.exception("Erro não tratado no job #%s", job.id)
+        finally:
+            self._running -= 1
+
+        if retry is not None and not job.cancel_event.is_set() and not self._closed:
+            if not retry.consume_attempt:
+                job.attempts -= 1
+            delay = retry.delay
+            if delay is None:
+                delay = min(self.max_retry_delay, self.retry_backoff * 2 ** (job.attempts - 1))
+            job.status = 'queued'
+            logging.info("Job #%s será tentado de novo em %.1fs", job.id, delay)
+            self._retry_timers[job.id] = (job, loop.call_later(delay, self._enqueue, job))
+        elif not job.detached:
+            if retry is not None:
+                job.status = 'cancelled'
+            self.complete(job)
+        self._dispatch()
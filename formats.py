@@ -0,0 +1,196 @@
+"""
+Seleção de formatos a partir da lista já devolvida pelo extract_info.
+
+Os IDs de formato são escolhidos antes do download, segundo o perfil do
+tipo e da qualidade selecionados, e repassados ao yt-dlp como uma
+especificação concreta ("137+140"), sem reavaliar expressões de filtro.
+"""
+
+# Codecs que podem ser copiados para cada contêiner sem recodificar,
+# em ordem de preferência
+CONTAINER_VIDEO_CODECS = {
+    'mp4': ('avc1', 'h264', 'hev1', 'hvc1', 'av01'),
+}
+CONTAINER_AUDIO_CODECS = {
+    'mp4': ('mp4a', 'aac'),
+    'm4a': ('mp4a', 'aac'),
+    'mp3': ('mp3',),
+}
+# Preferência de codec quando o contêiner aceita qualquer um (MKV)
+VIDEO_CODEC_PREFERENCE = ('av01', 'vp09', 'vp9', 'hev1', 'hvc1', 'avc1', 'h264')
+AUDIO_CODEC_PREFERENCE = ('opus', 'mp4a', 'aac', 'vorbis', 'mp3')
+
+
+class FormatProfile:
+    """Critérios de escolha de formato para um tipo e qualidade de download."""
+
+    def __init__(self, container, audio_only=False, max_height=None, worst=False, audio_bitrate=None):
+        self.container = container
+        self.audio_only = audio_only
+        self.max_height = max_height
+        self.worst = worst
+        self.audio_bitrate = audio_bitrate
+
+    @classmethod
+    def from_choice(cls, download_type, quality):
+        """Monta o perfil a partir dos textos da interface, ex: ("Vídeo (MP4)", "720p")."""
+        quality = quality or ''
+        if download_type.startswith("Áudio"):
+            container = 'mp3' if "MP3" in download_type else 'm4a'
+            bitrate = None
+            if '(' in quality and not quality.startswith("Melhor"):
+                try:
+                    bitrate = int(quality.split('(')[-1].replace('k)', ''))
+                except ValueError:
+                    pass
+            return cls(container, audio_only=True, audio_bitrate=bitrate)
+
+        container = 'mp4' if "MP4" in download_type else 'mkv'
+        max_height = None
+        if quality.endswith('p') and quality[:-1].isdigit():
+            max_height = int(quality[:-1])
+        return cls(container, max_height=max_height, worst=quality == "Pior")
+
+    def __repr__(self):
+        return (f"<FormatProfile {self.container} audio_only={self.audio_only} "
+                f"max_height={self.max_height} worst={self.worst} audio_bitrate={self.audio_bitrate}>")
+
+
+class FormatSelection:
+    """Formatos escolhidos para um download e o tamanho esperado."""
+
+    def __init__(self, formats, estimated_size=None):
+        self.formats = formats
+        self.estimated_size = estimated_size
+
+    @property
+    def format_spec(self):
+        return '+'.join(f['format_id'] for f in self.formats)
+
+    def describe(self):
+        parts = []
+        for f in self.formats:
+            if _has_video(f):
+                parts.append(f"{f.get('height') or '?'}p {_codec(f, 'vcodec') or '?'}")
+            if _has_audio(f) and not _has_video(f):
+                parts.append(f"{_codec(f, 'acodec') or '?'} {int(f.get('abr') or 0) or '?'}k")
+        return f"{self.format_spec} ({' + '.join(parts)})"
+
+
+def _codec(fmt, key):
+    codec = fmt.get(key)
+    if not codec or codec == 'none':
+        return None
+    return codec.split('.')[0].lower()
+
+
+def _has_video(fmt):
+    return fmt.get('vcodec') != 'none' and bool(fmt.get('vcodec') or fmt.get('height'))
+
+
+def _has_audio(fmt):
+    return fmt.get('acodec') != 'none' and bool(fmt.get('acodec') or fmt.get('abr'))
+
+
+def _audio_bitrate(fmt):
+    return fmt.get('abr') or fmt.get('tbr') or 0
+
+
+def _rank(codec, preference):
+    # Codecs desconhecidos ficam por último
+    return len(preference) - preference.index(codec) if codec in preference else 0
+
+
+def estimate_size(fmt, duration=None):
+    """Tamanho do formato em bytes: informado, aproximado ou calculado pelo bitrate."""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return int(size)
+    bitrate = fmt.get('tbr') or fmt.get('abr') or fmt.get('vbr')
+    if bitrate and duration:
+        # Bitrates estão em kbit/s
+        return int(bitrate * 1000 / 8 * duration)
+    return None
+
+
+def _usable(formats):
+    return [f for f in formats or []
+            if f.get('format_id') and not f.get('has_drm') and f.get('ext') != 'mhtml'
+            and (_has_video(f) or _has_audio(f))]
+
+
+def _pick(candidates, key, worst=False):
+    if not candidates:
+        return None
+    return (min if worst else max)(candidates, key=key)
+
+
+def _select_audio(formats, profile):
+    audio = [f for f in formats if _has_audio(f) and not _has_video(f)]
+    compatible = CONTAINER_AUDIO_CODECS.get(profile.container)
+    if profile.audio_only and profile.container == 'm4a':
+        # AAC é só remuxado para .m4a; outros codecs exigem recodificação
+        copyable = [f for f in audio if _codec(f, 'acodec') in compatible]
+        audio = copyable or audio
+    elif not profile.audio_only and compatible:
+        audio = [f for f in audio if _codec(f, 'acodec') in compatible and f.get('ext') in ('m4a', 'mp4')]
+    if not audio:
+        return None
+
+    if profile.audio_bitrate:
+        # O menor formato que ainda atinge o bitrate final; acima disso só gasta banda
+        enough = [f for f in audio if _audio_bitrate(f) >= profile.audio_bitrate]
+        if enough:
+            return min(enough, key=_audio_bitrate)
+    return _pick(audio, lambda f: (_audio_bitrate(f), _rank(_codec(f, 'acodec'), AUDIO_CODEC_PREFERENCE)),
+                 worst=profile.worst)
+
+
+def _select_video(formats, profile):
+    video = [f for f in formats if _has_video(f) and not _has_audio(f)]
+    compatible = CONTAINER_VIDEO_CODECS.get(profile.container)
+    if compatible:
+        video = [f for f in video if _codec(f, 'vcodec') in compatible and f.get('ext') == 'mp4']
+    if profile.max_height:
+        video = [f for f in video if (f.get('height') or 0) <= profile.max_height]
+    preference = compatible or VIDEO_CODEC_PREFERENCE
+    return _pick(video, lambda f: (f.get('height') or 0, _rank(_codec(f, 'vcodec'), preference),
+                                   f.get('fps') or 0, f.get('tbr') or 0), worst=profile.worst)
+
+
+def _select_progressive(formats, profile):
+    progressive = [f for f in formats if _has_video(f) and _has_audio(f)]
+    if profile.container == 'mp4':
+        progressive = [f for f in progressive if f.get('ext') == 'mp4']
+    if profile.max_height:
+        progressive = [f for f in progressive if (f.get('height') or 0) <= profile.max_height]
+    return _pick(progressive, lambda f: (f.get('height') or 0, f.get('tbr') or 0), worst=profile.worst)
+
+
+def select_formats(formats, profile, duration=None):
+    """
+    Escolhe os formatos para o perfil. Prefere pares vídeo+áudio que podem
+    ser juntados copiando os streams; sem par compatível, usa um formato
+    progressivo. Retorna None quando nenhum formato atende ao perfil, para
+    que o yt-dlp decida com a especificação padrão.
+    """
+    formats = _usable(formats)
+    if profile.audio_only:
+        chosen = _select_audio(formats, profile)
+        selected = [chosen] if chosen else None
+        if not selected:
+            progressive = _select_progressive(formats, FormatProfile(profile.container))
+            selected = [progressive] if progressive else None
+    else:
+        video = _select_video(formats, profile)
+        audio = _select_audio(formats, profile) if video else None
+        if video and audio:
+            selected = [video, audio]
+        else:
+            progressive = _select_progressive(formats, profile)
+            selected = [progressive] if progressive else None
+
+    if not selected:
+        return None
+    sizes = [estimate_size(f, duration) for f in selected]
+    return FormatSelection(selected, sum(sizes) if all(sizes) else None)
@@ -0,0 +1,242 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    title TEXT NOT NULL,
+    format TEXT NOT NULL,
+    quality TEXT,
+    extractor TEXT,
+    video_id TEXT,
+    url TEXT,
+    filepath TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_video ON downloads (extractor, video_id);
+CREATE INDEX IF NOT EXISTS idx_downloads_created ON downloads (created_at);
+CREATE INDEX IF NOT EXISTS idx_downloads_format ON downloads (format, created_at);
+CREATE INDEX IF NOT EXISTS idx_downloads_title ON downloads (title);
+"""
+
+# Índice da busca por prefixo; criado em segundo plano, como o FTS
+PREFIX_INDEX = "CREATE INDEX IF NOT EXISTS idx_downloads_title_nocase ON downloads (title COLLATE NOCASE)"
+
+# Índice de texto da busca por título. O tokenizador trigram (SQLite 3.34+)
+# permite buscar trechos do título, não só palavras inteiras
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE downloads_fts USING fts5(title, content='downloads', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER downloads_fts_insert AFTER INSERT ON downloads BEGIN
+    INSERT INTO downloads_fts (rowid, title) VALUES (new.id, new.title);
+END;
+CREATE TRIGGER downloads_fts_delete AFTER DELETE ON downloads BEGIN
+    INSERT INTO downloads_fts (downloads_fts, rowid, title) VALUES ('delete', old.id, old.title);
+END;
+CREATE TRIGGER downloads_fts_update AFTER UPDATE OF title ON downloads BEGIN
+    INSERT INTO downloads_fts (downloads_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    INSERT INTO downloads_fts (rowid, title) VALUES (new.id, new.title);
+END;
+CREATE TABLE downloads_fts_backfill (next_id INTEGER NOT NULL, last_id INTEGER NOT NULL);
+INSERT INTO downloads_fts_backfill SELECT IFNULL(MIN(id), 1), IFNULL(MAX(id), 0) FROM downloads;
+"""
+# O trigram só indexa trechos a partir de 3 caracteres
+FTS_MIN_LENGTH = 3
+# Linhas antigas indexadas por transação, para não segurar o banco
+FTS_BACKFILL_BATCH = 5000
+
+# Colunas aceitas para ordenação das páginas
+SORT_COLUMNS = ('created_at', 'title', 'format', 'quality', 'filepath')
+# Colunas que aceitam NULL são comparadas como '' na paginação por chave
+NULLABLE_COLUMNS = ('quality', 'filepath')
+
+# Formato de data exibido na interface (o mesmo do histórico antigo em JSON)
+DISPLAY_DATE_FORMAT = '%d/%m/%Y %H:%M'
+STORAGE_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class HistoryStore:
+    """
+    Histórico de downloads em SQLite no modo WAL.
+
+    Cada download concluído é uma única inserção, então o custo de registrar
+    não cresce com o tamanho do histórico. As consultas são paginadas por
+    chave e usam os índices por vídeo, data e formato.
+
+    A busca por título usa o índice FTS5 (trigram) quando o SQLite o
+    oferece; buscas mais curtas que FTS_MIN_LENGTH, ou sem FTS5, procuram
+    pelo início do título, pelo índice sem distinção de maiúsculas. Num
+    histórico que já existia, os registros antigos entram no índice em
+    segundo plano, em lotes, e a busca por prefixo vale até o fim.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self.full_text = False
+        self._full_text_available = self._create_full_text(conn)
+        threading.Thread(target=self._build_search_indexes, name='history-index', daemon=True).start()
+
+    @staticmethod
+    def _create_full_text(conn):
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'downloads_fts'").fetchone():
+            return True
+        try:
+            # Os gatilhos indexam os novos registros; os antigos ficam para _build_search_indexes
+            conn.executescript(f"BEGIN; {FTS_SCHEMA} COMMIT;")
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            logging.info("Busca de texto completo indisponível (%s); usando busca por prefixo", e)
+            return False
+        return True
+
+    def _build_search_indexes(self):
+        conn = self._connection()
+        try:
+            with conn:
+                conn.execute(PREFIX_INDEX)
+            if not self._full_text_available:
+                return
+            while conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'downloads_fts_backfill'").fetchone():
+                with conn:
+                    next_id, last_id = conn.execute("SELECT next_id, last_id FROM downloads_fts_backfill").fetchone()
+                    if next_id > last_id:
+                        conn.execute("DROP TABLE downloads_fts_backfill")
+                        break
+                    end = min(last_id, next_id + FTS_BACKFILL_BATCH - 1)
+                    conn.execute("INSERT INTO downloads_fts (rowid, title) "
+                                 "SELECT id, title FROM downloads WHERE id BETWEEN ? AND ?", (next_id, end))
+                    conn.execute("UPDATE downloads_fts_backfill SET next_id = ?", (end + 1,))
+            self.full_text = True
+        except sqlite3.Error as e:
+            logging.warning("Erro ao indexar os títulos do histórico: %s", e)
+        finally:
+            self.close()
+
+    def _connection(self):
+        # Uma conexão por thread: os workers gravam em paralelo
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, title, format_type, quality=None, extractor=None, video_id=None, url=None,
+            filepath=None, created_at=None):
+        """Registra um download concluído e retorna o id da linha."""
+        created_at = created_at or datetime.now()
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO downloads (created_at, title, format, quality, extractor, video_id, url, filepath) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (created_at.strftime(STORAGE_DATE_FORMAT), title, format_type, quality,
+                 extractor, str(video_id) if video_id is not None else None, url,
+                 str(filepath) if filepath else None))
+        return cursor.lastrowid
+
+    def import_legacy(self, items):
+        """
+        Importa o histórico antigo salvo em downloader_config.json
+        (itens com 'date', 'title' e 'format').
+        """
+        rows = []
+        for item in items:
+            try:
+                created_at = datetime.strptime(item['date'], DISPLAY_DATE_FORMAT)
+            except (KeyError, ValueError):
+                created_at = datetime.now()
+            rows.append((created_at.strftime(STORAGE_DATE_FORMAT), item.get('title', ''), item.get('format', '')))
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT INTO downloads (created_at, title, format) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def download_keys(self):
+        """Itera (extrator, ID do vídeo, formato, qualidade) dos downloads já registrados."""
+        cursor = self._connection().execute(
+            "SELECT DISTINCT extractor, video_id, format, quality FROM downloads "
+            "WHERE extractor IS NOT NULL AND video_id IS NOT NULL")
+        yield from cursor
+
+    def has_download(self, extractor, video_id, format_type, quality):
+        """Consulta pontual (pelo índice por vídeo) de um download já registrado."""
+        row = self._connection().execute(
+            "SELECT 1 FROM downloads WHERE extractor = ? AND video_id = ? AND format = ? AND quality IS ? LIMIT 1",
+            (extractor, str(video_id), format_type, quality)).fetchone()
+        return row is not None
+
+    def _filters(self, format_type=None, search=None, video_id=None, since=None):
+        clauses, params = [], []
+        if format_type:
+            clauses.append("format = ?")
+            params.append(format_type)
+        if video_id:
+            clauses.append("video_id = ?")
+            params.append(str(video_id))
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since.strftime(STORAGE_DATE_FORMAT))
+        if search and self.full_text and len(search) >= FTS_MIN_LENGTH:
+            clauses.append("id IN (SELECT rowid FROM downloads_fts WHERE downloads_fts MATCH ?)")
+            # Entre aspas, o texto é um trecho literal, sem a sintaxe de consulta do FTS5
+            params.append('"' + search.replace('"', '""') + '"')
+        elif search:
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("title LIKE ? ESCAPE '\\'")
+            params.append(f"{escaped}%")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def count(self, **filters):
+        where, params = self._filters(**filters)
+        return self._connection().execute(f"SELECT COUNT(*) FROM downloads{where}", params).fetchone()[0]
+
+    def formats(self):
+        """Formatos presentes no histórico, para os filtros da interface."""
+        cursor = self._connection().execute("SELECT DISTINCT format FROM downloads ORDER BY format")
+        return [row[0] for row in cursor]
+
+    def page(self, after=None, limit=50, newest_first=True, order_by='created_at', **filters):
+        """
+        Retorna uma página do histórico como lista de dicts, ordenada por
+        `order_by` (uma das SORT_COLUMNS). Aceita os filtros format_type,
+        search, video_id e since.
+
+        A paginação é por chave: `after` é o último item da página anterior
+        e a consulta continua a partir de (order_by, id) dele pelo índice,
+        sem percorrer as linhas já lidas como faria um OFFSET.
+        """
+        if order_by not in SORT_COLUMNS:
+            raise ValueError(f"Coluna de ordenação inválida: {order_by}")
+        where, params = self._filters(**filters)
+        column = f"IFNULL({order_by}, '')" if order_by in NULLABLE_COLUMNS else order_by
+        order = "DESC" if newest_first else "ASC"
+        if after is not None:
+            where += f" {'AND' if where else 'WHERE'} ({column}, id) {'<' if newest_first else '>'} (?, ?)"
+            params = params + [after[order_by] or '', after['id']]
+        rows = self._connection().execute(
+            f"SELECT * FROM downloads{where} ORDER BY {column} {order}, id {order} LIMIT ?",
+            params + [limit]).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    @staticmethod
+    def _row_to_item(row):
+        item = dict(row)
+        created_at = datetime.strptime(item['created_at'], STORAGE_DATE_FORMAT)
+        item['date'] = created_at.strftime(DISPLAY_DATE_FORMAT)
+        return item
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,368 @@
+"""
+Ingestão de URLs sem a interface: pasta observada e caixa de entrada HTTP.
+
+Cada linha é uma URL seguida de marcações opcionais:
+
+    https://www.youtube.com/watch?v=... priority=5 type=mp3 quality=192k
+
+Linhas vazias e começadas por '#' são ignoradas. `type` usa os nomes
+curtos da linha de comando (mp4, mkv, mp3, m4a) e `quality` os mesmos
+valores de `-q` (best, worst, 720p, 192k...).
+
+Pasta observada: arquivos .txt ou .urls colocados na pasta são movidos
+para `processing/`, lidos linha a linha e, ao fim, movidos para `done/`.
+Quem gera os arquivos deve escrevê-los com outro nome (ou em outra pasta)
+e renomeá-los ao terminar; arquivos modificados há menos de
+`SETTLE_SECONDS` ainda não são lidos.
+
+Caixa de entrada HTTP (127.0.0.1 por padrão):
+  POST /urls    corpo em texto, uma URL por linha, ou JSON: uma lista de
+                URLs ou de objetos {"url", "priority", "type", "quality"}
+  GET  /status  contadores da ingestão
+
+As URLs passam por uma caixa de entrada limitada antes de chegar à fila
+do motor, que só recebe novos jobs enquanto tiver menos de `max_pending`
+pendentes. Com a caixa cheia, a leitura da pasta pausa e o POST responde
+429 com Retry-After e o índice da primeira URL recusada.
+"""
+import json
+import logging
+import queue
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from core import TYPE_CHOICES, quality_label
+
+SETTLE_SECONDS = 1.0
+MAX_BODY_BYTES = 8 * 1024 * 1024
+RETRY_AFTER_SECONDS = 5
+WATCH_PATTERNS = ('*.txt', '*.urls')
+
+
+class IngestItem:
+    __slots__ = ('url', 'download_type', 'quality', 'priority', 'source')
+
+    def __init__(self, url, download_type, quality, priority=0, source=None):
+        self.url = url
+        self.download_type = download_type
+        self.quality = quality
+        self.priority = priority
+        self.source = source
+
+
+def parse_item(url, tags, default_type='mp4', default_quality='default', source=None):
+    """Monta um IngestItem a partir da URL e das marcações; ValueError se inválidas."""
+    if not url.startswith(('http://', 'https://')):
+        raise ValueError(f"URL inválida: {url}")
+    type_name = str(tags.get('type') or default_type).lower()
+    if type_name not in TYPE_CHOICES:
+        raise ValueError(f"tipo inválido: {type_name}")
+    download_type = TYPE_CHOICES[type_name]
+    quality = quality_label(download_type, str(tags.get('quality') or default_quality))
+    priority = tags.get('priority')
+    try:
+        # Listas e objetos também chegam aqui pelo JSON do POST /urls
+        priority = int(priority) if priority not in (None, '') else 0
+    except (TypeError, ValueError):
+        raise ValueError(f"prioridade inválida: {priority}") from None
+    return IngestItem(url, download_type, quality, priority, source)
+
+
+def parse_line(line, default_type='mp4', default_quality='default', source=None):
+    """Interpreta uma linha "URL chave=valor ..."; retorna None para linhas vazias ou comentários."""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    url, *tokens = line.split()
+    tags = {}
+    for token in tokens:
+        key, sep, value = token.partition('=')
+        if not sep:
+            raise ValueError(f"marcação inválida: {token}")
+        tags[key.lower()] = value
+    return parse_item(url, tags, default_type, default_quality, source)
+
+
+class IngestService:
+    """
+    Alimenta o motor com URLs vindas de uma pasta observada e/ou de uma
+    caixa de entrada HTTP local, com deduplicação e controle de vazão.
+
+    URLs repetidas (mesmo vídeo, pela chave canônica do cache de
+    metadados) são descartadas enquanto ainda estão na caixa de entrada ou
+    na fila do motor; vídeos já baixados são pulados pelo próprio motor.
+    """
+
+    def __init__(self, engine, watch_dir=None, port=None, host='127.0.0.1', max_pending=200, max_inbox=10000,
+                 poll_interval=2.0, default_type='mp4', default_quality='default'):
+        self.engine = engine
+        self.watch_dir = Path(watch_dir) if watch_dir else None
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.default_type = default_type
+        self.default_quality = default_quality
+        self._inbox = queue.Queue(maxsize=max_inbox)
+        # Chaves das URLs que estão na caixa de entrada
+        self._inbox_keys = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._feed, name='ingest-feed', daemon=True)]
+        if self.watch_dir:
+            self._threads.append(threading.Thread(target=self._watch, name='ingest-watch', daemon=True))
+        self.stats = {'accepted': 0, 'duplicates': 0, 'rejected': 0, 'invalid': 0, 'submitted': 0, 'files': 0}
+
+        self._server = None
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+            self._server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name='ingest-http',
+                                                  daemon=True))
+
+    @property
+    def address(self):
+        if self._server is None:
+            return None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        if self.watch_dir:
+            for name in ('processing', 'done', 'failed'):
+                (self.watch_dir / name).mkdir(parents=True, exist_ok=True)
+        for thread in self._threads:
+            thread.start()
+        if self.watch_dir:
+            logging.info("Observando a pasta %s", self.watch_dir)
+        if self._server is not None:
+            logging.info("Caixa de entrada de URLs em %s/urls", self.address)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=2)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['inbox'] = self._inbox.qsize()
+        queue_ = self.engine.download_queue
+        stats['engine_pending'] = queue_.pending_count() if queue_ else 0
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _key(self, url):
+        return self.engine.metadata_cache.key_for_url(url)
+
+    def _queued_keys(self):
+        queue_ = self.engine.download_queue
+        if not queue_:
+            return set()
+        keys = set()
+        for job in queue_.jobs():
+            # Cada job resolve a chave uma vez; a varredura dos extratores custa milissegundos por URL
+            if job.url_key is None:
+                job.url_key = self._key(job.url)
+            keys.add(job.url_key)
+        return keys
+
+    def offer(self, item, block=True):
+        """
+        Coloca o item na caixa de entrada. Retorna 'accepted', 'duplicate'
+        ou 'full' (só sem `block`). Com `block`, espera haver espaço.
+        """
+        key = self._key(item.url)
+        with self._lock:
+            if key in self._inbox_keys:
+                self.stats['duplicates'] += 1
+                return 'duplicate'
+            self._inbox_keys.add(key)
+        while True:
+            try:
+                if block:
+                    self._inbox.put((key, item), timeout=0.5)
+                else:
+                    self._inbox.put_nowait((key, item))
+                break
+            except queue.Full:
+                if block and not self._stop.is_set():
+                    continue
+                with self._lock:
+                    self._inbox_keys.discard(key)
+                    self.stats['rejected'] += 1
+                return 'full'
+        self._count('accepted')
+        return 'accepted'
+
+    def _feed(self):
+        """Passa os itens da caixa de entrada para a fila do motor, sem passar de max_pending."""
+        # Chaves dos jobs na fila do motor, lidas uma vez por lote e atualizadas a cada envio
+        queued = None
+        while not self._stop.is_set():
+            try:
+                key, item = self._inbox.get(timeout=0.5)
+            except queue.Empty:
+                queued = None
+                continue
+            while self.engine.download_queue.pending_count() >= self.max_pending:
+                # Enquanto espera, jobs terminam e saem da fila
+                queued = None
+                if self._stop.wait(0.5):
+                    return
+            try:
+                if queued is None:
+                    queued = self._queued_keys()
+                if key in queued:
+                    self._count('duplicates')
+                    continue
+                job = self.engine.submit(item.url, item.download_type, item.quality, priority=item.priority)
+                job.url_key = key
+                queued.add(key)
+                self._count('submitted')
+            except Exception as e:
+                logging.exception("Erro ao enviar %s para a fila: %s", item.url, e)
+            finally:
+                with self._lock:
+                    self._inbox_keys.discard(key)
+
+    def _watch(self):
+        # Arquivos deixados em processing/ por uma execução interrompida vêm primeiro
+        for path in sorted((self.watch_dir / 'processing').iterdir()):
+            if path.is_file():
+                self._ingest_file(path)
+        while not self._stop.is_set():
+            now = time.time()
+            ready = sorted(path for pattern in WATCH_PATTERNS for path in self.watch_dir.glob(pattern)
+                           if path.is_file() and now - path.stat().st_mtime >= SETTLE_SECONDS)
+            for path in ready:
+                if self._stop.is_set():
+                    return
+                target = self.watch_dir / 'processing' / path.name
+                try:
+                    path.replace(target)
+                except OSError as e:
+                    logging.warning("Não foi possível mover %s: %s", path, e)
+                    continue
+                self._ingest_file(target)
+            self._stop.wait(self.poll_interval)
+
+    def _ingest_file(self, path):
+        """Lê o arquivo linha a linha; a leitura pausa enquanto a caixa de entrada estiver cheia."""
+        invalid = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for number, line in enumerate(f, 1):
+                    if self._stop.is_set():
+                        # Fica em processing/ e é lido de novo na próxima execução
+                        return
+                    try:
+                        item = parse_line(line, self.default_type, self.default_quality, source=path.name)
+                    except ValueError as e:
+                        invalid += 1
+                        logging.warning("%s:%d ignorada: %s", path.name, number, e)
+                        continue
+                    if item is not None:
+                        self.offer(item, block=True)
+        except (OSError, UnicodeDecodeError) as e:
+            logging.error("Erro ao ler %s: %s", path, e)
+            shutil.move(str(path), str(self.watch_dir / 'failed' / path.name))
+            return
+        self._count('invalid', invalid)
+        self._count('files')
+        shutil.move(str(path), str(self.watch_dir / 'done' / path.name))
+        self.engine.log_message(f"Arquivo de URLs processado: {path.name}")
+
+    def ingest_body(self, body, content_type):
+        """Processa o corpo de um POST /urls. Retorna (status HTTP, resposta)."""
+        items, invalid = [], 0
+        if content_type.startswith('application/json'):
+            try:
+                entries = json.loads(body)
+            except ValueError:
+                return 400, {'error': "JSON inválido"}
+            if not isinstance(entries, list):
+                return 400, {'error': "esperada uma lista"}
+            for entry in entries:
+                try:
+                    if isinstance(entry, str):
+                        entry = {'url': entry}
+                    tags = {key: entry.get(key) for key in ('type', 'quality', 'priority')}
+                    items.append(parse_item(str(entry.get('url', '')).strip(), tags, self.default_type,
+                                            self.default_quality, source='http'))
+                except (ValueError, AttributeError):
+                    invalid += 1
+        else:
+            for line in body.decode('utf-8', errors='replace').splitlines():
+                try:
+                    item = parse_line(line, self.default_type, self.default_quality, source='http')
+                except ValueError:
+                    invalid += 1
+                    continue
+                if item is not None:
+                    items.append(item)
+
+        result = {'accepted': 0, 'duplicates': 0, 'invalid': invalid}
+        self._count('invalid', invalid)
+        for index, item in enumerate(items):
+            outcome = self.offer(item, block=False)
+            if outcome == 'full':
+                # O cliente reenvia a partir deste índice depois de Retry-After
+                result['rejected_from'] = index
+                result['rejected'] = len(items) - index
+                self._count('rejected', len(items) - index - 1)
+                return 429, result
+            result['accepted' if outcome == 'accepted' else 'duplicates'] += 1
+        return 202, result
+
+
+def _make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, payload, headers=()):
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/status':
+                self.send_error(404)
+                return
+            self._reply(200, service.snapshot())
+
+        def do_POST(self):
+            if self.path.split('?', 1)[0] != '/urls':
+                self.send_error(404)
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._reply(400, {'error': "Content-Length inválido"})
+                return
+            if length > MAX_BODY_BYTES:
+                self.send_error(413)
+                return
+            body = self.rfile.read(length)
+            status, payload = service.ingest_body(body, self.headers.get('Content-Type', 'text/plain'))
+            headers = [('Retry-After', str(RETRY_AFTER_SECONDS))] if status == 429 else []
+            self._reply(status, payload, headers)
+
+    return Handler
@@ -0,0 +1,460 @@
+"""
+Modelos e visões da tabela de downloads e do histórico.
+
+As duas tabelas são QTableView sobre modelos próprios, então só as
+linhas visíveis são desenhadas, mesmo com dezenas de milhares de itens:
+
+- `JobTableModel` guarda os jobs da sessão. O progresso que chega dos
+  workers só marca a linha como alterada; a cada FLUSH_INTERVAL_MS as
+  linhas novas entram de uma vez e um dataChanged por faixa contígua
+  avisa a visão das células que mudaram de fato.
+- `HistoryTableModel` lê o histórico do SQLite sob demanda (fetchMore),
+  uma página por vez. Ordenação e filtros viram ORDER BY/WHERE na
+  consulta, sem carregar o histórico inteiro na memória.
+"""
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, Signal
+from PySide6.QtWidgets import (
+    QAbstractItemView, QApplication, QComboBox, QDialog, QHBoxLayout, QHeaderView, QLabel, QLineEdit,
+    QStyle, QStyledItemDelegate, QStyleOptionProgressBar, QTableView, QVBoxLayout
+)
+
+# Intervalo entre as atualizações em lote da tabela de downloads
+FLUSH_INTERVAL_MS = 200
+# Linhas lidas do histórico a cada fetchMore
+HISTORY_PAGE_SIZE = 200
+# Espera após a última tecla antes de refazer a busca no histórico
+SEARCH_DEBOUNCE_MS = 300
+ROW_HEIGHT = 22
+
+# Valor bruto usado na ordenação (números em vez do texto exibido)
+SORT_ROLE = Qt.UserRole + 1
+
+STATUS_LABELS = {
+    'queued': "Na fila",
+    'running': "Baixando",
+    'postprocessing': "Processando",
+    'done': "Concluído",
+    'error': "Erro",
+    'cancelled': "Cancelado",
+    'skipped': "Pulado",
+}
+FINISHED_STATUSES = ('done', 'error', 'cancelled', 'skipped')
+
+
+class JobTableModel(QAbstractTableModel):
+    """
+    Jobs da sessão, com atualizações agrupadas em lote.
+
+    Ordenação e filtro ficam no próprio modelo, sobre os valores já
+    copiados, em vez de um QSortFilterProxyModel: o proxy compara as
+    linhas chamando data() a cada comparação, o que com dezenas de
+    milhares de linhas trava a interface a cada lote.
+    """
+
+    COLUMNS = ("#", "Título", "Tipo", "Qualidade", "Status", "Progresso", "Mensagem")
+    ID, TITLE, TYPE, QUALITY, STATUS, PROGRESS, MESSAGE = range(len(COLUMNS))
+
+    # Emitido depois de cada lote aplicado
+    flushed = Signal()
+
+    def __init__(self, parent=None, interval=FLUSH_INTERVAL_MS):
+        super().__init__(parent)
+        self._jobs = []
+        self._rows = {}
+        # Valores exibidos, copiados dos jobs a cada lote: os workers alteram
+        # os jobs em outras threads, e a visão só lê esta cópia
+        self._values = []
+        # Linhas de _values na ordem exibida, já filtradas, e a posição de cada uma
+        self._view = []
+        self._position = {}
+        self._sort_column = self.ID
+        self._sort_order = Qt.AscendingOrder
+        self._filter = ""
+        # Última mensagem e progresso informados por job
+        self._reported = {}
+        self._new = {}
+        self._dirty = set()
+        self.status_counts = dict.fromkeys(STATUS_LABELS, 0)
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    # Chamados na thread da interface, a partir dos sinais do motor
+
+    def add_job(self, job):
+        if job.id not in self._rows:
+            self._new[job.id] = job
+
+    def update_job(self, job, message=None, progress=None):
+        # Sem mensagem, só o estado do job é relido (ex: ao terminar)
+        if message is not None:
+            self._reported[job.id] = (message, job.progress if progress is None else progress)
+        if job.id in self._rows:
+            self._dirty.add(job.id)
+        else:
+            self.add_job(job)
+
+    def job_at(self, row):
+        return self._jobs[self._view[row]]
+
+    def flush(self):
+        """Aplica as linhas novas e as alterações acumuladas desde o último lote."""
+        if not self._new and not self._dirty:
+            return
+        added = []
+        for job in self._new.values():
+            row = len(self._jobs)
+            self._rows[job.id] = row
+            self._jobs.append(job)
+            values = self._snapshot(job)
+            self._values.append(values)
+            self._count(values[self.STATUS], 1)
+            if self._matches(values):
+                added.append(row)
+        self._new = {}
+
+        changed = {}
+        hidden = []
+        resort = False
+        for job_id in self._dirty:
+            row = self._rows[job_id]
+            values = self._snapshot(self._jobs[row])
+            old = self._values[row]
+            columns = [column for column in range(len(values)) if values[column] != old[column]]
+            if not columns:
+                continue
+            if values[self.STATUS] != old[self.STATUS]:
+                self._count(old[self.STATUS], -1)
+                self._count(values[self.STATUS], 1)
+            self._values[row] = values
+            visible = row in self._position
+            if self._matches(values):
+                if not visible:
+                    added.append(row)
+                    continue
+                changed[row] = (min(columns), max(columns))
+                resort = resort or self._sort_column in columns
+            elif visible:
+                hidden.append(self._position[row])
+        self._dirty.clear()
+
+        # Linhas que deixaram de passar pelo filtro saem de trás para frente
+        for position in sorted(hidden, reverse=True):
+            self.beginRemoveRows(QModelIndex(), position, position)
+            del self._view[position]
+            self.endRemoveRows()
+        if hidden:
+            self._position = {row: position for position, row in enumerate(self._view)}
+        if added:
+            first = len(self._view)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for row in added:
+                self._position[row] = len(self._view)
+                self._view.append(row)
+            self.endInsertRows()
+        if added or resort:
+            self._resort()
+
+        # Um dataChanged por faixa de linhas contíguas, cobrindo só as colunas alteradas
+        runs = sorted((self._position[row], first, last) for row, (first, last) in changed.items())
+        start = 0
+        while start < len(runs):
+            end = start
+            while end + 1 < len(runs) and runs[end + 1][0] == runs[end][0] + 1:
+                end += 1
+            run = runs[start:end + 1]
+            self.dataChanged.emit(self.index(run[0][0], min(item[1] for item in run)),
+                                  self.index(run[-1][0], max(item[2] for item in run)),
+                                  [Qt.DisplayRole, SORT_ROLE])
+            start = end + 1
+        self.flushed.emit()
+
+    def _count(self, status, delta):
+        self.status_counts[status] = self.status_counts.get(status, 0) + delta
+
+    def _snapshot(self, job):
+        message, progress = self._reported.get(job.id, ("", job.progress))
+        return (
+            job.id,
+            job.title or job.url,
+            job.download_type,
+            job.quality,
+            job.status,
+            progress if job.status not in ('done', 'skipped') else 100,
+            message,
+        )
+
+    def _matches(self, values):
+        if not self._filter:
+            return True
+        text = ' '.join((str(values[self.ID]), values[self.TITLE], values[self.TYPE], str(values[self.QUALITY]),
+                         STATUS_LABELS.get(values[self.STATUS], values[self.STATUS]), values[self.MESSAGE]))
+        return self._filter in text.lower()
+
+    def _sort_key(self, row):
+        values = self._values[row]
+        value = values[self._sort_column]
+        if value is None:
+            value = ""
+        elif self._sort_column == self.STATUS:
+            value = STATUS_LABELS.get(value, value)
+        if isinstance(value, str):
+            value = value.lower()
+        return value, values[self.ID]
+
+    def _resort(self):
+        """Reordena as linhas exibidas, mantendo a seleção nas mesmas linhas."""
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        rows = [self._view[index.row()] for index in persistent]
+        self._view.sort(key=self._sort_key, reverse=self._sort_order == Qt.DescendingOrder)
+        self._position = {row: position for position, row in enumerate(self._view)}
+        self.changePersistentIndexList(persistent, [self.index(self._position[row], index.column())
+                                                    for row, index in zip(rows, persistent)])
+        self.layoutChanged.emit()
+
+    def _rebuild(self):
+        self.beginResetModel()
+        self._view = [row for row, values in enumerate(self._values) if self._matches(values)]
+        self._view.sort(key=self._sort_key, reverse=self._sort_order == Qt.DescendingOrder)
+        self._position = {row: position for position, row in enumerate(self._view)}
+        self.endResetModel()
+
+    def set_filter(self, text):
+        """Mostra só os jobs que contêm `text` em alguma coluna (sem diferenciar maiúsculas)."""
+        self.flush()
+        self._filter = text.strip().lower()
+        self._rebuild()
+
+    def remove_finished(self):
+        """Tira da tabela os jobs que já terminaram."""
+        self.flush()
+        kept = [row for row, values in enumerate(self._values) if values[self.STATUS] not in FINISHED_STATUSES]
+        if len(kept) == len(self._jobs):
+            return 0
+        removed = len(self._jobs) - len(kept)
+        for values in self._values:
+            if values[self.STATUS] in FINISHED_STATUSES:
+                self._count(values[self.STATUS], -1)
+                self._reported.pop(values[self.ID], None)
+        self._jobs = [self._jobs[row] for row in kept]
+        self._values = [self._values[row] for row in kept]
+        self._rows = {job.id: row for row, job in enumerate(self._jobs)}
+        self._rebuild()
+        self.flushed.emit()
+        return removed
+
+    # Interface do QAbstractTableModel
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._view)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self._resort()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._values[self._view[index.row()]][index.column()]
+        column = index.column()
+        if role == SORT_ROLE:
+            return value
+        if role == Qt.DisplayRole:
+            if column == self.STATUS:
+                return STATUS_LABELS.get(value, value)
+            if column == self.PROGRESS:
+                return f"{value}%"
+            return value
+        if role == Qt.ToolTipRole and column in (self.TITLE, self.MESSAGE):
+            return value
+        if role == Qt.TextAlignmentRole and column in (self.ID, self.PROGRESS):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+
+class ProgressDelegate(QStyledItemDelegate):
+    """Desenha a coluna de progresso como uma barra, sem criar widgets por linha."""
+
+    def paint(self, painter, option, index):
+        progress = index.data(SORT_ROLE)
+        if not isinstance(progress, int):
+            super().paint(painter, option, index)
+            return
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = progress
+        bar.text = f"{progress}%"
+        bar.textVisible = True
+        bar.state = option.state
+        QApplication.style().drawControl(QStyle.CE_ProgressBar, bar, painter)
+
+
+def _configure_view(view):
+    # Linhas de altura fixa: a visão não mede o conteúdo de cada linha
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+    view.verticalHeader().hide()
+    view.horizontalHeader().setStretchLastSection(True)
+    view.setSelectionBehavior(QAbstractItemView.SelectRows)
+    view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    view.setWordWrap(False)
+    view.setSortingEnabled(True)
+
+
+class JobTableView(QTableView):
+    """Tabela de downloads; ordenação e filtro são feitos pelo JobTableModel."""
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        _configure_view(self)
+        self.setItemDelegateForColumn(JobTableModel.PROGRESS, ProgressDelegate(self))
+        self.sortByColumn(JobTableModel.ID, Qt.AscendingOrder)
+        header = self.horizontalHeader()
+        for column, width in ((JobTableModel.ID, 50), (JobTableModel.TITLE, 260), (JobTableModel.TYPE, 110),
+                              (JobTableModel.QUALITY, 80), (JobTableModel.STATUS, 90), (JobTableModel.PROGRESS, 110)):
+            header.resizeSection(column, width)
+
+    def set_filter(self, text):
+        self.model().set_filter(text)
+
+    def selected_jobs(self):
+        return [self.model().job_at(index.row()) for index in self.selectionModel().selectedRows()]
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """Histórico paginado sob demanda, com ordenação e filtros feitos no SQLite."""
+
+    COLUMNS = ("Data", "Título", "Formato", "Qualidade", "Arquivo")
+    KEYS = ('date', 'title', 'format', 'quality', 'filepath')
+    SORT_COLUMNS = ('created_at', 'title', 'format', 'quality', 'filepath')
+
+    def __init__(self, store, parent=None, page_size=HISTORY_PAGE_SIZE):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self._items = []
+        self.total = 0
+        self._filters = {}
+        self._order_by = 'created_at'
+        self._descending = True
+        self.refresh()
+
+    def refresh(self):
+        """Recomeça a leitura do histórico com a ordenação e os filtros atuais."""
+        self.beginResetModel()
+        self._items = []
+        self.total = self.store.count(**self._filters)
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def set_filters(self, search=None, format_type=None):
+        self._filters = {'search': search or None, 'format_type': format_type or None}
+        self.refresh()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self._items) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        items = self.store.page(after=self._items[-1] if self._items else None, limit=self.page_size,
+                                newest_first=self._descending, order_by=self._order_by, **self._filters)
+        # Registros gravados depois da contagem ficam para o próximo refresh
+        items = items[:self.total - len(self._items)]
+        if not items:
+            self.total = len(self._items)
+            return
+        first = len(self._items)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self._items.extend(items)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._order_by = self.SORT_COLUMNS[column]
+        self._descending = order == Qt.DescendingOrder
+        self.refresh()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self._items[index.row()][self.KEYS[index.column()]]
+        return None
+
+
+class HistoryDialog(QDialog):
+    """Navegador do histórico: busca por título, filtro por formato e ordenação por coluna."""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Histórico de Downloads")
+        self.resize(800, 500)
+        layout = QVBoxLayout(self)
+
+        filters = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Buscar pelo título...")
+        self.search_input.setClearButtonEnabled(True)
+        self.format_selection = QComboBox()
+        self.format_selection.addItem("Todos os formatos", None)
+        for format_type in store.formats():
+            self.format_selection.addItem(format_type, format_type)
+        filters.addWidget(self.search_input)
+        filters.addWidget(self.format_selection)
+        layout.addLayout(filters)
+
+        self.model = HistoryTableModel(store, self)
+        self.view = QTableView()
+        _configure_view(self.view)
+        self.view.setModel(self.model)
+        # O modelo já vem do banco em ordem decrescente de data
+        self.view.horizontalHeader().setSortIndicator(0, Qt.DescendingOrder)
+        self.view.horizontalHeader().resizeSection(0, 120)
+        self.view.horizontalHeader().resizeSection(1, 320)
+        layout.addWidget(self.view)
+
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+
+        # A busca espera o usuário parar de digitar
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._apply_filters)
+        self.search_input.textChanged.connect(self._search_timer.start)
+        self.format_selection.currentIndexChanged.connect(self._apply_filters)
+        self.model.modelReset.connect(self._update_count)
+        self._update_count()
+
+    def _apply_filters(self):
+        self.model.set_filters(search=self.search_input.text().strip(),
+                               format_type=self.format_selection.currentData())
+
+    def _update_count(self):
+        self.count_label.setText(f"{self.model.total} download(s)")
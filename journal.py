@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Estados a partir dos quais um job não é mais retomado
+FINAL_STATES = ('done', 'cancelled', 'error', 'skipped')
+
+
+class JobJournal:
+    """
+    Diário dos jobs em JSON Lines, somente acréscimo.
+
+    Cada mudança de estado (queued, running, postprocessing, done...) vira
+    uma linha. Ao iniciar, o motor relê o diário e volta a enfileirar os
+    jobs cujo último estado não é final; como os nomes dos arquivos são
+    determinísticos, o yt-dlp continua os arquivos .part de onde pararam.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        # Os IDs dos jobs recomeçam a cada execução; a sessão os distingue
+        self.session = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry(job, state, session):
+        return {
+            'session': session,
+            'id': job.id,
+            'parent_id': job.parent_id,
+            'state': state,
+            'time': time.time(),
+            'url': job.url,
+            'download_type': job.download_type,
+            'quality': job.quality,
+            'output_path': str(job.output_path) if job.output_path else None,
+            'force': job.force,
+            'priority': job.priority,
+        }
+
+    def record(self, job, state):
+        line = json.dumps(self._entry(job, state, self.session), ensure_ascii=False)
+        try:
+            with self._lock:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except OSError as e:
+            logging.warning("Não foi possível gravar no diário de jobs: %s", e)
+
+    def pending(self):
+        """
+        Retorna as entradas dos jobs não concluídos, na ordem em que foram
+        enfileirados. Itens de playlists ainda em enumeração ficam de fora:
+        a própria playlist é retomada e volta a enfileirá-los.
+        """
+        if not self.path.exists():
+            return []
+        latest = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última linha incompleta após uma queda
+                    continue
+                latest[(entry['session'], entry['id'])] = entry
+
+        pending = {key: entry for key, entry in latest.items() if entry['state'] not in FINAL_STATES}
+        return [entry for (session, _), entry in pending.items()
+                if entry.get('parent_id') is None or (session, entry['parent_id']) not in pending]
+
+    def rewrite(self, jobs, state='queued'):
+        """Substitui o diário por um novo contendo apenas `jobs`, de forma atômica."""
+        tmp_path = self.path.with_suffix('.tmp')
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for job in jobs:
+                    f.write(json.dumps(self._entry(job, state, self.session), ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,60 @@
+import logging
+import queue
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class LogBuffer:
+    """
+    Buffer circular, seguro entre threads, para as linhas exibidas no log
+    da interface. Os workers só acrescentam linhas; a interface esvazia o
+    buffer periodicamente e insere tudo de uma vez. Se a interface não
+    acompanhar, as linhas mais antigas são descartadas.
+    """
+
+    def __init__(self, max_lines=1000):
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._dropped = 0
+
+    def append(self, line):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append(line)
+
+    def drain(self):
+        """Retorna as linhas pendentes e quantas foram descartadas."""
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            dropped, self._dropped = self._dropped, 0
+        return lines, dropped
+
+
+def setup_queue_logging(log_file_path, level=logging.DEBUG, filemode='a',
+                        fmt='%(asctime)s %(levelname)s %(message)s', max_bytes=5 * 1024 * 1024, backup_count=3):
+    """
+    Configura o logging raiz para gravar em arquivo através de uma fila:
+    quem loga só enfileira o registro, e uma thread em segundo plano
+    (QueueListener) faz a escrita em disco. O arquivo é rotacionado ao
+    passar de `max_bytes`, mantendo `backup_count` cópias anteriores.
+    Retorna o listener já iniciado; chame stop() ao encerrar para
+    descarregar a fila.
+    """
+    file_handler = RotatingFileHandler(log_file_path, mode=filemode, maxBytes=max_bytes,
+                                       backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(fmt))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    return listener
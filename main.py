@@ -1,40 +1,49 @@
+# Primeiro import: marca o início da contagem do tempo de inicialização
+from startup import StartupTimer
+
 import logging
 import sys
-import asyncio
 import os
-import time
-import threading
-import json
 from pathlib import Path
-from datetime import datetime
-import yt_dlp
 import traceback
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QComboBox, QProgressBar, QTextEdit,
-    QFileDialog, QMessageBox
+    QFileDialog, QMessageBox, QSpinBox, QCheckBox
 )
-from PySide6.QtCore import Qt, Signal, QObject
+from PySide6.QtCore import Qt, Signal, QObject, QTimer
 from PySide6.QtGui import QFont, QIcon
 
-import glob  # Adicionar esta linha aos imports no topo
+from core import DOWNLOAD_TYPES, DownloadEngine, get_app_data_path, quality_options
+from job_views import FINISHED_STATUSES, HistoryDialog, JobTableModel, JobTableView
+from log_sink import LogBuffer, setup_queue_logging
+from preview import PreviewService
+
+# Limite de linhas mantidas no widget de log e intervalo de atualização
+LOG_MAX_LINES = 2000
+LOG_FLUSH_INTERVAL_MS = 250
 
 class WorkerSignals(QObject):
     # Define signals for communication from worker thread to main thread
     update_status = Signal(str, int)
-    log_message = Signal(str)
     error_dialog = Signal(str, str)
     info_dialog = Signal(str, str)
     video_info_updated = Signal(str)
+    job_queued = Signal(object)
+    job_progress = Signal(object, str, int)
+    job_finished = Signal(object)
 
 class YouTubeDownloaderQt(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.app_data_path = self.get_app_data_path()
+        self.startup = StartupTimer()
+        self.app_data_path = get_app_data_path()
         log_file_path = self.app_data_path / 'debug_qt.log'
-        logging.basicConfig(filename=log_file_path, level=logging.DEBUG, filemode='w',
-                            format='%(asctime)s %(levelname)s %(message)s')
+        # A escrita em disco acontece em uma thread separada; o arquivo é
+        # rotacionado em vez de truncado a cada início
+        self.log_listener = setup_queue_logging(log_file_path, level=logging.DEBUG)
+        self.log_buffer = LogBuffer(max_lines=LOG_MAX_LINES)
         self.setWindowTitle("YouTube Downloader")
         try:
             icon_path = self.get_asset_path('icon.ico')
@@ -42,90 +51,62 @@ class YouTubeDownloaderQt(QMainWindow):
                 self.setWindowIcon(QIcon(icon_path))
         except Exception as e:
             logging.error(f"Erro ao carregar ícone: {e}")
-        self.downloads_path = Path("downloads")
-        self.downloads_path.mkdir(exist_ok=True)
-        self.config_file = self.app_data_path / "downloader_config.json"
-        self.download_history = []
-        self.is_downloading = False
-        self.download_thread = None
-        self.cancel_event = threading.Event()
-        self.load_config()
+        self.job_progress = {}
+        self.last_job_message = None
 
         self.signals = WorkerSignals()
         self.signals.update_status.connect(self._update_status_ui)
-        self.signals.log_message.connect(self._update_log_text)
         self.signals.error_dialog.connect(self._show_error_dialog)
         self.signals.info_dialog.connect(self._show_info_dialog)
         self.signals.video_info_updated.connect(self._update_video_info_label)
-
+        self.signals.job_queued.connect(self._on_job_queued)
+        self.signals.job_progress.connect(self._update_job_progress_ui)
+        self.signals.job_finished.connect(self._on_job_finished)
+
+        # O motor roda nas threads dos workers; os callbacks viram sinais Qt
+        self.engine = DownloadEngine(
+            app_data_path=self.app_data_path,
+            on_log=self.log_buffer.append,
+            on_progress=self.signals.job_progress.emit,
+            on_error=self.signals.error_dialog.emit,
+            on_finished=self.signals.job_finished.emit,
+            on_queued=self.signals.job_queued.emit,
+        )
+        # Configurações, fila e prévias ficam para depois de a janela aparecer
+        self.preview = None
         self.init_ui()
+        QTimer.singleShot(0, self._finish_startup)
 
-    def set_file_modification_time(self, filepath):
-        """
-        Define a data de modificação de um arquivo para o horário atual.
-        Usa uma abordagem robusta para garantir que o Windows reconheça a mudança.
-        """
-        try:
-            now = time.time()
-            # Primeira tentativa: definir timestamp
-            os.utime(filepath, (now, now))
-            
-            # Segunda tentativa: forçar o Windows a reconhecer a mudança
-            # através de uma renomeação temporária
-            temp_path = str(filepath) + ".temp"
-            os.rename(filepath, temp_path)
-            time.sleep(0.1)  # Pequena pausa
-            os.rename(temp_path, filepath)
-            
-            # Terceira tentativa: definir timestamp novamente
-            os.utime(filepath, (now, now))
-            
-            self.log_message(f"Timestamp do arquivo '{Path(filepath).name}' atualizado.")
-        except Exception as e:
-            self.log_message(f"AVISO: Falha ao atualizar o timestamp do arquivo: {e}")
-            logging.warning(f"Não foi possível atualizar o timestamp para {filepath}: {e}")
-
-    def find_downloaded_file(self, title, download_type):
-        """
-        Encontra o arquivo baixado baseado no título e tipo de download.
-        """
-        try:
-            # Limpa o título para corresponder ao que o yt-dlp usa
-            safe_title = title.replace('/', '_').replace('\\', '_').replace(':', '_')
-            
-            # Define as extensões possíveis baseadas no tipo de download
-            if download_type == "Áudio (MP3)":
-                extensions = ["*.mp3"]
-            elif download_type == "Áudio (M4A)":
-                extensions = ["*.m4a"]
-            elif download_type == "Vídeo (MP4)":
-                extensions = ["*.mp4"]
-            elif download_type == "Vídeo + Áudio (MKV)":
-                extensions = ["*.mkv"]
-            else:
-                extensions = ["*.mp4", "*.mkv", "*.mp3", "*.m4a"]
-            
-            # Procura por arquivos que correspondam ao padrão
-            for ext in extensions:
-                pattern = str(self.downloads_path / f"*{safe_title}*{ext}")
-                matches = glob.glob(pattern)
-                if matches:
-                    return max(matches, key=os.path.getctime)
-            
-            # Fallback: procura pelo arquivo mais recente
-            for ext in extensions:
-                pattern = str(self.downloads_path / ext)
-                matches = glob.glob(pattern)
-                if matches:
-                    most_recent = max(matches, key=os.path.getctime)
-                    if time.time() - os.path.getctime(most_recent) < 300:  # 5 minutos
-                        return most_recent
-            
-            return None
-            
-        except Exception as e:
-            self.log_message(f"Erro ao procurar arquivo baixado: {e}")
-            return None
+    def _finish_startup(self):
+        """Roda no primeiro ciclo do laço de eventos, com a janela já exibida."""
+        if self.preview is not None:
+            return
+        self.startup.mark('janela')
+        self.load_config()
+        self._apply_config_to_ui()
+        self.engine.start()
+        # Colar várias vezes seguidas gera uma única extração por URL
+        self.preview = PreviewService(self.engine.orchestrator, self.engine.preview_text,
+                                      on_result=self._on_preview_result, on_error=self._on_preview_error)
+        self.startup.mark('motor')
+        self.startup.report()
+
+    def _apply_config_to_ui(self):
+        # Sem sinais: os valores vieram do arquivo e não precisam ser salvos de novo
+        widgets = (self.folder_input, self.workers_selection, self.rate_limit_selection, self.skip_downloaded_check)
+        for widget in widgets:
+            widget.blockSignals(True)
+        self.folder_input.setText(str(self.engine.downloads_path.absolute()))
+        self.workers_selection.setValue(self.engine.max_concurrent_downloads)
+        self.rate_limit_selection.setValue((self.engine.rate_limit or 0) // 1024)
+        self.skip_downloaded_check.setChecked(self.engine.skip_downloaded)
+        for widget in widgets:
+            widget.blockSignals(False)
+
+    def _warm_up(self, *args):
+        # O yt-dlp é importado em segundo plano na primeira interação com a URL
+        if self.preview is not None:
+            self.engine.warm_up()
 
     def init_ui(self):
         central_widget = QWidget()
@@ -147,6 +128,7 @@ class YouTubeDownloaderQt(QMainWindow):
         url_label.setFixedWidth(80)
         self.url_input = QLineEdit()
         self.url_input.setPlaceholderText("Cole aqui a URL do vídeo do YouTube...")
+        self.url_input.textEdited.connect(self._warm_up)
         paste_btn = QPushButton("Colar")
         paste_btn.setFixedWidth(80)
         paste_btn.clicked.connect(self.paste_url)
@@ -161,7 +143,7 @@ class YouTubeDownloaderQt(QMainWindow):
         folder_label = QLabel("Pasta:")
         folder_label.setFixedWidth(80)
         self.folder_input = QLineEdit()
-        self.folder_input.setText(str(self.downloads_path.absolute()))
+        self.folder_input.setText(str(self.engine.downloads_path.absolute()))
         browse_btn = QPushButton("Procurar")
         browse_btn.setFixedWidth(80)
         browse_btn.clicked.connect(self.browse_folder)
@@ -177,7 +159,7 @@ class YouTubeDownloaderQt(QMainWindow):
         type_label = QLabel("Tipo:")
         type_label.setFixedWidth(80)
         self.download_type_selection = QComboBox()
-        self.download_type_selection.addItems(["Vídeo (MP4)", "Áudio (MP3)", "Áudio (M4A)", "Vídeo + Áudio (MKV)"])
+        self.download_type_selection.addItems(DOWNLOAD_TYPES)
         self.download_type_selection.setCurrentText("Vídeo (MP4)")
         self.download_type_selection.setFixedWidth(150)
         self.download_type_selection.currentIndexChanged.connect(self.update_quality_options)
@@ -185,14 +167,39 @@ class YouTubeDownloaderQt(QMainWindow):
         quality_label = QLabel("Qualidade:")
         quality_label.setFixedWidth(80)
         self.quality_selection = QComboBox()
-        self.quality_selection.addItems(["Melhor", "Pior", "1080p", "720p", "480p", "360p", "240p"])
-        self.quality_selection.setCurrentText("720p")
         self.quality_selection.setFixedWidth(100)
 
         config_box.addWidget(type_label)
         config_box.addWidget(self.download_type_selection)
+        workers_label = QLabel("Simultâneos:")
+        self.workers_selection = QSpinBox()
+        self.workers_selection.setRange(1, 16)
+        self.workers_selection.setValue(self.engine.max_concurrent_downloads)
+        self.workers_selection.setFixedWidth(60)
+        self.workers_selection.valueChanged.connect(self.update_max_workers)
+
+        rate_label = QLabel("Limite:")
+        self.rate_limit_selection = QSpinBox()
+        self.rate_limit_selection.setRange(0, 1000000)
+        self.rate_limit_selection.setSingleStep(100)
+        self.rate_limit_selection.setSuffix(" KB/s")
+        self.rate_limit_selection.setSpecialValueText("Sem limite")
+        self.rate_limit_selection.setValue((self.engine.rate_limit or 0) // 1024)
+        self.rate_limit_selection.setFixedWidth(110)
+        # Só aplica ao terminar a edição, para não salvar a cada dígito
+        self.rate_limit_selection.editingFinished.connect(self.update_rate_limit)
+
+        self.skip_downloaded_check = QCheckBox("Pular já baixados")
+        self.skip_downloaded_check.setChecked(self.engine.skip_downloaded)
+        self.skip_downloaded_check.toggled.connect(self.update_skip_downloaded)
+
         config_box.addWidget(quality_label)
         config_box.addWidget(self.quality_selection)
+        config_box.addWidget(workers_label)
+        config_box.addWidget(self.workers_selection)
+        config_box.addWidget(rate_label)
+        config_box.addWidget(self.rate_limit_selection)
+        config_box.addWidget(self.skip_downloaded_check)
         config_box.addStretch(1) # Adiciona um espaço flexível para empurrar os widgets para a esquerda
         main_layout.addLayout(config_box)
 
@@ -239,6 +246,27 @@ class YouTubeDownloaderQt(QMainWindow):
         self.status_label.setStyleSheet("color: #2196F3;")
         main_layout.addWidget(self.status_label)
 
+        # Tabela de downloads: o progresso chega em lote, não a cada evento
+        self.job_model = JobTableModel(self)
+        self.job_model.flushed.connect(self._refresh_summary)
+        self.job_table = JobTableView(self.job_model)
+        self.job_table.setMinimumHeight(180)
+
+        jobs_box = QHBoxLayout()
+        self.job_filter_input = QLineEdit()
+        self.job_filter_input.setPlaceholderText("Filtrar downloads...")
+        self.job_filter_input.setClearButtonEnabled(True)
+        self.job_filter_input.textChanged.connect(self.job_table.set_filter)
+        cancel_selected_btn = QPushButton("Cancelar Selecionados")
+        cancel_selected_btn.clicked.connect(self.cancel_selected)
+        clear_finished_btn = QPushButton("Limpar Concluídos")
+        clear_finished_btn.clicked.connect(self.clear_finished)
+        jobs_box.addWidget(self.job_filter_input)
+        jobs_box.addWidget(cancel_selected_btn)
+        jobs_box.addWidget(clear_finished_btn)
+        main_layout.addLayout(jobs_box)
+        main_layout.addWidget(self.job_table)
+
         # Área de log
         log_label = QLabel("Log de operações:")
         log_font = QFont()
@@ -250,8 +278,14 @@ class YouTubeDownloaderQt(QMainWindow):
         self.log_text.setReadOnly(True)
         self.log_text.setPlainText("Aplicativo iniciado. Pronto para downloads.\n")
         self.log_text.setFixedHeight(150)
+        self.log_text.document().setMaximumBlockCount(LOG_MAX_LINES)
         main_layout.addWidget(self.log_text)
 
+        # As linhas de log chegam em lote, em vez de um sinal por linha
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self._flush_log)
+        self.log_timer.start(LOG_FLUSH_INTERVAL_MS)
+
         # Botões extras
         extra_buttons_box = QHBoxLayout()
 
@@ -274,39 +308,6 @@ class YouTubeDownloaderQt(QMainWindow):
         self.update_quality_options()
         main_layout.addLayout(extra_buttons_box)
 
-    def _postprocessor_hook(self, d):
-            """
-            Hook chamado após o pós-processamento ser concluído.
-            Captura o caminho do arquivo final e atualiza seu timestamp.
-            """
-            # O status 'finished' aqui se refere ao pós-processamento
-            if d['status'] == 'finished' and 'filepath' in d:
-                final_filepath = d['filepath']
-                self.log_message(f"Pós-processamento concluído. Arquivo final: {final_filepath}")
-                if os.path.exists(final_filepath):
-                    self.set_file_modification_time(final_filepath)
-                else:
-                    self.log_message(f"AVISO: Pós-processador indicou arquivo final que não existe: {final_filepath}")
-
-    def get_ffmpeg_path(self):
-        """
-        Determina o caminho para o executável do FFmpeg, que se espera
-        estar em uma subpasta 'bin' quando empacotado.
-        """
-        if getattr(sys, 'frozen', False):
-            # Se o aplicativo estiver 'congelado' (rodando como .exe)
-            application_path = os.path.dirname(sys.executable)
-            # Constrói o caminho para a subpasta 'bin'
-            ffmpeg_path = os.path.join(application_path, 'bin', 'ffmpeg.exe') # <--- Linha modificada
-            return ffmpeg_path
-        
-        # Em modo de desenvolvimento, assume que 'ffmpeg' está no PATH do sistema
-        return 'ffmpeg'
-
-    def get_default_downloads_path(self):
-        """Retorna o caminho para a pasta de Downloads padrão do usuário."""
-        return Path.home() / "Downloads"
-
     def get_asset_path(self, asset_name):
         """
         Retorna o caminho completo para um recurso (asset), como um ícone,
@@ -321,68 +322,15 @@ class YouTubeDownloaderQt(QMainWindow):
         
         return os.path.join(base_path, 'assets', asset_name)
 
-    def get_app_data_path(self):
-        """
-        Retorna o caminho para a pasta de dados do aplicativo.
-        Usa AppData em modo 'congelado' e o diretório local em desenvolvimento.
-        """
-        if getattr(sys, 'frozen', False):
-            # Em modo 'congelado', usa a pasta AppData/Roaming
-            app_data_dir = Path(os.getenv('APPDATA')) / "YTDownloader"
-        else:
-            # Em modo de desenvolvimento, usa a pasta local
-            app_data_dir = Path('.')
-        
-        # Cria a pasta se ela não existir
-        app_data_dir.mkdir(exist_ok=True)
-        return app_data_dir
-
-    def set_file_modification_time(self, filepath):
-        """
-        Define a data de modificação de um arquivo para o horário atual.
-        """
-        try:
-            now = time.time()
-            os.utime(filepath, (now, now))
-            self.log_message(f"Timestamp do arquivo '{Path(filepath).name}' atualizado.")
-        except Exception as e:
-            self.log_message(f"AVISO: Falha ao atualizar o timestamp do arquivo: {e}")
-            logging.warning(f"Não foi possível atualizar o timestamp para {filepath}: {e}")
-
-
     def load_config(self):
         try:
-            if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    
-                    # Pega o caminho salvo. Se não existir, usa o padrão do sistema.
-                    saved_path_str = config.get('downloads_path')
-                    if saved_path_str:
-                        self.downloads_path = Path(saved_path_str)
-                    else:
-                        # Se não houver caminho salvo, usa o padrão do Windows/macOS/Linux
-                        self.downloads_path = self.get_default_downloads_path()
-
-                    self.download_history = config.get('history', [])
-            else:
-                # Se o arquivo de config nem existe, garante que o padrão do sistema seja usado.
-                self.downloads_path = self.get_default_downloads_path()
-
+            self.engine.load_config()
         except Exception as e:
-            logging.exception("Erro ao carregar configurações: %s", e)
-            # Em caso de erro, também recorre ao caminho padrão seguro.
-            self.downloads_path = self.get_default_downloads_path()
             QMessageBox.critical(self, "Erro", f"Erro ao carregar configurações: {e}")
 
     def save_config(self):
         try:
-            config = {
-                'downloads_path': str(self.downloads_path),
-                'history': self.download_history[-50:]
-            }
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            self.engine.save_config()
         except Exception as e:
             logging.exception("Erro ao salvar configurações: %s", e)
             QMessageBox.critical(self, "Erro", f"Erro ao salvar configurações: {e}")
@@ -392,8 +340,52 @@ class YouTubeDownloaderQt(QMainWindow):
         if progress is not None:
             self.progress_bar.setValue(progress)
 
-    def _update_log_text(self, text):
-        self.log_text.append(text.strip())
+    def _on_job_queued(self, job):
+        self.job_progress.setdefault(job.id, 0)
+        self.job_model.add_job(job)
+        self.cancel_btn.setEnabled(True)
+
+    def _update_job_progress_ui(self, job, message, progress):
+        """
+        Registra o progresso de um job. A tabela e o resumo são
+        atualizados em lote, em _refresh_summary.
+        """
+        self.job_progress[job.id] = progress
+        self.last_job_message = (job.id, message)
+        self.job_model.update_job(job, message, progress)
+
+    def _refresh_summary(self):
+        """A barra mostra a média dos jobs em andamento; o status, a última mensagem."""
+        if not self.job_progress:
+            return
+        self.cancel_btn.setEnabled(True)
+        average = int(sum(self.job_progress.values()) / len(self.job_progress))
+        self.progress_bar.setValue(average)
+        counts = self.job_model.status_counts
+        active = counts['running'] + counts['postprocessing']
+        summary = f"{active} em andamento, {counts['queued']} na fila"
+        if self.last_job_message:
+            job_id, message = self.last_job_message
+            summary = f"[#{job_id}] {message}\n{summary}"
+        self.status_label.setText(summary)
+
+    def _on_job_finished(self, job):
+        self.job_progress.pop(job.id, None)
+        self.job_model.update_job(job)
+        if self.engine.is_idle():
+            self.job_progress.clear()
+            self.last_job_message = None
+            self.cancel_btn.setEnabled(False)
+            self.status_label.setText("Pronto para download")
+            self.progress_bar.setValue(0)
+
+    def _flush_log(self):
+        lines, dropped = self.log_buffer.drain()
+        if not lines:
+            return
+        if dropped:
+            lines.insert(0, f"... {dropped} linha(s) omitida(s) ...")
+        self.log_text.append("\n".join(line.strip() for line in lines))
         # QTextEdit scrolls automatically to the end when append is used
 
     def _show_error_dialog(self, title, message):
@@ -406,39 +398,25 @@ class YouTubeDownloaderQt(QMainWindow):
         self.status_label.setText(info_text)
 
     def log_message(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.signals.log_message.emit(f"[{timestamp}] {message}")
+        self.engine.log_message(message)
 
     def update_status(self, message, progress=None):
         self.signals.update_status.emit(message, progress)
 
-    def _get_video_info_background(self, url):
-        try:
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(url, download=False)
-                title = info.get('title', 'Título não disponível')
-                duration = info.get('duration', 0)
-                uploader = info.get('uploader', 'Canal não disponível')
-                view_count = info.get('view_count', 0)
-
-                if duration:
-                    minutes = duration // 60
-                    seconds = duration % 60
-                    duration_str = f"{minutes:02d}:{seconds:02d}"
-                else:
-                    duration_str = "Duração não disponível"
-
-                info_text = f"Título: {title}\nCanal: {uploader}\nDuração: {duration_str}\nVisualizações: {view_count:,}"
-                self.signals.video_info_updated.emit(info_text)
-                self.signals.update_status.emit("Informações obtidas", self.progress_bar.value())
+    def _on_preview_result(self, url, info_text):
+        # Chamado fora da thread da interface, apenas para o pedido mais recente
+        self.signals.video_info_updated.emit(info_text)
+        self.signals.update_status.emit("Informações obtidas", self.progress_bar.value())
 
-        except Exception as e:
-            tb = traceback.format_exc()
-            logging.exception("Erro ao obter informações do vídeo: %s", e)
-            self.signals.error_dialog.emit("Erro", f"Erro ao obter informações: {str(e)}\n{tb}")
-            self.signals.update_status.emit("Erro ao obter informações", self.progress_bar.value())
+    def _on_preview_error(self, url, error):
+        tb = "".join(traceback.format_exception(error))
+        logging.error("Erro ao obter informações do vídeo: %s\n%s", error, tb)
+        self.signals.error_dialog.emit("Erro", f"Erro ao obter informações: {str(error)}\n{tb}")
+        self.signals.update_status.emit("Erro ao obter informações", self.progress_bar.value())
 
     def paste_url(self):
+        self._finish_startup()
+        self._warm_up()
         try:
             import pyperclip
             clipboard_content = pyperclip.paste()
@@ -451,7 +429,8 @@ class YouTubeDownloaderQt(QMainWindow):
 
         self.update_status("Obtendo informações...")
         # Inicia a busca de informações em segundo plano
-        threading.Thread(target=self._get_video_info_background, args=(self.url_input.text().strip(),)).start()
+        self.preview.request(self.url_input.text(), self.download_type_selection.currentText(),
+                             self.quality_selection.currentText())
 
     def browse_folder(self):
         try:
@@ -463,8 +442,8 @@ class YouTubeDownloaderQt(QMainWindow):
             if folder_path:
                 self.folder_input.setText(folder_path)
                 self.log_message(f"Pasta selecionada: {folder_path}")
-                # Atualiza o atributo da classe com o novo caminho
-                self.downloads_path = Path(folder_path)
+                # Atualiza o motor com o novo caminho
+                self.engine.downloads_path = Path(folder_path)
                 # Salva a nova configuração
                 self.save_config()
 
@@ -492,200 +471,80 @@ class YouTubeDownloaderQt(QMainWindow):
         self.signals.info_dialog.emit("Sobre", about_text)
 
     def show_config(self):
-        config_text = f"""Configurações Atuais:\n\nPasta de downloads: {self.downloads_path}\nTotal de downloads no histórico: {len(self.download_history)}\n\nPara alterar as configurações, use os campos da interface principal."""
+        config_text = f"""Configurações Atuais:\n\nPasta de downloads: {self.engine.downloads_path}\nTotal de downloads no histórico: {self.engine.history.count()}\n\nPara alterar as configurações, use os campos da interface principal."""
         self.signals.info_dialog.emit("Configurações", config_text)
 
     def show_history(self):
-        if not self.download_history:
+        if not self.engine.history.count():
             self.signals.info_dialog.emit("Histórico", "Nenhum download realizado ainda.")
             return
-
-        history_text = "Histórico de Downloads:\n\n"
-        for item in reversed(self.download_history[-10:]):
-            history_text += f"[{item['date']}] {item['title']} - {item['format']}\n"
-
-        self.signals.info_dialog.emit("Histórico", history_text)
-
-    def add_to_history(self, title, format_type):
-        item = {
-            'date': datetime.now().strftime('%d/%m/%Y %H:%M'),
-            'title': title,
-            'format': format_type
-        }
-        self.download_history.append(item)
-        self.save_config()
+        # As linhas são lidas do banco conforme a tabela rola
+        dialog = HistoryDialog(self.engine.history, self)
+        dialog.exec()
 
     def update_quality_options(self):
         download_type = self.download_type_selection.currentText()
         self.quality_selection.clear() # Limpa as opções atuais
 
-        if "Vídeo" in download_type:
-            # Opções para formatos de vídeo
-            self.quality_selection.addItems(["Melhor", "Pior", "1080p", "720p", "480p", "360p", "240p"])
-            self.quality_selection.setCurrentText("720p")
-        elif "Áudio" in download_type:
-            # Opções para formatos de áudio (bitrate)
-            self.quality_selection.addItems(["Melhor (320k)", "Padrão (192k)", "Boa (128k)", "Pior (64k)"])
-            self.quality_selection.setCurrentText("Padrão (192k)")
+        # Vídeo usa resoluções; áudio usa bitrates
+        options, default = quality_options(download_type)
+        self.quality_selection.addItems(options)
+        self.quality_selection.setCurrentText(default)
 
-    def start_download(self):
-        if self.download_thread and self.download_thread.is_alive():
-            self.signals.error_dialog.emit("Erro", "Um download ainda está em andamento")
-            return
+    def update_max_workers(self, value):
+        self.engine.set_max_workers(value)
+        self.log_message(f"Downloads simultâneos: {value}")
+        self.save_config()
 
-        url = self.url_input.text().strip()
-        if not url:
-            self.signals.error_dialog.emit("Erro", "Por favor, insira uma URL do YouTube")
+    def update_rate_limit(self):
+        value = self.rate_limit_selection.value()
+        if (self.engine.rate_limit or 0) == value * 1024:
             return
+        self.engine.set_rate_limit(value * 1024)
+        self.log_message(f"Limite de banda: {value} KB/s" if value else "Limite de banda removido")
+        self.save_config()
 
-        if self.is_downloading:
-            self.signals.error_dialog.emit("Erro", "Download já em andamento")
+    def update_skip_downloaded(self, checked):
+        self.engine.skip_downloaded = checked
+        self.save_config()
+
+    def start_download(self):
+        self._finish_startup()
+        # Várias URLs podem ser informadas de uma vez, separadas por espaço
+        urls = self.url_input.text().split()
+        if not urls:
+            self.signals.error_dialog.emit("Erro", "Por favor, insira uma URL do YouTube")
             return
 
-        self.download_btn.setEnabled(False)
-        self.download_btn.setText("Baixando...")
+        for url in urls:
+            # Tipo e qualidade são lidos aqui, na thread da interface, e viajam com o job
+            self.engine.submit(url, self.download_type_selection.currentText(), self.quality_selection.currentText())
         self.cancel_btn.setEnabled(True)
-        self.is_downloading = True
-        self.progress_bar.setValue(0)
-
-        # Iniciar o download em uma thread separada
-        self.cancel_event.clear()
-        self.download_thread = threading.Thread(target=self._do_download, args=(url,))
-        self.download_thread.start()
+        self.update_status(f"{self.engine.download_queue.pending_count()} download(s) na fila")
 
     def cancel_download(self):
-        if self.is_downloading:
-            self.cancel_event.set()
+        if not self.engine.is_idle():
+            self.engine.cancel_all()
             self.log_message("Solicitação de cancelamento enviada.")
-            self.update_status("Cancelando download...")
-
-    def _do_download(self, url):
-        # Esta função roda em uma thread separada
-        try:
-            self.log_message(f"Iniciando download de: {url}")
-            self.update_status("Iniciando download...", 0)
-
-            # Determina o caminho do FFmpeg e o passa para o yt-dlp
-            ffmpeg_path = self.get_ffmpeg_path()
-
-            ydl_opts = {
-                'format': 'bestvideo+bestaudio/best',
-                'outtmpl': {
-                    'default': str(self.downloads_path / '%(title)s.%(ext)s')
-                },
-                'progress_hooks': [self._download_progress_hook],
-                'postprocessor_hooks': [self._postprocessor_hook],
-                'merge_output_format': 'mkv',
-                'postprocessors': [],
-                'ffmpeg_location': ffmpeg_path,
-                'no_mtime': True
-            }
-
-            download_type = self.download_type_selection.currentText()
-            quality = self.quality_selection.currentText()
-
-            if download_type == "Áudio (MP3)":
-                ydl_opts['format'] = 'bestaudio/best'
-                # Extrai o bitrate da string de qualidade, ex: "Padrão (192k)" -> "192"
-                audio_bitrate = quality.split('(')[-1].replace('k)', '') if '(' in quality else '192'
-                ydl_opts['postprocessors'].append({
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': audio_bitrate,
-                })
-            elif download_type == "Áudio (M4A)":
-                ydl_opts['format'] = 'bestaudio/best'
-                ydl_opts['postprocessors'].append({
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'm4a',
-                })
-            elif download_type == "Vídeo (MP4)":
-                ydl_opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
-                ydl_opts['merge_output_format'] = 'mp4'
-            elif download_type == "Vídeo + Áudio (MKV)":
-                ydl_opts['format'] = 'bestvideo+bestaudio/best'
-                ydl_opts['merge_output_format'] = 'mkv'
-
-            if quality not in ["Melhor", "Pior"] and "k)" not in quality: # Garante que só se aplica a vídeo
-                if download_type.startswith("Vídeo"):
-                    # A lógica para vídeo permanece a mesma, com a melhoria do <=
-                    resolution = quality.replace('p', '')
-                    ydl_opts['format'] = f'bestvideo[height<={resolution}]+bestaudio/best[height<={resolution}]'
-                # Não é necessário um 'else' aqui, pois a qualidade do áudio já foi tratada acima
-
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                title = info.get('title', 'unknown_title')
-            
-                if self.cancel_event.is_set():
-                    self.log_message("Download cancelado pelo usuário.")
-                    self.update_status("Download cancelado.", 0)
-                    return
-
-                # O download acontece e os hooks são chamados automaticamente
-                ydl.download([url])
-
-                # SOLUÇÃO DEFINITIVA: Procura e atualiza o timestamp do arquivo baixado
-                self.log_message("Procurando arquivo baixado para atualizar timestamp...")
-                downloaded_file = self.find_downloaded_file(title, download_type)
-
-                if downloaded_file and os.path.exists(downloaded_file):
-                    self.log_message(f"Arquivo encontrado: {Path(downloaded_file).name}")
-                    self.set_file_modification_time(downloaded_file)
-                else:
-                    self.log_message("AVISO: Não foi possível localizar o arquivo baixado para atualizar o timestamp.")
-
-            self.log_message(f"Download concluído: {title}")
-            self.update_status("Download concluído!", 100)
-            self.add_to_history(title, download_type)
-
-        except yt_dlp.DownloadError as e:
-            # Verifica se o erro foi, na verdade, um cancelamento do usuário
-            if "Download cancelado pelo usuário" in str(e):
-            # Se foi um cancelamento, não mostre um diálogo de erro.
-            # Apenas registre no log e atualize o status.
-                self.log_message("Download foi cancelado pelo usuário.")
-                self.update_status("Download cancelado.", 0)
-            else:
-            # Se for qualquer outro erro de download, mostre o diálogo.
-                error_msg = f"Erro no download: {e}"
-                logging.exception(error_msg)
-                self.signals.error_dialog.emit("Erro de Download", error_msg)
-                self.update_status("Erro no download.", 0)
-
-        except Exception as e:
-            tb = traceback.format_exc()
-            error_msg = f"Ocorreu um erro inesperado: {e}"
-            logging.exception(error_msg)
-            self.signals.error_dialog.emit("Erro", f"{error_msg}\n{tb}")
-            self.signals.update_status.emit("Erro inesperado.", 0)
-        finally:
-            self.is_downloading = False
-            self.signals.update_status.emit("Pronto para download", 0)
-            self.download_btn.setEnabled(True)
-            self.download_btn.setText("Baixando")
-            self.cancel_btn.setEnabled(False)
-            self.cancel_event.clear()
-
-    def _download_progress_hook(self, d):
-        if self.cancel_event.is_set():
-            raise yt_dlp.DownloadError("Download cancelado pelo usuário")
-
-        if d['status'] == 'downloading':
-            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
-            downloaded_bytes = d.get('downloaded_bytes')
-            if total_bytes and downloaded_bytes:
-                progress = int(downloaded_bytes / total_bytes * 100)
-                self.signals.update_status.emit(f"Baixando: {d['_percent_str']} de {d['_total_bytes_str']} @ {d['_speed_str']}", progress)
-            else:
-                self.signals.update_status.emit(f"Baixando: {d['_percent_str']} @ {d['_speed_str']}", self.progress_bar.value())
-        elif d['status'] == 'finished':
-            self.signals.update_status.emit("Processando...", 100)
-            self.log_message(f"Concluído: {d['filename']}")
-        elif d['status'] == 'error':
-            self.signals.update_status.emit("Erro no download.", 0)
-            self.log_message(f"Erro: {d['filename']}")
+            self.update_status("Cancelando downloads...")
+
+    def cancel_selected(self):
+        jobs = [job for job in self.job_table.selected_jobs() if job.status not in FINISHED_STATUSES]
+        for job in jobs:
+            self.engine.download_queue.cancel(job.id)
+        if jobs:
+            self.log_message(f"Cancelamento solicitado para {len(jobs)} download(s).")
+
+    def clear_finished(self):
+        removed = self.job_model.remove_finished()
+        if removed:
+            self.log_message(f"{removed} download(s) concluído(s) removido(s) da lista.")
+
+    def closeEvent(self, event):
+        self.engine.shutdown()
+        self.log_timer.stop()
+        self.log_listener.stop()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,314 @@
+import copy
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+_LEADING_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+_NAMED_GROUP = re.compile(r'\(\?P<\w+>')
+# Referências a grupos deixam de valer quando os padrões são combinados
+_GROUP_REFERENCE = re.compile(r'\(\?P=|\(\?\(|\\[1-9]')
+_dispatch = None
+_dispatch_lock = threading.Lock()
+
+
+def _default_suitable():
+    """Implementações de suitable() que só casam _VALID_URL."""
+    from yt_dlp.extractor.common import InfoExtractor
+    functions = {InfoExtractor.suitable.__func__}
+    try:
+        from yt_dlp.extractor.lazy_extractors import LazyLoadExtractor
+        functions.add(LazyLoadExtractor.suitable.__func__)
+    except ImportError:
+        pass
+    return functions
+
+
+class _UrlDispatch:
+    """
+    Os padrões _VALID_URL dos extratores do yt-dlp combinados em poucas
+    expressões regulares, compiladas uma vez: resolver uma URL deixa de
+    chamar suitable() em cada um dos ~1800 extratores. A ordem do yt-dlp
+    é mantida: a alternância devolve o primeiro padrão que casa, e os
+    extratores que redefinem suitable() (ou cujos padrões não podem ser
+    combinados) são consultados um a um, na sua posição.
+    """
+
+    def __init__(self, extractors):
+        default = _default_suitable()
+        self._steps = []
+        self._extractors = {}
+        block = []
+        for ie_key, ie in extractors:
+            patterns = self._combinable(ie, default)
+            if patterns is None:
+                self._close(block)
+                block = []
+                self._steps.append((ie_key, ie))
+            for pattern in patterns or ():
+                name = f"_{len(self._extractors)}"
+                self._extractors[name] = (ie_key, ie)
+                block.append(f"(?P<{name}>{pattern})")
+        self._close(block)
+
+    def _close(self, block):
+        if block:
+            self._steps.append(re.compile('|'.join(block)))
+
+    @staticmethod
+    def _combinable(ie, default):
+        """Padrões do extrator prontos para combinar; None se ele deve ser consultado à parte."""
+        if ie.suitable.__func__ not in default:
+            return None
+        if not ie._VALID_URL:
+            # _VALID_URL = False: o extrator não aceita URLs
+            return []
+        patterns = []
+        valid_url = ie._VALID_URL
+        for pattern in [valid_url] if isinstance(valid_url, str) else valid_url:
+            if _GROUP_REFERENCE.search(pattern):
+                return None
+            flags = _LEADING_FLAGS.match(pattern)
+            if flags:
+                pattern = pattern[flags.end():]
+            # Os nomes dos grupos se repetiriam entre os extratores
+            pattern = _NAMED_GROUP.sub('(?:', pattern)
+            if flags:
+                # Flags globais só valem no início do padrão: viram um grupo com escopo.
+                # No modo verbose, a quebra de linha encerra um comentário no fim do padrão
+                end = '\n' if 'x' in flags.group(1) else ''
+                pattern = f"(?{flags.group(1)}:{pattern}{end})"
+            try:
+                re.compile(pattern)
+            except re.error:
+                return None
+            patterns.append(pattern)
+        return patterns
+
+    def match(self, url):
+        """Retorna (chave, classe) do primeiro extrator que aceita a URL, ou None."""
+        for step in self._steps:
+            if isinstance(step, tuple):
+                if step[1].suitable(url):
+                    return step
+                continue
+            match = step.match(url)
+            if match:
+                return self._extractors[match.lastgroup]
+        return None
+
+
+def _url_dispatch():
+    global _dispatch
+    with _dispatch_lock:
+        if _dispatch is None:
+            from yt_dlp.extractor import gen_extractor_classes
+            # O Generic aceita qualquer URL e não identifica o vídeo sem baixar a página
+            _dispatch = _UrlDispatch((ie.ie_key(), ie) for ie in gen_extractor_classes()
+                                     if ie.ie_key() != 'Generic')
+        return _dispatch
+
+
+class MetadataCache:
+    """
+    Cache dos resultados de extract_info, indexado pelo ID canônico do vídeo
+    (ex: "Youtube:dQw4w9WgXcQ"). Combina expiração por tempo (TTL) com
+    descarte LRU e, opcionalmente, persiste as entradas em disco.
+
+    O TTL deve ficar abaixo da validade das URLs de mídia retornadas pelo
+    extrator (algumas horas no YouTube).
+
+    Cada resultado é guardado uma única vez, pelo ID do vídeo; URLs que
+    não identificam o vídeo sozinhas (links genéricos, encurtadores)
+    apontam para a entrada por um apelido. Em disco, as entradas vencidas
+    e as que passam de `max_disk_entries` são apagadas em segundo plano.
+    """
+
+    def __init__(self, max_entries=256, ttl=1800, store_path=None, max_disk_entries=4096):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store_path = Path(store_path) if store_path else None
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        # {chave da URL: chave da entrada}, para URLs sem ID próprio
+        self._aliases = OrderedDict()
+        # {URL: (extrator, ID) ou None}, memória de resolve_url
+        self._url_keys = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        if self.store_path:
+            self.store_path.mkdir(parents=True, exist_ok=True)
+            self._schedule_prune()
+
+    @staticmethod
+    def prepare():
+        """Monta a tabela de padrões de URL, a parte cara da primeira chamada a resolve_url."""
+        _url_dispatch()
+
+    def resolve_url(self, url):
+        """
+        Resolve (extrator, ID do vídeo) a partir da URL sem acessar a rede,
+        usando os padrões de URL dos extratores do yt-dlp. Retorna None se
+        a URL não identifica um vídeo (ex: playlists ou links genéricos).
+        """
+        with self._lock:
+            if url in self._url_keys:
+                self._url_keys.move_to_end(url)
+                return self._url_keys[url]
+        resolved = None
+        extractor = _url_dispatch().match(url)
+        if extractor:
+            ie_key, ie = extractor
+            video_id = ie.get_temp_id(url)
+            if video_id:
+                resolved = (ie_key, video_id)
+        with self._lock:
+            self._remember(self._url_keys, url, resolved)
+        return resolved
+
+    def key_for_url(self, url):
+        """Retorna o ID canônico da URL (ex: "Youtube:dQw4w9WgXcQ") ou a própria URL."""
+        resolved = self.resolve_url(url)
+        return f"{resolved[0]}:{resolved[1]}" if resolved else url
+
+    @staticmethod
+    def key_for_info(info):
+        if info.get('extractor_key') and info.get('id'):
+            return f"{info['extractor_key']}:{info['id']}"
+        return None
+
+    def get(self, url):
+        """
+        Retorna uma cópia das informações em cache para a URL, ou None.
+        A cópia pode ser modificada livremente pelo yt-dlp.
+        """
+        url_key = self.key_for_url(url)
+        with self._lock:
+            key = self._aliases.get(url_key, url_key)
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return copy.deepcopy(entry[1])
+            self._entries.pop(key, None)
+
+        data = self._load_from_disk(key)
+        if data is not None and 'alias' in data:
+            key = data['alias']
+            data = self._load_from_disk(key)
+        if data is None:
+            return None
+        with self._lock:
+            if key != url_key:
+                self._remember(self._aliases, url_key, key)
+            self._store(key, data['cached_at'], data['info'])
+        return copy.deepcopy(data['info'])
+
+    def put(self, url, info):
+        from yt_dlp import YoutubeDL
+        info = YoutubeDL.sanitize_info(info, remove_private_keys=False)
+        cached_at = time.time()
+        url_key = self.key_for_url(url)
+        key = self.key_for_info(info) or url_key
+        with self._lock:
+            self._store(key, cached_at, info)
+            if key != url_key:
+                self._remember(self._aliases, url_key, key)
+            self._puts += 1
+            prune = self._puts % self.max_entries == 0
+        self._save_to_disk(key, {'key': key, 'cached_at': cached_at, 'info': info})
+        if key != url_key:
+            self._save_to_disk(url_key, {'key': url_key, 'cached_at': cached_at, 'alias': key})
+        if prune:
+            self._schedule_prune()
+
+    def invalidate(self, url):
+        url_key = self.key_for_url(url)
+        with self._lock:
+            key = self._aliases.pop(url_key, url_key)
+            self._entries.pop(key, None)
+        if self.store_path:
+            self._disk_file(key).unlink(missing_ok=True)
+            self._disk_file(url_key).unlink(missing_ok=True)
+
+    def _store(self, key, cached_at, info):
+        self._entries[key] = (cached_at, info)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _remember(self, mapping, key, value):
+        # Memórias auxiliares limitadas como o próprio cache (LRU)
+        mapping[key] = value
+        mapping.move_to_end(key)
+        while len(mapping) > self.max_entries * 4:
+            mapping.popitem(last=False)
+
+    def _disk_file(self, key):
+        return self.store_path / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    def _load_from_disk(self, key):
+        if not self.store_path:
+            return None
+        path = self._disk_file(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Entrada de cache inválida em {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        if time.time() - data.get('cached_at', 0) >= self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return data
+
+    def _save_to_disk(self, key, data):
+        if not self.store_path:
+            return
+        path = self._disk_file(key)
+        try:
+            tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            tmp_path.replace(path)
+        except Exception as e:
+            logging.warning(f"Não foi possível gravar o cache de metadados em {path}: {e}")
+
+    def _schedule_prune(self):
+        threading.Thread(target=self.prune_disk, name='metadata-cache-prune', daemon=True).start()
+
+    def prune_disk(self):
+        """
+        Apaga do disco as entradas vencidas (pela data de modificação, sem
+        ler o JSON), os temporários abandonados e as mais antigas além de
+        `max_disk_entries`. Retorna quantos arquivos foram apagados.
+        """
+        if not self.store_path:
+            return 0
+        now = time.time()
+        removed = 0
+        alive = []
+        try:
+            for path in self.store_path.iterdir():
+                try:
+                    mtime = path.stat().st_mtime
+                    if now - mtime >= self.ttl:
+                        path.unlink(missing_ok=True)
+                        removed += 1
+                    elif path.suffix == '.json':
+                        alive.append((mtime, path))
+                except OSError:
+                    continue
+            alive.sort()
+            for _, path in alive[:max(0, len(alive) - self.max_disk_entries)]:
+                path.unlink(missing_ok=True)
+                removed += 1
+        except OSError as e:
+            logging.warning(f"Não foi possível limpar o cache de metadados em {self.store_path}: {e}")
+        return removed
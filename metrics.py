@@ -0,0 +1,226 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PHASES = ('extraction', 'format_selection', 'download', 'postprocess', 'finalize')
+# Limites dos buckets do histograma de duração das fases, em segundos
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class JobMetrics:
+    """Medições de um job: tempo por fase, bytes, tentativas e classe do erro."""
+
+    __slots__ = ('job_id', 'url', 'started', 'phases', 'bytes', 'retries', 'error_class')
+
+    def __init__(self, job):
+        self.job_id = job.id
+        self.url = job.url
+        self.started = time.time()
+        self.phases = {}
+        self.bytes = 0
+        self.retries = 0
+        self.error_class = None
+
+    def to_dict(self, status):
+        return {
+            'job_id': self.job_id,
+            'url': self.url,
+            'status': status,
+            'started': self.started,
+            'phases': {phase: round(seconds, 4) for phase, seconds in self.phases.items()},
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'error_class': self.error_class,
+        }
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def error_class(error):
+    """Nome da classe do erro, preferindo a causa original embrulhada pelo yt-dlp."""
+    exc_info = getattr(error, 'exc_info', None)
+    cause = exc_info[1] if exc_info and exc_info[1] is not None else error
+    return type(cause).__name__
+
+
+class MetricsRegistry:
+    """
+    Registro das métricas do motor, seguro entre threads.
+
+    Os spans de cada job (extração, seleção de formato, download,
+    pós-processamento e finalização) alimentam histogramas por fase; ao
+    término o job entra nos contadores e na lista dos mais recentes. Tudo
+    pode ser exportado como JSON ou no formato de texto do Prometheus.
+    """
+
+    def __init__(self, recent=200):
+        self._lock = threading.Lock()
+        self._active = {}
+        self._recent = deque(maxlen=recent)
+        self._phases = {phase: _Histogram() for phase in PHASES}
+        self._jobs_total = {}
+        self._errors_total = {}
+        self.bytes_total = 0
+        self.retries_total = 0
+
+    def _job(self, job):
+        metrics = self._active.get(job.id)
+        if metrics is None:
+            metrics = self._active[job.id] = JobMetrics(job)
+        return metrics
+
+    @contextmanager
+    def span(self, job, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(job, phase, time.perf_counter() - start)
+
+    def observe(self, job, phase, seconds):
+        with self._lock:
+            metrics = self._job(job)
+            metrics.phases[phase] = metrics.phases.get(phase, 0.0) + seconds
+            self._phases[phase].observe(seconds)
+
+    def add_bytes(self, job, count):
+        with self._lock:
+            self._job(job).bytes += count
+            self.bytes_total += count
+
+    def record_retry(self, job):
+        with self._lock:
+            self._job(job).retries += 1
+            self.retries_total += 1
+
+    def record_error(self, job, error):
+        name = error_class(error)
+        with self._lock:
+            self._job(job).error_class = name
+            self._errors_total[name] = self._errors_total.get(name, 0) + 1
+
+    def finish(self, job):
+        """Fecha as medições de um job que chegou a um estado final."""
+        with self._lock:
+            metrics = self._active.pop(job.id, None) or JobMetrics(job)
+            self._jobs_total[job.status] = self._jobs_total.get(job.status, 0) + 1
+            self._recent.append(metrics.to_dict(job.status))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'jobs_active': len(self._active),
+                'jobs_total': dict(self._jobs_total),
+                'errors_total': dict(self._errors_total),
+                'bytes_total': self.bytes_total,
+                'retries_total': self.retries_total,
+                'phases': {
+                    phase: {'count': hist.count, 'sum': round(hist.sum, 4),
+                            'buckets': dict(zip(map(str, BUCKETS), hist.counts))}
+                    for phase, hist in self._phases.items()
+                },
+                'recent_jobs': list(self._recent),
+            }
+
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent, ensure_ascii=False)
+
+    def to_prometheus(self):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self._lock:
+            metric('ytdl_jobs_active', 'gauge', "Jobs em andamento com medições abertas.",
+                   [({}, len(self._active))])
+            metric('ytdl_jobs_total', 'counter', "Jobs finalizados por status.",
+                   [({'status': status}, count) for status, count in sorted(self._jobs_total.items())])
+            metric('ytdl_errors_total', 'counter', "Erros por classe.",
+                   [({'error_class': name}, count) for name, count in sorted(self._errors_total.items())])
+            metric('ytdl_downloaded_bytes_total', 'counter', "Bytes baixados.", [({}, self.bytes_total)])
+            metric('ytdl_retries_total', 'counter', "Novas tentativas de jobs.", [({}, self.retries_total)])
+
+            lines.append("# HELP ytdl_phase_seconds Duração das fases dos jobs.")
+            lines.append("# TYPE ytdl_phase_seconds histogram")
+            for phase, hist in self._phases.items():
+                for bound, count in zip(BUCKETS, hist.counts):
+                    lines.append(f'ytdl_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+                lines.append(f'ytdl_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {hist.count}')
+                lines.append(f'ytdl_phase_seconds_sum{{phase="{phase}"}} {hist.sum:.6f}')
+                lines.append(f'ytdl_phase_seconds_count{{phase="{phase}"}} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsServer:
+    """
+    Endpoint HTTP local com as métricas: /metrics no formato do Prometheus
+    e /metrics.json com o snapshot completo.
+    """
+
+    def __init__(self, registry, port, host='127.0.0.1'):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body, content_type = registry_ref.to_prometheus(), 'text/plain; version=0.0.4'
+                elif path == '/metrics.json':
+                    body, content_type = registry_ref.to_json(indent=2), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+
+    @property
+    def address(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        logging.info("Métricas disponíveis em %s/metrics", self.address)
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
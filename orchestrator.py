@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobRetry(Exception):
+    """
+    Lançada pelo handler de um job para pedir uma nova tentativa. Sem
+    `delay`, a fila usa espera exponencial a partir do número de tentativas.
+    Com `consume_attempt` falso, a espera não conta como tentativa (ex: o
+    job nem começou, aguardando espaço em disco ou um host suspenso).
+    """
+
+    def __init__(self, message='', delay=None, consume_attempt=True):
+        super().__init__(message)
+        self.delay = delay
+        self.consume_attempt = consume_attempt
+
+
+class Orchestrator:
+    """
+    Laço asyncio em uma thread própria, dono do agendamento do motor.
+
+    Jobs pendentes, esperas entre tentativas e limites de tempo são
+    corrotinas e temporizadores do laço, não threads. As chamadas
+    bloqueantes do yt-dlp rodam em executores: um para os downloads,
+    outro, menor, para extrações avulsas (prévia), que assim nunca esperam
+    atrás dos downloads, e um terceiro para a enumeração de playlists, que
+    pode levar minutos e não deve ocupar as threads da prévia.
+
+    Quem está fora do laço (interface Qt, linha de comando) interage por
+    métodos seguros entre threads e recebe os resultados como
+    concurrent.futures.Future ou pelos callbacks do motor.
+    """
+
+    def __init__(self, download_threads=32, extraction_threads=4, enumeration_threads=2):
+        self.loop = asyncio.new_event_loop()
+        # Limite superior de threads; a concorrência real é controlada pela fila,
+        # que amplia o executor com reserve_download_threads() se precisar de mais
+        self.download_threads = download_threads
+        self.download_executor = ThreadPoolExecutor(max_workers=download_threads, thread_name_prefix='download')
+        self._executor_lock = threading.Lock()
+        self.extraction_executor = ThreadPoolExecutor(max_workers=extraction_threads,
+                                                      thread_name_prefix='extraction')
+        # Enumerações além deste limite esperam na fila do executor
+        self.enumeration_executor = ThreadPoolExecutor(max_workers=enumeration_threads,
+                                                       thread_name_prefix='enumeration')
+        self._thread = threading.Thread(target=self._run_loop, name='orchestrator', daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def call_soon(self, callback, *args):
+        """Agenda `callback(*args)` no laço, a partir de qualquer thread."""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def spawn(self, coro):
+        """Executa uma corrotina no laço e retorna um concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _call_blocking(self, fn, args, timeout, executor):
+        future = self.loop.run_in_executor(executor or self.extraction_executor, fn, *args)
+        if timeout:
+            return await asyncio.wait_for(future, timeout)
+        return await future
+
+    def run_blocking(self, fn, *args, timeout=None, executor=None):
+        """
+        Roda uma chamada bloqueante no executor de extrações (ou no
+        `executor` informado). Com `timeout`, o Future falha com
+        TimeoutError; a chamada em si não pode ser interrompida e termina
+        em segundo plano.
+        """
+        return self.spawn(self._call_blocking(fn, args, timeout, executor))
+
+    def reserve_download_threads(self, count):
+        """
+        Garante ao menos `count` threads no executor de downloads, para que
+        nenhum job liberado pela fila espere por uma thread (e essa espera
+        conte no seu limite de tempo). Um ThreadPoolExecutor não muda de
+        tamanho: um maior substitui o atual, que termina os jobs que já tem.
+        """
+        with self._executor_lock:
+            if count <= self.download_threads:
+                return
+            previous = self.download_executor
+            self.download_executor = ThreadPoolExecutor(max_workers=count, thread_name_prefix='download')
+            self.download_threads = count
+        previous.shutdown(wait=False)
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.download_executor.shutdown(wait=False, cancel_futures=True)
+        self.extraction_executor.shutdown(wait=False, cancel_futures=True)
+        self.enumeration_executor.shutdown(wait=False, cancel_futures=True)
+        logging.debug("Orquestrador encerrado.")
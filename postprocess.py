@@ -0,0 +1,187 @@
+import logging
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PostProcessingError(Exception):
+    pass
+
+
+def _creationflags():
+    # Evita abrir uma janela de console para cada conversão no Windows
+    return getattr(subprocess, 'CREATE_NO_WINDOW', 0) if sys.platform == 'win32' else 0
+
+
+def _ffmpeg_error(returncode, stderr):
+    message = stderr.decode('utf-8', 'replace').strip().splitlines()
+    return PostProcessingError(message[-1] if message else f"FFmpeg terminou com código {returncode}")
+
+
+def run_ffmpeg(ffmpeg_path, args):
+    """Executa o FFmpeg e lança PostProcessingError se ele falhar."""
+    command = [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y', *args]
+    logging.debug("FFmpeg: %s", command)
+    result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, creationflags=_creationflags())
+    if result.returncode != 0:
+        raise _ffmpeg_error(result.returncode, result.stderr)
+
+
+def _audio_args(codec, bitrate=None, copy_stream=False):
+    if copy_stream:
+        return ['-c:a', 'copy']
+    if codec == 'mp3':
+        return ['-c:a', 'libmp3lame', '-b:a', f"{bitrate or 192}k"]
+    return ['-c:a', 'aac', '-b:a', f"{bitrate or 192}k"]
+
+
+def extract_audio(ffmpeg_path, source, target, codec, bitrate=None, copy_stream=False):
+    """
+    Extrai o áudio de `source` para `target`. Com `copy_stream`, o áudio
+    é apenas remuxado (sem recodificar), o que só vale quando o codec de
+    origem é compatível com o contêiner de destino (ex: AAC em .m4a).
+    """
+    run_ffmpeg(ffmpeg_path, ['-i', str(source), '-vn', *_audio_args(codec, bitrate, copy_stream), str(target)])
+
+
+def stream_audio(ffmpeg_path, chunks, target, codec, bitrate=None, copy_stream=False):
+    """
+    Como extract_audio, mas lendo a origem de `chunks` (iterável de bytes)
+    pela entrada padrão do FFmpeg, à medida que os bytes chegam: não há
+    arquivo intermediário. A origem precisa ser legível em sequência (ex:
+    WebM ou MP4 fragmentado). Se `chunks` lançar uma exceção, o FFmpeg é
+    encerrado e o arquivo parcial removido.
+    """
+    command = [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y', '-i', 'pipe:0', '-vn',
+               *_audio_args(codec, bitrate, copy_stream), str(target)]
+    logging.debug("FFmpeg (fluxo): %s", command)
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE, creationflags=_creationflags())
+    # O stderr é lido em paralelo para o FFmpeg nunca travar com o pipe cheio
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+    try:
+        for chunk in chunks:
+            process.stdin.write(chunk)
+    except BrokenPipeError:
+        # O FFmpeg saiu antes do fim da entrada; o erro vem do código de saída
+        pass
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = process.wait()
+        reader.join()
+        if returncode != 0 and os.path.exists(target):
+            os.remove(target)
+    if returncode != 0:
+        raise _ffmpeg_error(returncode, b''.join(stderr))
+
+
+def merge_streams(ffmpeg_path, video, audio, target):
+    """Junta vídeo e áudio em um contêiner, copiando os streams sem recodificar."""
+    run_ffmpeg(ffmpeg_path, ['-i', str(video), '-i', str(audio),
+                             '-map', '0:v:0', '-map', '1:a:0', '-c', 'copy', str(target)])
+
+
+# Codec das legendas incorporadas por contêiner; os demais não recebem legendas
+SUBTITLE_CODECS = {'.mp4': 'mov_text', '.mkv': 'srt', '.webm': 'webvtt'}
+# Contêineres em que a miniatura vira capa (attached_pic); no MKV ela vai como anexo
+COVER_CONTAINERS = ('.mp4', '.m4a', '.mp3')
+ATTACHMENT_MIMETYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp'}
+
+
+def embed_sidecars(ffmpeg_path, media, thumbnail=None, subtitles=None, metadata=None, audio_only=False):
+    """
+    Incorpora miniatura, legendas ({idioma: arquivo}) e metadados ao
+    arquivo `media`, copiando os streams da mídia sem recodificar. O
+    resultado é gravado ao lado e só substitui o original no fim. Retorna
+    False se o contêiner não comporta nada do que foi pedido.
+    """
+    root, ext = os.path.splitext(str(media))
+    ext = ext.lower()
+    inputs = ['-i', str(media)]
+    maps = ['-map', '0']
+    options = ['-c', 'copy']
+    # Próximo índice de entrada do FFmpeg
+    count = 1
+
+    subtitle_codec = SUBTITLE_CODECS.get(ext)
+    if subtitle_codec:
+        for index, (lang, path) in enumerate(sorted((subtitles or {}).items())):
+            inputs += ['-i', str(path)]
+            maps += ['-map', f'{count}:s:0']
+            options += [f'-c:s:{index}', subtitle_codec, f'-metadata:s:s:{index}', f'language={lang}']
+            count += 1
+
+    if thumbnail and ext in COVER_CONTAINERS:
+        # A capa é o primeiro stream de vídeo nos arquivos de áudio e o segundo nos de vídeo
+        cover = 0 if audio_only or ext != '.mp4' else 1
+        inputs += ['-i', str(thumbnail)]
+        maps += ['-map', f'{count}:v:0']
+        options += [f'-c:v:{cover}', 'mjpeg', f'-disposition:v:{cover}', 'attached_pic']
+        if ext == '.mp3':
+            options += ['-id3v2_version', '3']
+        count += 1
+    elif thumbnail and ext == '.mkv':
+        mimetype = ATTACHMENT_MIMETYPES.get(os.path.splitext(str(thumbnail))[1].lower())
+        if mimetype:
+            options += ['-attach', str(thumbnail), '-metadata:s:t', f'mimetype={mimetype}']
+
+    tags = [f'{key}={value}' for key, value in (metadata or {}).items() if value]
+    for tag in tags:
+        options += ['-metadata', tag]
+
+    if count == 1 and '-attach' not in options and not tags:
+        return False
+    temp = f"{root}.embed{ext}"
+    try:
+        run_ffmpeg(ffmpeg_path, [*inputs, *maps, *options, temp])
+        os.replace(temp, str(media))
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+    return True
+
+
+class PostProcessStage:
+    """
+    Etapa de pós-processamento separada dos downloads.
+
+    Os workers de download entregam os arquivos brutos e seguem para a
+    próxima URL, enquanto conversões e junções rodam aqui em paralelo. O
+    trabalho pesado acontece no processo do FFmpeg, então cada tarefa só
+    ocupa uma thread esperando por ele; o pool é dimensionado pelo número
+    de núcleos para não disputar CPU entre as conversões.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='postprocess')
+
+    def submit(self, task, on_done):
+        """
+        Agenda `task()` e chama `on_done(error)` ao terminar, com None em
+        caso de sucesso.
+        """
+        def run():
+            try:
+                task()
+            except Exception as e:
+                logging.exception("Erro no pós-processamento")
+                on_done(e)
+            else:
+                on_done(None)
+
+        return self._executor.submit(run)
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,66 @@
+import logging
+from functools import partial
+
+
+class PreviewService:
+    """
+    Busca de prévias com debounce, no laço do orquestrador.
+
+    Cada pedido espera `delay` segundos; um pedido novo nesse intervalo
+    substitui o anterior. Só o resultado do pedido mais recente chega a
+    `on_result`: respostas atrasadas de URLs antigas são descartadas. Dois
+    pedidos para a mesma URL enquanto a primeira extração ainda roda
+    compartilham essa extração, e as informações já extraídas vêm do
+    cache de metadados do motor, indexado pelo ID do vídeo.
+    """
+
+    def __init__(self, orchestrator, fetch, on_result, on_error=None, delay=0.3):
+        self._orchestrator = orchestrator
+        self._fetch = fetch
+        self._on_result = on_result
+        self._on_error = on_error
+        self.delay = delay
+        # Estado abaixo só é acessado na thread do laço
+        self._generation = 0
+        self._timer = None
+        self._inflight = {}
+
+    def request(self, url, *args):
+        """Pede a prévia de `url`; `args` são repassados a `fetch`. Seguro entre threads."""
+        url = (url or '').strip()
+        if url:
+            self._orchestrator.call_soon(self._schedule, url, args)
+
+    def cancel(self):
+        """Descarta o pedido pendente e qualquer resultado ainda não entregue."""
+        self._orchestrator.call_soon(self._schedule, None, ())
+
+    def _schedule(self, url, args):
+        self._generation += 1
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if url is not None:
+            self._timer = self._orchestrator.loop.call_later(self.delay, self._start, self._generation, url, args)
+
+    def _start(self, generation, url, args):
+        self._timer = None
+        key = (url, args)
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._orchestrator.loop.run_in_executor(
+                self._orchestrator.extraction_executor, self._fetch, url, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        future.add_done_callback(partial(self._deliver, generation, url))
+
+    def _deliver(self, generation, url, future):
+        error = future.exception()
+        if generation != self._generation:
+            logging.debug("Prévia de %s descartada: substituída por um pedido mais recente", url)
+            return
+        if error is not None:
+            if self._on_error:
+                self._on_error(url, error)
+            return
+        self._on_result(url, future.result())
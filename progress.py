@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+
+
+def format_bytes(num_bytes):
+    """Formata uma quantidade de bytes em unidades binárias (KiB, MiB...)."""
+    if num_bytes is None:
+        return "?"
+    value = float(num_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:.2f}{unit}"
+        value /= 1024
+    return f"{value:.2f}TiB"
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressSnapshot:
+    """Estado de progresso de um job em um instante."""
+
+    def __init__(self, job_id, status, downloaded_bytes, total_bytes, speed, eta):
+        self.job_id = job_id
+        self.status = status
+        self.downloaded_bytes = downloaded_bytes
+        self.total_bytes = total_bytes
+        self.speed = speed
+        self.eta = eta
+
+    @property
+    def percent(self):
+        if self.total_bytes and self.downloaded_bytes is not None:
+            return min(100, int(self.downloaded_bytes / self.total_bytes * 100))
+        return None
+
+    def message(self):
+        speed = f"{format_bytes(self.speed)}/s" if self.speed else "velocidade desconhecida"
+        if self.percent is not None:
+            return (f"Baixando: {self.percent}% de {format_bytes(self.total_bytes)} "
+                    f"@ {speed}, restam {format_eta(self.eta)}")
+        return f"Baixando: {format_bytes(self.downloaded_bytes)} @ {speed}"
+
+
+class _JobProgress:
+    __slots__ = ('job', 'last_emit', 'sample_time', 'sample_bytes', 'speed', 'pending')
+
+    def __init__(self, job):
+        self.job = job
+        self.last_emit = 0.0
+        self.sample_time = None
+        self.sample_bytes = 0
+        self.speed = None
+        # Última atualização retida pelo limite: (status, baixado, total)
+        self.pending = None
+
+
+class ProgressAggregator:
+    """
+    Recebe cada chamada do progress hook do yt-dlp e repassa ao callback
+    no máximo `rate_hz` atualizações por segundo por job. As atualizações
+    intermediárias são descartadas, mas a última delas é emitida ao fim do
+    intervalo, então uma pausa no download não deixa na tela um estado
+    antigo. Velocidade e tempo restante são calculados aqui, com média
+    móvel exponencial, sem depender das strings formatadas do yt-dlp.
+    """
+
+    def __init__(self, callback, rate_hz=10, smoothing=0.3):
+        self.callback = callback
+        self.rate_hz = rate_hz
+        self.smoothing = smoothing
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pending = threading.Condition(self._lock)
+        # Mantido pelo flusher enquanto entrega as atualizações retidas
+        self._emitting = threading.Lock()
+        self._flusher = None
+
+    @property
+    def interval(self):
+        return 1.0 / self.rate_hz if self.rate_hz > 0 else 0.0
+
+    def update(self, job, d):
+        """Registra uma chamada do progress hook. Deve ser barato."""
+        now = time.monotonic()
+        downloaded = d.get('downloaded_bytes') or 0
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+
+        with self._lock:
+            state = self._jobs.get(job.id)
+            if state is None:
+                state = self._jobs[job.id] = _JobProgress(job)
+
+            if state.sample_time is None or downloaded < state.sample_bytes:
+                # Primeira amostra ou início de um novo arquivo (ex: áudio após o vídeo)
+                state.sample_time = now
+                state.sample_bytes = downloaded
+            elif now - state.sample_time >= 0.25:
+                instant = (downloaded - state.sample_bytes) / (now - state.sample_time)
+                if state.speed is None:
+                    state.speed = instant
+                else:
+                    state.speed = self.smoothing * instant + (1 - self.smoothing) * state.speed
+                state.sample_time = now
+                state.sample_bytes = downloaded
+
+            if d.get('status') == 'downloading' and now - state.last_emit < self.interval:
+                if state.pending is None:
+                    self._start_flusher()
+                    self._pending.notify()
+                state.pending = (d.get('status'), downloaded, total)
+                return
+            state.last_emit = now
+            state.pending = None
+            snapshot = self._snapshot(state, d.get('status'), downloaded, total)
+
+        self.callback(job, snapshot)
+
+    @staticmethod
+    def _snapshot(state, status, downloaded, total):
+        eta = None
+        if state.speed and total:
+            eta = max(0, total - downloaded) / state.speed
+        return ProgressSnapshot(state.job.id, status, downloaded, total, state.speed, eta)
+
+    def _start_flusher(self):
+        # Chamado com o lock; uma única thread atende todos os jobs
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_pending, name='progress-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_pending(self):
+        with self._pending:
+            while True:
+                now = time.monotonic()
+                due, wait = [], None
+                for state in self._jobs.values():
+                    if state.pending is None:
+                        continue
+                    remaining = state.last_emit + self.interval - now
+                    if remaining > 0:
+                        wait = remaining if wait is None else min(wait, remaining)
+                        continue
+                    due.append((state.job, self._snapshot(state, *state.pending)))
+                    state.last_emit = now
+                    state.pending = None
+                if not due:
+                    self._pending.wait(wait)
+                    continue
+                self._pending.release()
+                try:
+                    with self._emitting:
+                        for job, snapshot in due:
+                            self.callback(job, snapshot)
+                except Exception:
+                    logging.exception("Erro ao emitir progresso")
+                finally:
+                    self._pending.acquire()
+
+    def clear_pending(self, job):
+        """
+        Descarta a atualização retida do job e espera a entrega que o
+        flusher tiver em curso. Chamado antes de uma mensagem de estado
+        ("Processando...", "Download concluído!"), que senão poderia ser
+        sobrescrita por um progresso antigo.
+        """
+        with self._lock:
+            state = self._jobs.get(job.id)
+            if state is not None:
+                state.pending = None
+        with self._emitting:
+            pass
+
+    def finish(self, job):
+        """Descarta o estado do job (e a atualização retida) ao término do download."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        with self._emitting:
+            pass
@@ -0,0 +1,351 @@
+import logging
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Classes de erro
+RATE_LIMITED = 'rate_limited'
+SERVER = 'server'
+NETWORK = 'network'
+FORBIDDEN = 'forbidden'
+PERMANENT = 'permanent'
+# Classes que valem nova tentativa; as três primeiras também contam para o disjuntor do host
+RETRYABLE = (RATE_LIMITED, SERVER, NETWORK, FORBIDDEN)
+HOST_FAILURES = (RATE_LIMITED, SERVER, NETWORK)
+
+_HTTP_STATUS = re.compile(r'HTTP Error (\d{3})')
+# Mensagens dos extratores que indicam bloqueio por excesso de pedidos
+_RATE_LIMIT_MESSAGES = ('too many requests', 'rate-limit', 'rate limit', 'confirm you’re not a bot',
+                        "confirm you're not a bot")
+_PERMANENT_MESSAGES = ('unsupported url', 'video unavailable', 'private video', 'has been removed',
+                       'not available in your country', 'sign in to confirm your age', 'members-only',
+                       'requested format is not available')
+
+
+class ErrorClassification:
+    __slots__ = ('kind', 'status', 'retry_after')
+
+    def __init__(self, kind, status=None, retry_after=None):
+        self.kind = kind
+        # Código HTTP, quando a causa foi uma resposta HTTP
+        self.status = status
+        # Espera pedida pelo servidor (Retry-After), em segundos
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.kind in RETRYABLE
+
+    def __repr__(self):
+        return f"<ErrorClassification {self.kind} status={self.status} retry_after={self.retry_after}>"
+
+
+def _causes(error):
+    """Percorre a falha e as causas embrulhadas pelo yt-dlp (exc_info, cause, __cause__)."""
+    exc_info = getattr(error, 'exc_info', None)
+    cause = exc_info[1] if exc_info and exc_info[1] is not None else error
+    seen = set()
+    while cause is not None and id(cause) not in seen:
+        seen.add(id(cause))
+        yield cause
+        cause = cause.__cause__ or getattr(cause, 'cause', None) or cause.__context__
+        if not isinstance(cause, BaseException):
+            cause = None
+
+
+def parse_retry_after(value, now=None):
+    """Converte um cabeçalho Retry-After (segundos ou data HTTP) em segundos."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - (now if now is not None else time.time()))
+
+
+def classify(error):
+    """
+    Classifica uma falha de download ou extração: limite de pedidos (429),
+    erro do servidor (5xx), rede, acesso negado (403, em geral uma URL de
+    mídia expirada) ou permanente (404, vídeo privado, URL não suportada...).
+    """
+    from yt_dlp.networking.exceptions import HTTPError, TransportError
+
+    for cause in _causes(error):
+        if isinstance(cause, HTTPError):
+            response = getattr(cause, 'response', None)
+            headers = getattr(response, 'headers', None) or {}
+            return _classify_status(cause.status, parse_retry_after(headers.get('Retry-After')))
+        if isinstance(cause, (TransportError, ConnectionError, TimeoutError)):
+            return ErrorClassification(NETWORK)
+
+    message = str(error)
+    match = _HTTP_STATUS.search(message)
+    if match:
+        return _classify_status(int(match.group(1)))
+    lowered = message.lower()
+    if any(text in lowered for text in _RATE_LIMIT_MESSAGES):
+        return ErrorClassification(RATE_LIMITED)
+    if any(text in lowered for text in _PERMANENT_MESSAGES):
+        return ErrorClassification(PERMANENT)
+    if 'timed out' in lowered or 'connection reset' in lowered or 'temporary failure' in lowered:
+        return ErrorClassification(NETWORK)
+    return ErrorClassification(PERMANENT)
+
+
+def _classify_status(status, retry_after=None):
+    if status == 429:
+        return ErrorClassification(RATE_LIMITED, status, retry_after)
+    if status == 403:
+        return ErrorClassification(FORBIDDEN, status, retry_after)
+    if status >= 500 or status == 408:
+        return ErrorClassification(SERVER, status, retry_after)
+    return ErrorClassification(PERMANENT, status)
+
+
+def backoff_delay(attempt, base=2.0, cap=300.0, rng=random):
+    """
+    Espera exponencial com "full jitter": um valor sorteado entre 0 e
+    base * 2^(attempt-1), limitado a `cap`. O sorteio espalha as novas
+    tentativas de jobs que falharam juntos.
+    """
+    return rng.uniform(0, min(cap, base * 2 ** max(0, attempt - 1)))
+
+
+def host_of(url):
+    host = (urlparse(url).hostname or '').lower()
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de um host. Depois de `threshold` falhas seguidas ele abre e
+    os jobs do host esperam `cooldown` segundos sem fazer pedidos. Passado
+    o tempo, um único job de teste é liberado (meio aberto): se der certo o
+    disjuntor fecha; se falhar, abre de novo com o dobro da espera, até
+    `max_cooldown`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, threshold=5, cooldown=30.0, max_cooldown=600.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        # Início do job de teste em andamento (None = nenhum)
+        self._probe = None
+
+    def allow(self):
+        """Retorna 0 se o pedido pode seguir, ou quantos segundos esperar."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            now = self._clock()
+            remaining = self.opened_at + self.cooldown - now
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                self._probe = None
+            if self.state == self.HALF_OPEN:
+                # Um teste que não deu notícia (cancelado, erro de outra natureza) é substituído
+                if self._probe is None or now - self._probe > self.cooldown:
+                    self._probe = now
+                    return 0.0
+                # Outro job já está testando o host
+                return max(1.0, self.base_cooldown / 4)
+            return remaining
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probe = None
+
+    def record_failure(self, min_cooldown=0.0):
+        """Registra uma falha do host. Retorna True se o disjuntor abriu agora."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self.state == self.CLOSED and self.failures < self.threshold:
+                return False
+            opened = self.state != self.OPEN
+            self.state = self.OPEN
+            self.cooldown = max(self.cooldown, min(self.max_cooldown, min_cooldown))
+            self.opened_at = self._clock()
+            self._probe = None
+            return opened
+
+    def remaining(self):
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown - self._clock())
+
+
+class TokenBucket:
+    """
+    Balde de fichas para os pedidos de extração de um host, compartilhado
+    por todos os workers. A taxa se adapta: cai pela metade a cada limite
+    de pedidos (429) e volta aos poucos, a cada sucesso, até a taxa
+    configurada.
+    """
+
+    def __init__(self, rate=1.0, burst=5, min_rate=0.05, clock=time.monotonic):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Consome uma ficha e retorna 0, ou retorna quantos segundos faltam para a próxima."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, cancel_event=None):
+        """Espera uma ficha. Retorna False se `cancel_event` for sinalizado antes."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    def penalize(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def reward(self):
+        with self._lock:
+            if self.rate < self.base_rate:
+                self._refill()
+                self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+class RetryEngine:
+    """
+    Decide as novas tentativas dos jobs e protege os hosts que estão
+    limitando pedidos.
+
+    Cada falha é classificada (classify); para as temporárias, a espera
+    até a nova tentativa é exponencial e sorteada, respeitando o
+    Retry-After do servidor. Quantas tentativas fazer fica com o motor.
+    Por host há um disjuntor, que suspende os jobs do host depois de
+    falhas seguidas, e um balde de fichas que limita as extrações de
+    todos os workers juntos.
+    """
+
+    def __init__(self, base_delay=2.0, max_delay=300.0, extraction_rate=1.0, extraction_burst=5,
+                 breaker_threshold=5, breaker_cooldown=30.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.extraction_rate = extraction_rate
+        self.extraction_burst = extraction_burst
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._breakers = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        host = host_of(url)
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown,
+                                                                max(self.max_delay, self.breaker_cooldown))
+            return breaker
+
+    def bucket(self, url):
+        host = host_of(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.extraction_rate, self.extraction_burst)
+            return bucket
+
+    def wait_for_host(self, url, rng=random):
+        """
+        Segundos que os jobs de `url` ainda devem esperar pelo disjuntor do
+        host (0 = liberado). A espera leva um acréscimo sorteado, para que os
+        jobs suspensos não voltem todos no mesmo instante.
+        """
+        wait = self.breaker(url).allow()
+        return wait + rng.uniform(0, wait / 2) if wait else 0.0
+
+    def throttle_extraction(self, url, cancel_event=None):
+        """Espera a vez de fazer um pedido de extração ao host de `url`."""
+        if not self.extraction_rate:
+            return True
+        return self.bucket(url).acquire(cancel_event)
+
+    def record_success(self, url):
+        self.breaker(url).record_success()
+        if self.extraction_rate:
+            self.bucket(url).reward()
+
+    def record_failure(self, url, error):
+        """Classifica a falha e a registra no disjuntor e no balde do host."""
+        classification = classify(error)
+        retry_after = classification.retry_after or 0.0
+        if classification.kind == RATE_LIMITED and self.extraction_rate:
+            self.bucket(url).penalize()
+        if classification.kind in HOST_FAILURES:
+            breaker = self.breaker(url)
+            if breaker.record_failure(min_cooldown=retry_after):
+                logging.warning("Host %s suspenso por %.0fs após falhas seguidas", host_of(url), breaker.cooldown)
+        return classification
+
+    def on_failure(self, url, error, attempt):
+        """
+        Registra a falha da tentativa `attempt` (a partir de 1) e retorna
+        (classificação, espera em segundos). A espera é None quando a falha
+        não é temporária.
+        """
+        classification = self.record_failure(url, error)
+        if not classification.retryable:
+            return classification, None
+        delay = max(classification.retry_after or 0.0, backoff_delay(attempt, self.base_delay, self.max_delay))
+        return classification, max(delay, self.breaker(url).remaining())
+
+    def hosts(self):
+        """Estado dos hosts conhecidos: {host: (estado do disjuntor, taxa de extração)}."""
+        with self._lock:
+            hosts = set(self._breakers) | set(self._buckets)
+            return {host: (self._breakers[host].state if host in self._breakers else CircuitBreaker.CLOSED,
+                           self._buckets[host].rate if host in self._buckets else self.extraction_rate)
+                    for host in sorted(hosts)}
@@ -0,0 +1,101 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Formatos de legenda preferidos, na ordem; a incorporação converte para o do contêiner
+SUBTITLE_FORMAT = 'vtt/srt/best'
+
+
+class SidecarFiles:
+    """Arquivos auxiliares gravados para um vídeo."""
+
+    __slots__ = ('thumbnail', 'subtitles', 'info_json')
+
+    def __init__(self, thumbnail=None, subtitles=None, info_json=None):
+        self.thumbnail = thumbnail
+        # {idioma: arquivo}
+        self.subtitles = subtitles or {}
+        self.info_json = info_json
+
+    def paths(self):
+        return [path for path in (self.thumbnail, *self.subtitles.values(), self.info_json) if path]
+
+    def __bool__(self):
+        return bool(self.paths())
+
+
+def sidecar_params(ydl_opts, thumbnail=False, subtitle_langs=(), info_json=False):
+    """
+    Opções do yt-dlp para gravar só os arquivos auxiliares pedidos, sem
+    baixar a mídia. Retorna None se nenhum foi pedido.
+    """
+    if not (thumbnail or subtitle_langs or info_json):
+        return None
+    params = {name: value for name, value in ydl_opts.items()
+              if name not in ('progress_hooks', 'postprocessor_hooks', 'postprocessors')}
+    params.update({
+        'skip_download': True,
+        'writethumbnail': bool(thumbnail),
+        'writesubtitles': bool(subtitle_langs),
+        # Legendas automáticas só entram nos idiomas sem legenda própria
+        'writeautomaticsub': bool(subtitle_langs),
+        'subtitleslangs': list(subtitle_langs),
+        'subtitlesformat': SUBTITLE_FORMAT,
+        'writeinfojson': bool(info_json),
+    })
+    return params
+
+
+def collect(result, info_json=None):
+    """
+    Lê do resultado de process_ie_result os arquivos auxiliares que o
+    yt-dlp gravou. O caminho do info.json fica só na cópia do resultado
+    usada no download, então pode ser informado à parte.
+    """
+    result = result or {}
+    thumbnail = next((thumb['filepath'] for thumb in reversed(result.get('thumbnails') or [])
+                      if thumb.get('filepath') and os.path.exists(thumb['filepath'])), None)
+    subtitles = {lang: sub['filepath'] for lang, sub in (result.get('requested_subtitles') or {}).items()
+                 if sub.get('filepath') and os.path.exists(sub['filepath'])}
+    info_json = result.get('infojson_filename') or info_json
+    return SidecarFiles(thumbnail, subtitles, info_json if info_json and os.path.exists(info_json) else None)
+
+
+class SidecarStage:
+    """
+    Busca dos arquivos auxiliares (miniatura, legendas, info.json) em
+    paralelo com o download da mídia. São pedidos pequenos, feitos a
+    partir das informações já extraídas: nada é extraído de novo. O pool
+    é separado para não ocupar os workers de download nem o executor das
+    prévias.
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sidecar')
+
+    def submit(self, fn, *args):
+        """Agenda `fn(*args)` e retorna um concurrent.futures.Future com o resultado."""
+        def run():
+            try:
+                return fn(*args)
+            except Exception:
+                logging.exception("Erro ao buscar arquivos auxiliares")
+                raise
+
+        return self._executor.submit(run)
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def metadata_tags(info):
+    """Tags de metadados para o arquivo final, a partir das informações extraídas."""
+    upload_date = info.get('upload_date') or ''
+    tags = {
+        'title': info.get('title'),
+        'artist': info.get('artist') or info.get('uploader') or info.get('channel'),
+        'date': f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:8]}" if len(upload_date) == 8 else None,
+        'comment': info.get('webpage_url'),
+        'description': info.get('description'),
+    }
+    return {name: value for name, value in tags.items() if value}
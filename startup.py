@@ -0,0 +1,120 @@
+"""
+Tempo de inicialização do YouTube Downloader.
+
+Em tempo de execução, `StartupTimer` marca as etapas até a janela
+aparecer e registra no log se o orçamento foi estourado. Fora do app,
+o relatório de importação mede um processo limpo:
+
+    python -m startup [--module main] [--top 15] [--budget 600]
+
+O relatório usa `python -X importtime` e lista os módulos mais caros. O
+código de saída é 1 se a importação passar do orçamento ou se o yt-dlp
+for carregado já na importação do módulo (ele deve ser carregado sob
+demanda, em segundo plano).
+"""
+import argparse
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Marcado o mais cedo possível: main.py importa este módulo antes do PySide6
+PROCESS_START = time.perf_counter()
+
+# Orçamentos em milissegundos, ajustáveis por variável de ambiente
+STARTUP_BUDGET_MS = int(os.environ.get('YTDL_STARTUP_BUDGET_MS', 1500))
+IMPORT_BUDGET_MS = int(os.environ.get('YTDL_IMPORT_BUDGET_MS', 600))
+
+# Módulos que não devem ser importados antes de a janela aparecer
+LAZY_MODULES = ('yt_dlp',)
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\S+)')
+
+
+class StartupTimer:
+    """Marcas de tempo (em ms desde PROCESS_START) das etapas da inicialização."""
+
+    def __init__(self, budget_ms=STARTUP_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.marks = []
+
+    def mark(self, name):
+        elapsed = (time.perf_counter() - PROCESS_START) * 1000
+        self.marks.append((name, elapsed))
+        return elapsed
+
+    @property
+    def total_ms(self):
+        return self.marks[-1][1] if self.marks else 0.0
+
+    def report(self):
+        steps = ', '.join(f"{name}={elapsed:.0f}ms" for name, elapsed in self.marks)
+        lazy = [name for name in LAZY_MODULES if name in sys.modules]
+        if self.total_ms > self.budget_ms:
+            logging.warning("Inicialização em %.0f ms, acima do orçamento de %d ms (%s)",
+                            self.total_ms, self.budget_ms, steps)
+        else:
+            logging.info("Inicialização em %.0f ms (orçamento %d ms; %s)", self.total_ms, self.budget_ms, steps)
+        if lazy:
+            logging.warning("Módulos carregados antes da janela: %s", ', '.join(lazy))
+        return self.total_ms <= self.budget_ms and not lazy
+
+
+def import_report(module='main', top=15):
+    """
+    Importa `module` em um processo limpo com `-X importtime` e retorna
+    (total em ms, [(módulo, próprio ms, acumulado ms)] dos mais caros,
+    módulos sob demanda que foram carregados).
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, env={**os.environ, 'QT_QPA_PLATFORM': 'offscreen'})
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else
+                           f"falha ao importar {module}")
+    rows = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, name = match.groups()
+        rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+        if name == module:
+            total_us = int(cumulative_us)
+    loaded = {name for name, _, _ in rows}
+    lazy = [name for name in LAZY_MODULES if name in loaded]
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return total_us / 1000, rows[:top], lazy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m startup', description="Relatório do tempo de importação.")
+    parser.add_argument('--module', default='main', help="módulo a importar (padrão: main)")
+    parser.add_argument('--top', type=int, default=15, help="quantidade de módulos listados")
+    parser.add_argument('--budget', type=int, default=IMPORT_BUDGET_MS, help="orçamento da importação em ms")
+    args = parser.parse_args(argv)
+
+    try:
+        total_ms, rows, lazy = import_report(args.module, args.top)
+    except RuntimeError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+
+    print(f"{'acumulado':>10} {'próprio':>9}  módulo")
+    for name, self_ms, cumulative_ms in rows:
+        print(f"{cumulative_ms:>8.1f}ms {self_ms:>7.1f}ms  {name}")
+    print(f"\nImportação de {args.module}: {total_ms:.1f} ms (orçamento {args.budget} ms)")
+    ok = total_ms <= args.budget
+    if not ok:
+        print("ACIMA DO ORÇAMENTO")
+    if lazy:
+        print(f"Carregados na importação, deveriam ser sob demanda: {', '.join(lazy)}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
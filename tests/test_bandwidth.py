@@ -0,0 +1,20 @@
+import pytest
+
+from bandwidth import max_min_shares
+
+
+def test_equal_split_without_limited_jobs():
+    assert max_min_shares(300, {1: None, 2: None, 3: None}) == {1: 100, 2: 100, 3: 100}
+
+
+def test_unused_share_goes_to_the_others():
+    shares = max_min_shares(300, {1: 40, 2: None, 3: None})
+    assert shares == {1: 40, 2: 130, 3: 130}
+    assert sum(shares.values()) == 300
+
+
+def test_demands_above_fair_share_are_capped():
+    shares = max_min_shares(300, {1: 50, 2: 500, 3: None})
+    assert shares[1] == 50
+    assert shares[2] == pytest.approx(125)
+    assert shares[3] == pytest.approx(125)
@@ -0,0 +1,52 @@
+import json
+import urllib.request
+
+import pytest
+from yt_dlp import YoutubeDL
+
+from benchmarks import run
+from benchmarks.fake_extractor import FakeMediaIE, FakeMediaPlaylistIE, playlist_url, watch_url
+from benchmarks.media_server import MediaServer
+
+
+@pytest.fixture
+def server():
+    with MediaServer() as server:
+        yield server
+
+
+def test_parse_size():
+    assert run.parse_size('64K') == 64 * 1024
+    assert run.parse_size('1.5MiB') == 1536 * 1024
+    assert run.parse_size('100') == 100
+
+
+def test_media_server_honours_range(server):
+    request = urllib.request.Request(f"{server.base_url}/media/x.mp4?size=1000", headers={'Range': 'bytes=100-'})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        assert response.status == 206
+        assert response.headers['Content-Range'] == 'bytes 100-999/1000'
+        assert len(response.read()) == 900
+
+
+def test_fake_extractors_resolve_without_network(server):
+    with YoutubeDL({'quiet': True}, auto_init=False) as ydl:
+        ydl.add_info_extractor(FakeMediaIE())
+        ydl.add_info_extractor(FakeMediaPlaylistIE())
+        video = ydl.extract_info(watch_url(server.base_url, 'hls', 'v1', 4096, 4), download=False)
+        assert video['id'] == 'v1'
+        assert video['format_id'] == 'hls'
+        playlist = ydl.extract_info(playlist_url(server.base_url, 'dash', 3, 4096, 4), download=False,
+                                    process=False)
+        assert [entry['id'] for entry in playlist['entries']] == ['dash0', 'dash1', 'dash2']
+
+
+def test_runner_reports_a_single_download(tmp_path):
+    output = tmp_path / 'report.json'
+    code = run.main(['--modes', 'single', '--kinds', 'progressive', '--size', '64K', '--workers', '1',
+                     '--output', str(output)])
+    report = json.loads(output.read_text(encoding='utf-8'))
+    assert code == 0, report['results']
+    [result] = report['results']
+    assert result['completed'] == 1
+    assert result['bytes'] == 64 * 1024
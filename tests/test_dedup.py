@@ -0,0 +1,29 @@
+from dedup import DedupIndex
+from history_store import HistoryStore
+
+
+def test_contains_matches_type_and_quality():
+    index = DedupIndex()
+    index.add('Youtube', 'abc', 'mp3', '192k')
+    assert index.contains('youtube', 'abc', 'mp3', '192k')
+    assert not index.contains('Youtube', 'abc', 'mp3', '320k')
+    assert not index.contains(None, 'abc', 'mp3', '192k')
+
+
+def test_archive_matches_any_format(tmp_path):
+    archive = tmp_path / 'archive.txt'
+    archive.write_text("youtube abc\n\nvimeo 42\n", encoding='utf-8')
+    index = DedupIndex(archive_path=archive)
+    assert index.load_archive() == 2
+    assert index.contains('Youtube', 'abc', 'mp4', '720p')
+
+
+def test_history_lookup_while_loading(tmp_path):
+    history = HistoryStore(tmp_path / 'history.db')
+    history.add('t', 'mp3', '192k', extractor='Youtube', video_id='abc')
+    index = DedupIndex()
+    index._pending_history = history
+    assert index.contains('Youtube', 'abc', 'mp3', '192k')
+    index.load_history_async(history).join()
+    assert index._pending_history is None
+    assert index.contains('Youtube', 'abc', 'mp3', '192k')
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from download_queue import DownloadJob, DownloadQueue
+from orchestrator import JobRetry, Orchestrator
+
+
+@pytest.fixture
+def orchestrator():
+    orchestrator = Orchestrator(download_threads=4, extraction_threads=1)
+    yield orchestrator
+    orchestrator.shutdown()
+
+
+def run_queue(orchestrator, handler, jobs, max_workers=1):
+    finished = []
+    done = threading.Event()
+
+    def on_finished(job):
+        finished.append(job)
+        if len(finished) == len(jobs):
+            done.set()
+
+    queue = DownloadQueue(handler, orchestrator, max_workers=max_workers, on_finished=on_finished,
+                          retry_backoff=0.01)
+    handler.gate = gate = threading.Event()
+    # O primeiro job segura o único worker até todos estarem na fila
+    blocker = DownloadJob('blocker', 'mp3', None, priority=100)
+    queue.submit(blocker)
+    jobs = [blocker] + jobs
+    for job in jobs[1:]:
+        queue.submit(job)
+    orchestrator.call_soon(gate.set)
+    assert done.wait(5)
+    return finished
+
+
+def test_higher_priority_runs_first(orchestrator):
+    order = []
+
+    def handler(job):
+        handler.gate.wait(5)
+        order.append(job.url)
+
+    jobs = [DownloadJob('low', 'mp3', None), DownloadJob('high', 'mp3', None, priority=5),
+            DownloadJob('low-2', 'mp3', None)]
+    run_queue(orchestrator, handler, jobs)
+    assert order == ['blocker', 'high', 'low', 'low-2']
+
+
+def test_job_retry_requeues_until_success(orchestrator):
+    def handler(job):
+        handler.gate.wait(5)
+        if job.url == 'flaky' and job.attempts < 3:
+            raise JobRetry("temporária", delay=0.01)
+
+    flaky = DownloadJob('flaky', 'mp3', None)
+    run_queue(orchestrator, handler, [flaky])
+    assert flaky.status == 'done'
+    assert flaky.attempts == 3
+
+
+def test_retry_without_consuming_attempt(orchestrator):
+    calls = []
+
+    def handler(job):
+        handler.gate.wait(5)
+        calls.append(job.url)
+        if job.url == 'waiting' and calls.count('waiting') < 3:
+            raise JobRetry("aguardando disco", delay=0.01, consume_attempt=False)
+
+    waiting = DownloadJob('waiting', 'mp3', None)
+    run_queue(orchestrator, handler, [waiting])
+    assert waiting.status == 'done'
+    assert waiting.attempts == 1
+
+
+def test_enumeration_does_not_hold_extraction_threads(orchestrator):
+    release = threading.Event()
+    enumerations = [orchestrator.run_blocking(release.wait, 5, executor=orchestrator.enumeration_executor)
+                    for _ in range(3)]
+    assert orchestrator.run_blocking(lambda: 'prévia').result(2) == 'prévia'
+    release.set()
+    assert all(future.result(5) for future in enumerations)
+
+
+def test_workers_beyond_the_executor_size_run_at_once(orchestrator):
+    started = threading.Barrier(6, timeout=5)
+
+    def handler(job):
+        handler.gate.wait(5)
+        started.wait()
+
+    jobs = [DownloadJob(f'job-{index}', 'mp3', None) for index in range(5)]
+    finished = run_queue(orchestrator, handler, jobs, max_workers=6)
+    assert orchestrator.download_threads == 6
+    assert all(job.status == 'done' for job in finished)
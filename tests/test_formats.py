@@ -0,0 +1,72 @@
+from formats import FormatProfile, estimate_size, select_formats
+
+FORMATS = [
+    {'format_id': '18', 'ext': 'mp4', 'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2', 'height': 360, 'tbr': 500},
+    {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'none', 'height': 1080, 'tbr': 4000},
+    {'format_id': '136', 'ext': 'mp4', 'vcodec': 'avc1.4d401f', 'acodec': 'none', 'height': 720, 'tbr': 2000},
+    {'format_id': '248', 'ext': 'webm', 'vcodec': 'vp9', 'acodec': 'none', 'height': 1080, 'tbr': 3000},
+    {'format_id': '399', 'ext': 'mp4', 'vcodec': 'av01.0.08M.08', 'acodec': 'none', 'height': 1080, 'tbr': 2500},
+    {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129},
+    {'format_id': '139', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.5', 'abr': 48},
+    {'format_id': '251', 'ext': 'webm', 'vcodec': 'none', 'acodec': 'opus', 'abr': 160},
+    {'format_id': 'sb0', 'ext': 'mhtml', 'vcodec': 'none', 'acodec': 'none'},
+    {'format_id': 'drm', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none', 'height': 2160, 'has_drm': True},
+]
+
+
+def spec(download_type, quality, formats=FORMATS, duration=None):
+    selection = select_formats(formats, FormatProfile.from_choice(download_type, quality), duration)
+    return selection.format_spec if selection else None
+
+
+def test_profile_from_choice():
+    profile = FormatProfile.from_choice("Vídeo (MP4)", "720p")
+    assert (profile.container, profile.max_height, profile.audio_only) == ('mp4', 720, False)
+    profile = FormatProfile.from_choice("Áudio (MP3)", "Padrão (192k)")
+    assert (profile.container, profile.audio_only, profile.audio_bitrate) == ('mp3', True, 192)
+    assert FormatProfile.from_choice("Vídeo (MKV)", "Pior").worst
+
+
+def test_mp4_pairs_copyable_codecs():
+    # VP9 em WebM não entra em MP4 sem recodificar; AV1 entra, mas perde para o H.264 de mesma altura
+    assert spec("Vídeo (MP4)", "Melhor") == '137+140'
+
+
+def test_mp4_respects_max_height():
+    assert spec("Vídeo (MP4)", "720p") == '136+140'
+
+
+def test_mkv_prefers_best_codec():
+    assert spec("Vídeo (MKV)", "Melhor") == '399+251'
+
+
+def test_worst_quality():
+    assert spec("Vídeo (MKV)", "Pior") == '136+139'
+
+
+def test_audio_m4a_prefers_copyable_aac():
+    assert spec("Áudio (M4A)", "Melhor") == '140'
+
+
+def test_audio_bitrate_picks_smallest_sufficient():
+    assert spec("Áudio (MP3)", "Padrão (128k)") == '140'
+    assert spec("Áudio (MP3)", "Alta (150k)") == '251'
+
+
+def test_drm_and_storyboards_are_ignored():
+    assert 'drm' not in spec("Vídeo (MKV)", "Melhor")
+    assert spec("Vídeo (MKV)", "Melhor", formats=[f for f in FORMATS if f['format_id'] in ('sb0', 'drm')]) is None
+
+
+def test_falls_back_to_progressive():
+    progressive = [f for f in FORMATS if f['format_id'] == '18']
+    assert spec("Vídeo (MP4)", "Melhor", formats=progressive) == '18'
+    assert spec("Áudio (MP3)", "Padrão (192k)", formats=progressive) == '18'
+
+
+def test_estimated_size():
+    assert estimate_size({'filesize': 1000}) == 1000
+    assert estimate_size({'tbr': 800}, duration=10) == 1_000_000
+    assert estimate_size({'tbr': 800}) is None
+    selection = select_formats(FORMATS, FormatProfile.from_choice("Vídeo (MP4)", "720p"), duration=10)
+    assert selection.estimated_size == estimate_size(FORMATS[2], 10) + estimate_size(FORMATS[5], 10)
@@ -0,0 +1,32 @@
+import pytest
+
+from ingest import IngestService, parse_item, parse_line
+
+
+def test_parse_line_reads_tags():
+    item = parse_line("https://example.com/v type=mp3 quality=best priority=3", source='watch')
+    assert (item.url, item.download_type, item.quality, item.priority) == (
+        "https://example.com/v", "Áudio (MP3)", "Melhor (320k)", 3)
+    assert parse_line("  # comentário") is None
+
+
+def test_quality_uses_the_interface_labels():
+    assert parse_line("https://example.com/v type=mp3 quality=192k").quality == "Padrão (192k)"
+    assert parse_line("https://example.com/v type=m4a quality=128K").quality == "Boa (128k)"
+    assert parse_line("https://example.com/v").quality == "720p"
+    with pytest.raises(ValueError, match="qualidade inválida"):
+        parse_line("https://example.com/v quality=foo")
+    with pytest.raises(ValueError, match="qualidade inválida"):
+        parse_line("https://example.com/v type=mp4 quality=192k")
+
+
+@pytest.mark.parametrize('priority', [[1], {}, 'alta'])
+def test_invalid_priority_is_a_value_error(priority):
+    with pytest.raises(ValueError, match="prioridade inválida"):
+        parse_item("https://example.com/v", {'priority': priority})
+
+
+def test_json_body_counts_bad_entries_as_invalid():
+    service = IngestService(engine=None)
+    body = b'[{"url": "https://example.com/a", "priority": [1]}, {"url": "ftp://x"}, 3]'
+    assert service.ingest_body(body, 'application/json') == (202, {'accepted': 0, 'duplicates': 0, 'invalid': 3})
@@ -0,0 +1,74 @@
+import time
+
+from metadata_cache import MetadataCache, _url_dispatch
+
+
+def info(video_id, title='t'):
+    return {'id': video_id, 'extractor_key': 'Fake', 'title': title}
+
+
+def test_generic_urls_are_aliased_to_the_video_entry():
+    cache = MetadataCache(max_entries=4)
+    cache.put('http://example.com/a', info('1', 'um'))
+    assert list(cache._entries) == ['Fake:1']
+    assert cache.get('http://example.com/a')['title'] == 'um'
+
+
+def test_lru_keeps_max_entries():
+    cache = MetadataCache(max_entries=2)
+    for i in range(3):
+        cache.put(f'http://example.com/{i}', info(str(i)))
+    assert cache.get('http://example.com/0') is None
+    assert cache.get('http://example.com/2') is not None
+    assert len(cache._entries) == 2
+
+
+def test_ttl_expires_entries(monkeypatch):
+    cache = MetadataCache(ttl=10)
+    cache.put('http://example.com/a', info('1'))
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get('http://example.com/a') is None
+
+
+def test_get_returns_a_copy():
+    cache = MetadataCache()
+    cache.put('http://example.com/a', info('1'))
+    cache.get('http://example.com/a')['title'] = 'alterado'
+    assert cache.get('http://example.com/a')['title'] == 't'
+
+
+def test_disk_store_survives_restart_and_invalidate(tmp_path):
+    MetadataCache(store_path=tmp_path).put('http://example.com/a', info('1', 'um'))
+    cache = MetadataCache(store_path=tmp_path)
+    assert cache.get('http://example.com/a')['title'] == 'um'
+    cache.invalidate('http://example.com/a')
+    assert MetadataCache(store_path=tmp_path).get('http://example.com/a') is None
+
+
+def test_prune_disk_removes_excess_entries(tmp_path):
+    cache = MetadataCache(store_path=tmp_path, max_disk_entries=3)
+    for i in range(5):
+        cache.put(f'http://example.com/{i}', info(str(i)))
+    cache.prune_disk()
+    assert len(list(tmp_path.glob('*.json'))) == 3
+
+
+def test_url_dispatch_agrees_with_the_extractor_scan():
+    from yt_dlp.extractor import gen_extractor_classes
+
+    def scan(url):
+        for ie in gen_extractor_classes():
+            if ie.ie_key() != 'Generic' and ie.suitable(url):
+                return ie.ie_key()
+        return None
+
+    dispatch = _url_dispatch()
+    for url in ['https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+                'https://www.youtube.com/playlist?list=PLBCF2DAC6FFB574DE',
+                'https://vimeo.com/56015672',
+                'https://www.manyvids.com/Video/530341/mv-tips-tricks',
+                'https://example.com/video.mp4']:
+        match = dispatch.match(url)
+        assert (match[0] if match else None) == scan(url)
+    assert MetadataCache().resolve_url('https://vimeo.com/56015672') == ('Vimeo', '56015672')
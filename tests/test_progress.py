@@ -0,0 +1,41 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from progress import ProgressAggregator
+
+
+def downloading(downloaded, total=1000):
+    return {'status': 'downloading', 'downloaded_bytes': downloaded, 'total_bytes': total}
+
+
+def collect(rate_hz=20):
+    received = []
+    emitted = threading.Event()
+
+    def callback(job, snapshot):
+        received.append(snapshot.downloaded_bytes)
+        emitted.set()
+
+    return ProgressAggregator(callback, rate_hz=rate_hz), received, emitted
+
+
+def test_throttled_update_is_flushed_after_the_interval():
+    aggregator, received, emitted = collect()
+    job = SimpleNamespace(id=1)
+    aggregator.update(job, downloading(100))
+    emitted.clear()
+    aggregator.update(job, downloading(200))
+    aggregator.update(job, downloading(300))
+    assert emitted.wait(1)
+    assert received == [100, 300]
+
+
+def test_clear_pending_drops_the_held_update():
+    aggregator, received, _ = collect()
+    job = SimpleNamespace(id=1)
+    aggregator.update(job, downloading(100))
+    aggregator.update(job, downloading(200))
+    aggregator.clear_pending(job)
+    time.sleep(aggregator.interval * 3)
+    assert received == [100]
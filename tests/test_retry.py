@@ -0,0 +1,172 @@
+import random
+
+import pytest
+
+from retry import (FORBIDDEN, NETWORK, PERMANENT, RATE_LIMITED, SERVER, CircuitBreaker, RetryEngine,
+                   TokenBucket, backoff_delay, classify, host_of, parse_retry_after)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.mark.parametrize('message, kind', [
+    ("ERROR: unable to download video data: HTTP Error 429: Too Many Requests", RATE_LIMITED),
+    ("ERROR: HTTP Error 503: Service Unavailable", SERVER),
+    ("ERROR: HTTP Error 403: Forbidden", FORBIDDEN),
+    ("ERROR: HTTP Error 404: Not Found", PERMANENT),
+    ("ERROR: [youtube] abc: Video unavailable", PERMANENT),
+    ("ERROR: Sign in to confirm you're not a bot", RATE_LIMITED),
+    ("ERROR: The read operation timed out", NETWORK),
+    ("ERROR: algo totalmente inesperado", PERMANENT),
+])
+def test_classify_messages(message, kind):
+    assert classify(Exception(message)).kind == kind
+
+
+def test_classify_walks_wrapped_causes():
+    try:
+        try:
+            raise ConnectionResetError("reset")
+        except ConnectionResetError as e:
+            raise RuntimeError("falha ao baixar") from e
+    except RuntimeError as error:
+        assert classify(error).kind == NETWORK
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:30 GMT", now=1445412480.0) == 30.0
+    assert parse_retry_after("amanhã") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    rng = random.Random(1)
+    for attempt in range(1, 12):
+        delay = backoff_delay(attempt, base=2.0, cap=60.0, rng=rng)
+        assert 0 <= delay <= min(60.0, 2.0 * 2 ** (attempt - 1))
+
+
+def test_host_of_strips_common_prefixes():
+    assert host_of("https://www.YouTube.com/watch?v=x") == "youtube.com"
+    assert host_of("https://m.example.org/a") == "example.org"
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10, clock=clock)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() == 10
+
+
+def test_breaker_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10, clock=clock)
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow() == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Enquanto o teste não termina, os outros jobs esperam
+    assert breaker.allow() > 0
+
+
+def test_breaker_probe_success_closes(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10, clock=clock)
+    breaker.record_failure()
+    clock.advance(10)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow() == 0
+
+
+def test_breaker_probe_failure_doubles_cooldown(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10, max_cooldown=25, clock=clock)
+    breaker.record_failure()
+    clock.advance(10)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.cooldown == 20
+    clock.advance(20)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.cooldown == 25
+
+
+def test_breaker_abandoned_probe_is_replaced(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10, clock=clock)
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow() == 0
+    clock.advance(11)
+    assert breaker.allow() == 0
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_token_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert bucket.try_acquire() == 0.0
+
+
+def test_token_bucket_penalize_and_reward(clock):
+    bucket = TokenBucket(rate=1.0, burst=1, min_rate=0.3, clock=clock)
+    bucket.penalize()
+    assert bucket.rate == 0.5
+    bucket.penalize()
+    bucket.penalize()
+    assert bucket.rate == 0.3
+    for _ in range(20):
+        bucket.reward()
+    assert bucket.rate == 1.0
+
+
+def test_engine_retryable_failure_gets_delay():
+    engine = RetryEngine(base_delay=1.0, max_delay=8.0, extraction_rate=None)
+    classification, delay = engine.on_failure("https://example.com/v", Exception("HTTP Error 503"), attempt=2)
+    assert classification.kind == SERVER
+    assert 0 <= delay <= 2.0
+
+
+def test_engine_permanent_failure_has_no_delay():
+    engine = RetryEngine(extraction_rate=None)
+    classification, delay = engine.on_failure("https://example.com/v", Exception("HTTP Error 404"), attempt=1)
+    assert classification.kind == PERMANENT
+    assert delay is None
+
+
+def test_engine_breaker_is_per_host():
+    engine = RetryEngine(extraction_rate=None, breaker_threshold=2, breaker_cooldown=30)
+    for _ in range(2):
+        engine.record_failure("https://a.example/1", Exception("HTTP Error 503"))
+    assert engine.wait_for_host("https://a.example/2", rng=random.Random(0)) > 0
+    assert engine.wait_for_host("https://b.example/1") == 0
+    engine.record_success("https://a.example/3")
+    assert engine.wait_for_host("https://a.example/2") == 0
@@ -0,0 +1,33 @@
+import pytest
+from yt_dlp import YoutubeDL
+
+from ydl_pool import YoutubeDLPool
+
+
+@pytest.fixture
+def pool():
+    pool = YoutubeDLPool(lambda params: YoutubeDL({**params, 'quiet': True}))
+    yield pool
+    pool.close()
+
+
+def test_instances_are_reused_across_per_use_options(pool):
+    with pool.acquire({'format': 'best', 'outtmpl': {'default': 'a.%(ext)s'}}):
+        pass
+    with pool.acquire({'format': 'worst', 'outtmpl': {'default': 'b.%(ext)s'}}) as ydl:
+        assert ydl.params['format'] == 'worst'
+    assert (pool.created, pool.reused) == (1, 1)
+
+
+def test_reconfigured_swaps_and_restores_per_use_options(pool):
+    params = {'format': 'best', 'outtmpl': {'default': 'a.%(ext)s'}}
+    with pool.acquire(params) as ydl:
+        with pool.reconfigured(ydl, {**params, 'format': '18', 'outtmpl': {'default': 'part.%(ext)s'}}):
+            assert ydl.params['format'] == '18'
+            assert ydl.params['outtmpl']['default'] == 'part.%(ext)s'
+        assert ydl.params['format'] == 'best'
+        assert ydl.params['outtmpl']['default'] == 'a.%(ext)s'
+        with pytest.raises(ValueError):
+            with pool.reconfigured(ydl, {**params, 'ratelimit': 1024}):
+                pass
+    assert pool.created == 1
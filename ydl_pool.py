@@ -0,0 +1,201 @@
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Opções trocadas a cada uso, sem exigir outra instância
+PER_USE_KEYS = ('format', 'outtmpl', 'progress_hooks', 'postprocessor_hooks')
+# Estado interno do YoutubeDL trocado em _configure. Não faz parte da API
+# pública: a versão do yt-dlp fica fixada em requirements.txt e uma versão
+# sem esses atributos é recusada logo na primeira instância
+REQUIRED_ATTRIBUTES = ('format_selector', 'build_format_selector', '_parse_outtmpl', '_progress_hooks',
+                       '_postprocessor_hooks', 'add_progress_hook', 'add_postprocessor_hook')
+
+
+class IncompatibleYoutubeDLError(RuntimeError):
+    """A versão instalada do yt-dlp não tem o estado interno que o pool reconfigura."""
+
+
+def check_compatibility(ydl):
+    missing = [name for name in REQUIRED_ATTRIBUTES if not hasattr(ydl, name)]
+    if missing:
+        import yt_dlp.version
+        raise IncompatibleYoutubeDLError(
+            f"yt-dlp {yt_dlp.version.__version__} não é compatível com o pool de instâncias "
+            f"(faltam {', '.join(missing)}); instale a versão de requirements.txt")
+
+
+class YoutubeDLPool:
+    """
+    Instâncias de YoutubeDL de longa duração, agrupadas pelas opções.
+
+    Criar um YoutubeDL por job descarta cookies, conexões keep-alive e
+    sessões TLS (os request handlers), além do que os extratores guardam
+    em memória, como o código do player usado para decifrar assinaturas.
+    Aqui cada instância é emprestada a uma thread por vez e volta ao pool
+    ao fim do uso; jobs seguidos com as mesmas opções reaproveitam tudo
+    isso. Formato, modelo de nome e hooks (PER_USE_KEYS) são trocados a
+    cada empréstimo (ou dentro dele, com reconfigured()) e não entram na
+    chave.
+
+    Uma instância que terminou com erro é fechada em vez de voltar ao
+    pool, porque o estado interno dela pode ter ficado inconsistente. Já
+    as exceções de controle de fluxo (`keep_on`, cancelamento do job,
+    KeyboardInterrupt) devolvem a instância normalmente.
+    """
+
+    def __init__(self, factory, max_idle=8, max_uses=100, keep_on=()):
+        # factory(params) -> YoutubeDL, chamado só com as opções fixas
+        self._factory = factory
+        self.keep_on = tuple(keep_on)
+        self.max_idle = max_idle
+        # Instâncias são aposentadas depois de tantos usos, para limitar o estado acumulado
+        self.max_uses = max_uses
+        self._idle = OrderedDict()
+        self._uses = {}
+        # {id da instância emprestada: (chave, opções por uso atuais)}
+        self._borrowed = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def key(params):
+        return repr(sorted((name, value) for name, value in params.items() if name not in PER_USE_KEYS))
+
+    @contextmanager
+    def acquire(self, params, cancel_event=None):
+        """
+        Empresta uma instância configurada com `params` durante o bloco
+        `with`. Com `cancel_event` ligado, o erro que interrompeu o bloco é
+        tratado como cancelamento, e a instância volta ao pool.
+        """
+        key = self.key(params)
+        ydl = None
+        with self._lock:
+            instances = self._idle.get(key)
+            if instances:
+                ydl = instances.pop()
+                if not instances:
+                    del self._idle[key]
+                self.reused += 1
+        if ydl is None:
+            ydl = self._factory({name: value for name, value in params.items() if name not in PER_USE_KEYS})
+            try:
+                check_compatibility(ydl)
+            except IncompatibleYoutubeDLError:
+                self._close(ydl)
+                raise
+            with self._lock:
+                self.created += 1
+                self._uses[id(ydl)] = 0
+
+        try:
+            self._configure(ydl, params)
+            with self._lock:
+                self._borrowed[id(ydl)] = (key, params)
+            yield ydl
+        except BaseException as e:
+            self._return(ydl)
+            if self._is_control_flow(e, cancel_event):
+                self._configure(ydl, {})
+                self._release(key, ydl)
+            else:
+                self._discard(ydl)
+            raise
+        self._return(ydl)
+        self._configure(ydl, {})
+        self._release(key, ydl)
+
+    @contextmanager
+    def reconfigured(self, ydl, params):
+        """
+        Troca as opções por uso (PER_USE_KEYS) de uma instância já
+        emprestada durante o bloco `with` e depois restaura as anteriores.
+        Para passos do mesmo job com outro formato ou nome de arquivo, sem
+        emprestar uma segunda instância. As demais opções devem ser as
+        mesmas do empréstimo.
+        """
+        with self._lock:
+            key, previous = self._borrowed[id(ydl)]
+        if self.key(params) != key:
+            raise ValueError("reconfigured() só troca as opções por uso: " + ', '.join(PER_USE_KEYS))
+        self._configure(ydl, params)
+        try:
+            yield ydl
+        finally:
+            self._configure(ydl, previous)
+
+    def _return(self, ydl):
+        with self._lock:
+            self._borrowed.pop(id(ydl), None)
+
+    def _is_control_flow(self, error, cancel_event):
+        if not isinstance(error, Exception) or isinstance(error, self.keep_on):
+            return True
+        return cancel_event is not None and cancel_event.is_set()
+
+    @staticmethod
+    def _configure(ydl, params):
+        fmt = params.get('format')
+        ydl.params['format'] = fmt
+        ydl.format_selector = fmt if fmt in (None, '-') or callable(fmt) else ydl.build_format_selector(fmt)
+        ydl.params['outtmpl'] = dict(params.get('outtmpl') or {})
+        ydl._parse_outtmpl()
+        # Os hooks guardam referência ao job; são removidos ao devolver a instância
+        ydl._progress_hooks = []
+        ydl._postprocessor_hooks = []
+        for hook in params.get('progress_hooks', []):
+            ydl.add_progress_hook(hook)
+        for hook in params.get('postprocessor_hooks', []):
+            ydl.add_postprocessor_hook(hook)
+
+    def _release(self, key, ydl):
+        evicted = []
+        with self._lock:
+            uses = self._uses.get(id(ydl), 0) + 1
+            if self._closed or uses >= self.max_uses:
+                evicted.append(ydl)
+            else:
+                self._uses[id(ydl)] = uses
+                self._idle.setdefault(key, []).append(ydl)
+                self._idle.move_to_end(key)
+                while sum(len(instances) for instances in self._idle.values()) > self.max_idle:
+                    _, instances = next(iter(self._idle.items()))
+                    evicted.append(instances.pop(0))
+                    if not instances:
+                        self._idle.popitem(last=False)
+            for instance in evicted:
+                self._uses.pop(id(instance), None)
+        for instance in evicted:
+            self._close(instance)
+
+    def _discard(self, ydl):
+        with self._lock:
+            self._uses.pop(id(ydl), None)
+        self._close(ydl)
+
+    @staticmethod
+    def _close(ydl):
+        try:
+            ydl.close()
+        except Exception as e:
+            logging.debug("Erro ao fechar instância do yt-dlp: %s", e)
+
+    def idle_count(self):
+        with self._lock:
+            return sum(len(instances) for instances in self._idle.values())
+
+    def close(self):
+        """Fecha as instâncias ociosas; as emprestadas são fechadas ao voltar."""
+        with self._lock:
+            self._closed = True
+            instances = [ydl for group in self._idle.values() for ydl in group]
+            self._idle.clear()
+            self._uses.clear()
+        for ydl in instances:
+            self._close(ydl)
+        if self.created:
+            logging.debug("Pool do yt-dlp encerrado: %d instâncias criadas, %d reaproveitamentos",
+                          self.created, self.reused)